@@ -0,0 +1,47 @@
+"""
+Configuration helpers for reading typed settings from environment variables.
+Invalid values are logged and replaced by the default instead of failing startup.
+"""
+
+from typing import List
+import os
+import logging
+
+_env_loaded = False
+
+
+def load_env() -> None:
+    """Load variables from the .env file into the environment, once per process."""
+    global _env_loaded
+    if not _env_loaded:
+        from dotenv import load_dotenv
+        load_dotenv()
+        _env_loaded = True
+
+
+def env_int(name: str, default: int) -> int:
+    """Read an integer setting from the environment, falling back to a default."""
+    try:
+        return int(os.getenv(name, default))
+    except ValueError:
+        logging.warning(f"Invalid value for {name}, using default {default}")
+        return default
+
+
+def env_float(name: str, default: float) -> float:
+    """Read a float setting from the environment, falling back to a default."""
+    try:
+        return float(os.getenv(name, default))
+    except ValueError:
+        logging.warning(f"Invalid value for {name}, using default {default}")
+        return default
+
+
+def env_bool(name: str, default: bool) -> bool:
+    """Read a boolean setting ('true'/'false') from the environment."""
+    return os.getenv(name, str(default)).lower() == "true"
+
+
+def env_list(name: str, default: str = "") -> List[str]:
+    """Read a comma-separated list setting, dropping empty items."""
+    return [item.strip() for item in os.getenv(name, default).split(",") if item.strip()]
@@ -0,0 +1,32 @@
+"""
+FastAPI dependencies providing the application's services.
+Services are created on first use, once per process, so importing the app is
+cheap and works without credentials. Tests and load tests can swap in fakes with
+app.dependency_overrides:
+
+    app.dependency_overrides[get_coinbase_service] = lambda: FakeCoinbaseService()
+"""
+
+import logging
+from fastapi import HTTPException
+from .services.ai_service import AIService
+from .services.coinbase_service import CoinbaseService
+
+
+def get_coinbase_service() -> CoinbaseService:
+    """
+    Provide the process-wide Coinbase service, creating it on first use.
+
+    Raises:
+        HTTPException(503): If the Coinbase credentials are missing or invalid
+    """
+    try:
+        return CoinbaseService()
+    except ValueError as e:
+        logging.error(f"Coinbase service unavailable: {e}")
+        raise HTTPException(status_code=503, detail="Coinbase service is not configured")
+
+
+def get_ai_service() -> AIService:
+    """Provide the process-wide AI service, creating it on first use."""
+    return AIService()
@@ -0,0 +1,111 @@
+"""
+Logging configuration for the development and production server profiles.
+Development logs readable text at DEBUG; production logs one JSON object per
+line at INFO. Large payloads (portfolios, candle responses) go through
+log_payload, which skips disabled levels, samples, and only serializes and
+truncates the payload if the record is actually written.
+"""
+
+from typing import Any, Optional
+import json
+import logging
+import os
+import random
+import time
+from .config import env_float, env_int
+
+PROFILES = ("dev", "prod")
+
+TEXT_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+# Fraction of payload log calls that are written (set by configure_logging)
+_payload_sample_rate = 1.0
+# Longest payload text written, in characters
+_payload_max_chars = 2000
+
+
+class JsonFormatter(logging.Formatter):
+    """Format records as single-line JSON objects, including `fields` passed via extra."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created)) + f".{int(record.msecs):03d}Z",
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        fields = getattr(record, "fields", None)
+        if fields:
+            entry.update(fields)
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class _LazyPayload:
+    """Defers serializing a payload until the log record is formatted."""
+
+    __slots__ = ("payload", "limit")
+
+    def __init__(self, payload: Any, limit: int):
+        self.payload = payload
+        self.limit = limit
+
+    def __str__(self) -> str:
+        try:
+            text = json.dumps(self.payload, default=str)
+        except (TypeError, ValueError):
+            text = repr(self.payload)
+        if len(text) > self.limit:
+            return f"{text[:self.limit]}... ({len(text) - self.limit} more characters)"
+        return text
+
+
+def configure_logging(profile: str = "dev") -> None:
+    """
+    Configure root logging for a server profile.
+
+    Environment variables:
+        LOG_LEVEL: Root log level (default: DEBUG for dev, INFO for prod)
+        LOG_FORMAT: 'text' or 'json' (default: text for dev, json for prod)
+        LOG_PAYLOAD_SAMPLE_RATE: Fraction of payload logs written (default: 1 for dev, 0.01 for prod)
+        LOG_PAYLOAD_MAX_CHARS: Longest payload text written (default: 2000)
+
+    Args:
+        profile: 'dev' or 'prod'
+    """
+    global _payload_sample_rate, _payload_max_chars
+    production = profile == "prod"
+    level = os.getenv("LOG_LEVEL", "INFO" if production else "DEBUG").upper()
+    handler = logging.StreamHandler()
+    if os.getenv("LOG_FORMAT", "json" if production else "text").lower() == "json":
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(logging.Formatter(TEXT_FORMAT, datefmt="%Y-%m-%d %H:%M:%S"))
+    logging.basicConfig(level=level, handlers=[handler], force=True)
+
+    _payload_sample_rate = min(1.0, max(0.0, env_float("LOG_PAYLOAD_SAMPLE_RATE", 0.01 if production else 1.0)))
+    _payload_max_chars = env_int("LOG_PAYLOAD_MAX_CHARS", 2000)
+
+
+def log_payload(message: str, payload: Any, level: int = logging.DEBUG,
+                logger: Optional[logging.Logger] = None, **fields: Any) -> None:
+    """
+    Log a large payload lazily and sampled.
+
+    Nothing is formatted when `level` is disabled or the call is not sampled;
+    otherwise the payload is serialized as JSON and truncated when written.
+
+    Args:
+        message: Log message; the payload text is appended after a colon
+        payload: Value to log (e.g. a portfolio or a raw upstream response)
+        level: Log level (default: DEBUG)
+        logger: Logger to use (default: the root logger, like the services)
+        fields: Small structured values added to JSON log lines (e.g. product_id)
+    """
+    logger = logger or logging.getLogger()
+    if not logger.isEnabledFor(level):
+        return
+    if _payload_sample_rate < 1.0 and random.random() >= _payload_sample_rate:
+        return
+    logger.log(level, "%s: %s", message, _LazyPayload(payload, _payload_max_chars), extra={"fields": fields})
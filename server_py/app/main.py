@@ -3,21 +3,142 @@ Main application module for the Crypto Viewer backend.
 Sets up FastAPI application with CORS middleware and API routers.
 """
 
+from contextlib import asynccontextmanager
+import asyncio
+import importlib
 from fastapi import FastAPI
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
-from dotenv import load_dotenv
+import logging
 import os
 import python_multipart
 from .routers import crypto, recommendations
+from .services.http_client import init_http_client, close_http_client
+from .services.rest_adapter import shutdown_rest_executor
+from .services.coinbase_service import CoinbaseService
+from .services.market_store import market_store
+from .services.market_poller import MarketDataPoller
+from .services.price_stream import close_price_stream_hub
+from .services.candle_store import CandleStore
+from .services.portfolio_history import PortfolioRecorder, open_portfolio_history
+from .services.shared_cache import close_shared_backend
+from .config import env_bool, env_float, env_int, load_env
+from .metrics import MetricsMiddleware, registry, start_event_loop_monitor
 
 # Load environment variables from .env file for configuration
-load_dotenv()
+load_env()
+
+def _default_response_class() -> type:
+    """
+    Pick the JSON response class: orjson-based when ORJSON_RESPONSES is enabled
+    (default in the production profile) and the 'orjson' package is installed.
+    """
+    if not env_bool("ORJSON_RESPONSES", os.getenv("SERVER_PROFILE", "dev") == "prod"):
+        return JSONResponse
+    try:
+        import orjson  # noqa: F401
+    except ImportError:
+        logging.warning("ORJSON_RESPONSES is enabled but the 'orjson' package is not installed; using JSONResponse")
+        return JSONResponse
+    from fastapi.responses import ORJSONResponse
+    return ORJSONResponse
+
+def _preload_sdks() -> None:
+    """Import the SDKs that services load on first use (see PRELOAD_SDKS)."""
+    for module in ("openai", "coinbase.rest"):
+        try:
+            importlib.import_module(module)
+        except ImportError as e:
+            logging.warning(f"Could not preload {module}: {e}")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Manage application-wide resources.
+    Creates the shared upstream HTTP client, opens the persistent candle store and
+    warm-loads recent candles from it, opens the portfolio value history and starts
+    the background market data poller and portfolio recorder on startup; all but the
+    client need the Coinbase service and are skipped without credentials. On
+    shutdown stops the poller, the recorder and the live price feed, closes the
+    candle store, the portfolio history, the shared cache connections and the client and stops the
+    thread pool used for blocking Coinbase SDK calls. When metrics are enabled,
+    event loop lag is sampled for the lifetime of the application. With
+    PRELOAD_SDKS (default in the production profile) the OpenAI and Coinbase SDKs
+    are imported on a background thread after startup, so the first request
+    using them does not wait for the import.
+    """
+    init_http_client()
+    poller = None
+    candle_store = None
+    history = None
+    recorder = None
+    loop_monitor = None
+    preload = None
+    if env_bool("METRICS_ENABLED", True):
+        loop_monitor = start_event_loop_monitor(env_float("METRICS_LOOP_LAG_INTERVAL", 0.5))
+    service = None
+    if (env_bool("CANDLE_STORE_ENABLED", True) or env_bool("MARKET_POLLER_ENABLED", True)
+            or env_bool("PORTFOLIO_HISTORY_ENABLED", True)):
+        try:
+            service = CoinbaseService()
+        except ValueError as e:
+            logging.warning(f"{e} The candle store, market data poller and portfolio history are disabled.")
+    if service is not None and env_bool("MARKET_POLLER_ENABLED", True):
+        market_store.configure(
+            max_bytes=env_int("MARKET_STORE_MAX_BYTES", 8 * 1024 * 1024),
+            max_products=env_int("MARKET_STORE_MAX_PRODUCTS", 50)
+        )
+    if service is not None and env_bool("CANDLE_STORE_ENABLED", True):
+        candle_store = await CandleStore(os.getenv("CANDLE_STORE_PATH", "data/candles.db")).open()
+        candle_store.start_maintenance(
+            interval=env_float("CANDLE_STORE_COMPACT_INTERVAL", 3600.0),
+            retention=env_float("CANDLE_STORE_RETENTION_DAYS", 365.0) * 86400
+        )
+        service.candle_store = candle_store
+        await service.warm_start()
+    if service is not None and env_bool("MARKET_POLLER_ENABLED", True):
+        poller = MarketDataPoller(service, market_store)
+        poller.start()
+    if service is not None and env_bool("PORTFOLIO_HISTORY_ENABLED", True):
+        try:
+            history = open_portfolio_history(service.market_quote)
+        except ValueError as e:
+            logging.warning(f"{e}. Portfolio history is disabled.")
+        else:
+            service.portfolio_history = history
+            recorder = PortfolioRecorder(service, history)
+            recorder.start()
+    if env_bool("PRELOAD_SDKS", os.getenv("SERVER_PROFILE", "dev") == "prod"):
+        preload = asyncio.create_task(asyncio.to_thread(_preload_sdks))
+    try:
+        yield
+    finally:
+        if loop_monitor is not None:
+            loop_monitor.cancel()
+        if preload is not None:
+            # An import cannot be interrupted; wait for it so the thread does not outlive shutdown
+            await preload
+        if poller is not None:
+            await poller.stop()
+        if recorder is not None:
+            await recorder.stop()
+            service.portfolio_history = None
+            history.close()
+        if candle_store is not None:
+            service.candle_store = None
+            await candle_store.close()
+        await close_price_stream_hub()
+        await close_shared_backend()
+        await close_http_client()
+        shutdown_rest_executor()
 
 # Initialize FastAPI application
 app = FastAPI(
     title="Crypto Viewer API",
     description="Backend API for cryptocurrency portfolio tracking and analysis",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=_default_response_class()
 )
 
 # Configure Cross-Origin Resource Sharing (CORS)
@@ -30,6 +151,10 @@ app.add_middleware(
     allow_headers=["*"],  # Allow all HTTP headers
 )
 
+# Record per-route latency for the /metrics endpoint
+if env_bool("METRICS_ENABLED", True):
+    app.add_middleware(MetricsMiddleware)
+
 # Include routers for different API endpoints
 # Each router handles a specific aspect of the application
 app.include_router(
@@ -56,4 +181,17 @@ async def root():
         "message": "Crypto Viewer API",
         "status": "online",
         "version": "1.0.0"
-    }
\ No newline at end of file
+    }
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """
+    Expose request, upstream, cache, event loop and token usage metrics in the
+    Prometheus text format. Values are per worker process.
+
+    Returns:
+        PlainTextResponse: Metrics in text exposition format 0.0.4
+    """
+    if not env_bool("METRICS_ENABLED", True):
+        return PlainTextResponse("Metrics are disabled\n", status_code=404)
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
@@ -0,0 +1,297 @@
+"""
+In-process metrics in the Prometheus text format.
+Provides counters, gauges and histograms cheap enough to leave on in production
+(a dictionary lookup and a few additions per observation), ASGI middleware
+recording per-route latency, upstream call tracking, event loop lag monitoring
+and the registry rendered by the /metrics endpoint. Metrics are per process.
+"""
+
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Sequence, Tuple
+import asyncio
+import logging
+import math
+import time
+
+# Latency buckets in seconds, from sub-millisecond cache hits to slow upstream calls
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# One metric family: (name, type, help, [(label values by name, sample suffix, value)])
+Family = Tuple[str, str, str, List[Tuple[Dict[str, str], str, float]]]
+
+
+class Counter:
+    """Monotonically increasing value per label combination."""
+
+    __slots__ = ("name", "help", "labelnames", "_values")
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        """Add `amount` to the series for the given label values (in labelnames order)."""
+        self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def value(self, *labels: str) -> float:
+        """Current value of one series."""
+        return self._values.get(labels, 0.0)
+
+    def collect(self) -> Family:
+        samples = [(dict(zip(self.labelnames, labels)), "", value) for labels, value in self._values.items()]
+        return self.name, "counter", self.help, samples
+
+
+class Gauge(Counter):
+    """Value that can go up and down per label combination."""
+
+    __slots__ = ()
+
+    def dec(self, *labels: str, amount: float = 1.0) -> None:
+        """Subtract `amount` from the series for the given label values."""
+        self._values[labels] = self._values.get(labels, 0.0) - amount
+
+    def set(self, value: float, *labels: str) -> None:
+        """Set the series for the given label values."""
+        self._values[labels] = value
+
+    def collect(self) -> Family:
+        name, _, help, samples = super().collect()
+        return name, "gauge", help, samples
+
+
+class Histogram:
+    """
+    Distribution of observed values in fixed buckets per label combination.
+    Counts are kept per bucket and made cumulative only when rendered.
+    """
+
+    __slots__ = ("name", "help", "labelnames", "buckets", "_series")
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per series: [count per bucket (last is +Inf), sum, count]
+        self._series: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        """Record one value for the given label values (in labelnames order)."""
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+        series[2] += 1
+
+    def count(self, *labels: str) -> int:
+        """Number of observations in one series."""
+        series = self._series.get(labels)
+        return series[2] if series else 0
+
+    def collect(self) -> Family:
+        samples = []
+        for labels, (counts, total, count) in self._series.items():
+            base = dict(zip(self.labelnames, labels))
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (math.inf,), counts):
+                cumulative += bucket_count
+                samples.append(({**base, "le": _format_value(bound)}, "_bucket", cumulative))
+            samples.append((base, "_sum", total))
+            samples.append((base, "_count", count))
+        return self.name, "histogram", self.help, samples
+
+
+class Registry:
+    """
+    Collection of metrics rendered together.
+    Collectors are functions returning metric families computed at scrape time,
+    for values that are already counted elsewhere (e.g. cache statistics).
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, Any] = {}
+        self._collectors: List[Callable[[], Iterable[Family]]] = []
+
+    def _register(self, metric: Any) -> Any:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        """Create and register a counter."""
+        return self._register(Counter(name, help, labelnames))
+
+    def gauge(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Gauge:
+        """Create and register a gauge."""
+        return self._register(Gauge(name, help, labelnames))
+
+    def histogram(self, name: str, help: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        """Create and register a histogram."""
+        return self._register(Histogram(name, help, labelnames, buckets))
+
+    def add_collector(self, collector: Callable[[], Iterable[Family]]) -> None:
+        """Register a function producing metric families at scrape time."""
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        """Render all metrics in the Prometheus text exposition format (version 0.0.4)."""
+        families = [metric.collect() for metric in self._metrics.values()]
+        for collector in self._collectors:
+            try:
+                families.extend(collector())
+            except Exception as e:
+                logging.error(f"Metrics collector failed: {e}")
+        lines = []
+        for name, kind, help, samples in families:
+            lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, suffix, value in samples:
+                lines.append(f"{name}{suffix}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: Any) -> str:
+    """Escape a label value: backslash, double quote and newline."""
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if isinstance(value, int) or float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+# Shared registry and the metrics recorded across the application
+registry = Registry()
+
+HTTP_REQUEST_DURATION = registry.histogram(
+    "http_request_duration_seconds", "Time to serve an API request, by route template",
+    ("method", "route", "status"))
+UPSTREAM_REQUEST_DURATION = registry.histogram(
+    "upstream_request_duration_seconds", "Duration of calls to Coinbase and OpenAI", ("upstream",))
+UPSTREAM_ERRORS = registry.counter(
+    "upstream_errors_total", "Failed calls to Coinbase and OpenAI", ("upstream",))
+UPSTREAM_IN_FLIGHT = registry.gauge(
+    "upstream_in_flight_requests", "Calls to Coinbase and OpenAI currently in progress", ("upstream",))
+EVENT_LOOP_LAG = registry.histogram(
+    "event_loop_lag_seconds", "Delay between when a timer was due and when the event loop ran it",
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0))
+OPENAI_TOKENS = registry.counter(
+    "openai_tokens_total", "Tokens used by OpenAI chat completions", ("type",))
+
+
+class track_upstream:
+    """
+    Time one upstream call and count it as in flight while it runs.
+    Exceptions count as errors; cancellation (e.g. a client disconnect) does not.
+
+    Usage:
+        with track_upstream("coinbase_accounts"):
+            response = await self.rest_client.get_accounts()
+    """
+
+    __slots__ = ("upstream", "started", "paused_for")
+
+    def __init__(self, upstream: str):
+        self.upstream = upstream
+
+    def __enter__(self) -> "track_upstream":
+        UPSTREAM_IN_FLIGHT.inc(self.upstream)
+        self.paused_for = 0.0
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type: Any, exc: Any, traceback: Any) -> None:
+        UPSTREAM_REQUEST_DURATION.observe(time.perf_counter() - self.started - self.paused_for, self.upstream)
+        UPSTREAM_IN_FLIGHT.dec(self.upstream)
+        if exc_type is not None and issubclass(exc_type, Exception):
+            UPSTREAM_ERRORS.inc(self.upstream)
+
+    @contextmanager
+    def paused(self) -> Iterator[None]:
+        """
+        Leave time spent outside the upstream call out of its duration and in-flight count,
+        e.g. while a streamed chunk is yielded to a slow consumer.
+        """
+        UPSTREAM_IN_FLIGHT.dec(self.upstream)
+        paused_at = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.paused_for += time.perf_counter() - paused_at
+            UPSTREAM_IN_FLIGHT.inc(self.upstream)
+
+
+def record_token_usage(usage: Any) -> None:
+    """Count prompt and completion tokens from an OpenAI usage object, if present."""
+    if usage is None:
+        return
+    OPENAI_TOKENS.inc("prompt", amount=getattr(usage, "prompt_tokens", 0) or 0)
+    OPENAI_TOKENS.inc("completion", amount=getattr(usage, "completion_tokens", 0) or 0)
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording the latency of every HTTP request by method, route
+    template (e.g. '/api/crypto/price/{product_id}') and status code. Requests
+    that match no route are recorded as 'unmatched' to keep label values bounded.
+    Streaming responses are timed until their last chunk is sent.
+    """
+
+    def __init__(self, app: Any):
+        self.app = app
+
+    async def __call__(self, scope: Dict[str, Any], receive: Callable, send: Callable) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_status(message: Dict[str, Any]) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            # The router stores the matched route in the (shared) scope
+            route = scope.get("route")
+            HTTP_REQUEST_DURATION.observe(time.perf_counter() - started, scope["method"],
+                                          getattr(route, "path", "unmatched"), str(status))
+
+
+async def monitor_event_loop_lag(interval: float = 0.5) -> None:
+    """
+    Record event loop lag until cancelled: sleep for `interval` and measure how
+    late the loop resumed. Sustained lag means blocking work on the event loop.
+    """
+    loop = asyncio.get_running_loop()
+    while True:
+        expected = loop.time() + interval
+        await asyncio.sleep(interval)
+        EVENT_LOOP_LAG.observe(max(0.0, loop.time() - expected))
+
+
+def start_event_loop_monitor(interval: float = 0.5) -> asyncio.Task:
+    """Start monitor_event_loop_lag as a background task on the running loop."""
+    return asyncio.get_running_loop().create_task(monitor_event_loop_lag(interval))
@@ -1,20 +1,88 @@
 """
 Router module for cryptocurrency-related API endpoints.
-Provides endpoints for portfolio data, current prices, and historical data.
+Provides endpoints for portfolio data, current prices, historical data and live price streams.
 """
 
-from fastapi import APIRouter, HTTPException
-from typing import Dict, Any, List
-from ..services.coinbase_service import CoinbaseService
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+from datetime import datetime, timedelta, timezone
+from typing import AsyncIterator, Dict, Any, Generator, List, Optional
+import asyncio
+import json
+from ..dependencies import get_coinbase_service
+from ..services.coinbase_service import AccountPortfolio, CoinbaseService
+from ..services.candles import GRANULARITIES, page_windows
+from ..services.price_stream import get_price_stream_hub
+from ..services.indicators import compute_indicators
+from ..services.upstream_scheduler import UpstreamRateLimited, get_upstream_scheduler
+from ..services.circuit_breaker import CircuitOpenError, circuit_stats
+from ..config import env_int
 
 router = APIRouter()
-coinbase_service = CoinbaseService()
+
+def _parse_product_ids(ids: str) -> List[str]:
+    """
+    Split a comma-separated list of product IDs.
+    
+    Raises:
+        HTTPException(400): If no IDs or more than PRICE_BATCH_MAX_PRODUCTS IDs are given
+    """
+    product_ids = [product_id.strip() for product_id in ids.split(",") if product_id.strip()]
+    if not product_ids:
+        raise HTTPException(status_code=400, detail="No product IDs given")
+    max_products = env_int("PRICE_BATCH_MAX_PRODUCTS", 50)
+    if len(product_ids) > max_products:
+        raise HTTPException(status_code=400, detail=f"At most {max_products} product IDs are allowed")
+    return product_ids
+
+def _upstream_error(error: Exception, detail: str) -> HTTPException:
+    """
+    Map a failed upstream fetch to an HTTP error: 503 with Retry-After when Coinbase
+    is rate limiting us or its circuit is open, 500 otherwise.
+    """
+    if isinstance(error, UpstreamRateLimited):
+        retry_after = max(1, round(error.retry_after)) if error.retry_after is not None else 1
+        return HTTPException(status_code=503, detail=f"{detail}: Coinbase rate limit reached",
+                             headers={"Retry-After": str(retry_after)})
+    if isinstance(error, CircuitOpenError):
+        return HTTPException(status_code=503, detail=f"{detail}: Coinbase is unavailable",
+                             headers={"Retry-After": str(max(1, round(error.retry_after)))})
+    return HTTPException(status_code=500, detail=detail)
+
+def _account(name: str, coinbase_service: CoinbaseService) -> AccountPortfolio:
+    """
+    Look up a configured Coinbase account by name.
+
+    Raises:
+        HTTPException(404): If no account has that name
+    """
+    account = coinbase_service.accounts.get(name.lower())
+    if account is None:
+        raise HTTPException(status_code=404, detail=f"Unknown account {name}")
+    return account
+
+async def _portfolio(account: AccountPortfolio, response: Response) -> List[Dict[str, Any]]:
+    """Fetch an account's holdings, marking stale copies with X-Data-Age and X-Data-Stale."""
+    try:
+        portfolio, age = await account.get_portfolio_snapshot()
+        if age is not None:
+            response.headers["X-Data-Age"] = f"{age:.3f}"
+            response.headers["X-Data-Stale"] = "true"
+        return portfolio
+    except Exception as e:
+        raise HTTPException(status_code=500, detail="Failed to fetch portfolio")
 
 @router.get("/portfolio")
-async def get_portfolio() -> List[Dict[str, Any]]:
+async def get_portfolio(
+    response: Response,
+    coinbase_service: CoinbaseService = Depends(get_coinbase_service)
+) -> List[Dict[str, Any]]:
     """
     Fetch the user's cryptocurrency portfolio.
     
+    When the last known balances are served because Coinbase is unavailable,
+    X-Data-Age gives their age in seconds and X-Data-Stale is true.
+    
     Returns:
         List of dictionaries containing cryptocurrency holdings
         Each holding includes currency symbol, total balance, and available balance
@@ -22,46 +90,432 @@ async def get_portfolio() -> List[Dict[str, Any]]:
     Raises:
         HTTPException(500): If portfolio fetch fails
     """
+    return await _portfolio(coinbase_service, response)
+
+@router.get("/portfolio/valuation")
+async def get_portfolio_valuation(
+    quote: Optional[str] = Query(None, description="Currency to value holdings in (default: MARKET_QUOTE_CURRENCY)"),
+    coinbase_service: CoinbaseService = Depends(get_coinbase_service)
+) -> Dict[str, Any]:
+    """
+    Value the user's portfolio at current prices in one request.
+    Rates for other quote currencies are derived from the markets already fetched.
+    
+    Args:
+        quote: Currency to value holdings in (default: MARKET_QUOTE_CURRENCY, 'GBP')
+        
+    Returns:
+        Dictionary with total value, 24h profit and loss, and per-asset balance, price,
+        value, weight and 24h change, all as decimal strings, plus an "errors" mapping
+        of currencies that could not be priced
+        
+    Raises:
+        HTTPException(503): If Coinbase is rate limiting requests
+        HTTPException(500): If valuation fails
+    """
     try:
-        return await coinbase_service.get_portfolio()
+        return await coinbase_service.get_portfolio_valuation(quote)
     except Exception as e:
-        raise HTTPException(status_code=500, detail="Failed to fetch portfolio")
+        raise _upstream_error(e, "Failed to value portfolio")
+
+@router.get("/portfolio/consolidated")
+async def get_consolidated_valuation(
+    quote: Optional[str] = Query(None, description="Currency to value holdings in (default: MARKET_QUOTE_CURRENCY)"),
+    coinbase_service: CoinbaseService = Depends(get_coinbase_service)
+) -> Dict[str, Any]:
+    """
+    Value the holdings of every configured account together.
+    All accounts are fetched concurrently and each market is priced once.
+    
+    Args:
+        quote: Currency to value holdings in (default: MARKET_QUOTE_CURRENCY, 'GBP')
+        
+    Returns:
+        Valuation of the combined holdings as for /portfolio/valuation, plus
+        "accounts" mapping each account name to its own valuation
+        
+    Raises:
+        HTTPException(503): If Coinbase is rate limiting requests
+        HTTPException(500): If valuation fails
+    """
+    try:
+        return await coinbase_service.get_consolidated_valuation(quote)
+    except Exception as e:
+        raise _upstream_error(e, "Failed to value portfolios")
+
+@router.get("/accounts")
+async def get_accounts(coinbase_service: CoinbaseService = Depends(get_coinbase_service)) -> Dict[str, Any]:
+    """
+    List the configured Coinbase accounts.
+    
+    Returns:
+        Dictionary with the "default" account's name (served by the unscoped
+        endpoints) and the names of all "accounts"
+    """
+    return {"default": coinbase_service.account_name, "accounts": list(coinbase_service.accounts)}
+
+@router.get("/accounts/{account}/portfolio")
+async def get_account_portfolio(
+    account: str,
+    response: Response,
+    coinbase_service: CoinbaseService = Depends(get_coinbase_service)
+) -> List[Dict[str, Any]]:
+    """
+    Fetch the holdings of one account, as for /portfolio.
+    
+    Args:
+        account: Account name (see /accounts)
+        
+    Raises:
+        HTTPException(404): If the account is not configured
+        HTTPException(500): If portfolio fetch fails
+    """
+    return await _portfolio(_account(account, coinbase_service), response)
+
+@router.get("/accounts/{account}/portfolio/valuation")
+async def get_account_valuation(
+    account: str,
+    quote: Optional[str] = Query(None, description="Currency to value holdings in (default: MARKET_QUOTE_CURRENCY)"),
+    coinbase_service: CoinbaseService = Depends(get_coinbase_service)
+) -> Dict[str, Any]:
+    """
+    Value the holdings of one account, as for /portfolio/valuation.
+    
+    Args:
+        account: Account name (see /accounts)
+        quote: Currency to value holdings in (default: MARKET_QUOTE_CURRENCY, 'GBP')
+        
+    Raises:
+        HTTPException(404): If the account is not configured
+        HTTPException(503): If Coinbase is rate limiting requests
+        HTTPException(500): If valuation fails
+    """
+    portfolio_account = _account(account, coinbase_service)
+    try:
+        return await portfolio_account.get_portfolio_valuation(quote)
+    except Exception as e:
+        raise _upstream_error(e, "Failed to value portfolio")
+
+@router.get("/portfolio/history")
+async def get_portfolio_history(
+    start: Optional[datetime] = Query(None, alias="from", description="Range start (ISO 8601 or Unix seconds, default: 30 days before to)"),
+    end: Optional[datetime] = Query(None, alias="to", description="Range end (ISO 8601 or Unix seconds, default: now)"),
+    points: int = Query(500, ge=2, le=5000, description="Maximum number of snapshots returned"),
+    coinbase_service: CoinbaseService = Depends(get_coinbase_service)
+) -> Dict[str, Any]:
+    """
+    Fetch recorded portfolio values and asset weights over a time range.
+    Snapshots are recorded every PORTFOLIO_HISTORY_INTERVAL seconds in
+    MARKET_QUOTE_CURRENCY. Longer ranges are downsampled keeping the lowest and
+    highest value of each stretch, so peaks and troughs stay visible.
+
+    Args:
+        start: Range start, given as the 'from' query parameter
+        end: Range end, given as the 'to' query parameter
+        points: Maximum number of snapshots returned
+
+    Returns:
+        Columnar dictionary with "quote_currency", "from", "to", "count" (snapshots in
+        the range), and "time", "value" and per-currency "weights" lists
+
+    Raises:
+        HTTPException(400): If from is after to
+        HTTPException(503): If portfolio history is disabled
+    """
+    history = coinbase_service.portfolio_history
+    if history is None:
+        raise HTTPException(status_code=503, detail="Portfolio history is disabled")
+    end_ts = _utc_timestamp(end) if end is not None else int(datetime.now(timezone.utc).timestamp())
+    start_ts = _utc_timestamp(start) if start is not None else end_ts - int(timedelta(days=30).total_seconds())
+    if start_ts > end_ts:
+        raise HTTPException(status_code=400, detail="from must not be after to")
+    return {"from": start_ts, "to": end_ts, **history.query(start_ts, end_ts, points)}
 
 @router.get("/price/{product_id}")
-async def get_price(product_id: str) -> Dict[str, Any]:
+async def get_price(
+    product_id: str,
+    quote: Optional[str] = Query(None, description="Price the base currency in this currency instead"),
+    coinbase_service: CoinbaseService = Depends(get_coinbase_service)
+) -> Dict[str, Any]:
     """
     Fetch the current price for a cryptocurrency.
     
+    With `quote`, the base currency of `product_id` is priced in that currency
+    through the cheapest chain of known markets (returned as "path"), e.g.
+    /price/ETH?quote=USD, without fetching an ETH-USD market.
+    
     Args:
-        product_id: Trading pair identifier (e.g., 'BTC-GBP', 'ETH-GBP')
+        product_id: Trading pair identifier (e.g., 'BTC-GBP', 'ETH-GBP'), or just the
+            base currency when `quote` is given
+        quote: Currency to price the base currency in (e.g., 'USD')
         
     Returns:
         Dictionary containing current price and timestamp
         
     Raises:
+        HTTPException(400): If the base and quote currencies are the same
         HTTPException(500): If price fetch fails
     """
+    if quote is not None:
+        currency = product_id.split("-")[0]
+        if currency.upper() == quote.upper():
+            raise HTTPException(status_code=400, detail="Base and quote currencies must differ")
     try:
+        if quote is not None:
+            return await coinbase_service.get_price_in(currency, quote)
         return await coinbase_service.get_crypto_price(product_id)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to fetch price for {product_id}")
 
+@router.get("/prices")
+async def get_prices(
+    ids: str = Query(..., description="Comma-separated product IDs, e.g. BTC-GBP,ETH-GBP"),
+    coinbase_service: CoinbaseService = Depends(get_coinbase_service)
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Fetch current prices for several cryptocurrencies in one request.
+    
+    Args:
+        ids: Comma-separated trading pair identifiers (e.g., 'BTC-GBP,ETH-GBP')
+        
+    Returns:
+        Dictionary mapping each product ID to its price information,
+        or to {"error": str} for products that could not be fetched
+        
+    Raises:
+        HTTPException(400): If no IDs or too many IDs are given
+    """
+    return await coinbase_service.get_prices(_parse_product_ids(ids))
+
+def _utc_timestamp(value: datetime) -> int:
+    """Convert a datetime to Unix seconds, treating naive values as UTC."""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return int(value.timestamp())
+
+async def _stream_until_disconnected(request: Request, chunks: Generator[str, None, None]) -> AsyncIterator[str]:
+    """
+    Forward response chunks until the client disconnects.
+    The source generator is closed however the stream ends, rather than when it is garbage-collected.
+    """
+    try:
+        for chunk in chunks:
+            if await request.is_disconnected():
+                break
+            yield chunk
+    finally:
+        chunks.close()
+
 @router.get("/historical/{product_id}")
-async def get_historical(product_id: str) -> List[Dict[str, Any]]:
+async def get_historical(
+    product_id: str,
+    request: Request,
+    response: Response,
+    start: Optional[datetime] = Query(None, description="Range start (ISO 8601 or Unix seconds, default: 24 hours before end)"),
+    end: Optional[datetime] = Query(None, description="Range end (ISO 8601 or Unix seconds, default: now)"),
+    granularity: Optional[int] = Query(None, description="Candle width in seconds: 60, 300, 900, 3600, 21600 or 86400 (default: 3600)"),
+    coinbase_service: CoinbaseService = Depends(get_coinbase_service),
+) -> List[Dict[str, Any]]:
     """
     Fetch historical price data for a cryptocurrency.
     
+    Without range parameters the last 24 hours of hourly candles are returned.
+    When served from the background market store, the X-Data-Age header gives the
+    data age in seconds and X-Data-Stale tells whether it is older than expected.
+    
+    With `start`, `end` or `granularity` the range is fetched page by page (Coinbase
+    returns at most 300 candles per request) and streamed back as one JSON array.
+    Streaming stops as soon as the client disconnects.
+    
     Args:
         product_id: Trading pair identifier (e.g., 'BTC-GBP', 'ETH-GBP')
+        start: Range start
+        end: Range end
+        granularity: Candle width in seconds
         
     Returns:
-        List of dictionaries containing historical price data points
+        List of dictionaries containing historical price data points, newest first
         Each point includes timestamp, open, high, low, close prices, and volume
         
     Raises:
+        HTTPException(400): If the granularity is unsupported, the range is empty
+            or it needs more than HISTORICAL_MAX_PAGES upstream requests
+        HTTPException(503): If Coinbase is rate limiting requests
         HTTPException(500): If historical data fetch fails
     """
+    if start is None and end is None and granularity is None:
+        try:
+            candles, age = await coinbase_service.get_historical_snapshot(product_id)
+            if age is not None:
+                response.headers["X-Data-Age"] = f"{age:.3f}"
+                response.headers["X-Data-Stale"] = str(age > coinbase_service.store_stale_after).lower()
+            return candles
+        except Exception as e:
+            raise _upstream_error(e, f"Failed to fetch historical data for {product_id}")
+
+    granularity = granularity or 3600
+    if granularity not in GRANULARITIES:
+        raise HTTPException(status_code=400, detail=f"Granularity must be one of {', '.join(map(str, GRANULARITIES))}")
+    end_ts = _utc_timestamp(end) if end is not None else int(datetime.now(timezone.utc).timestamp())
+    start_ts = _utc_timestamp(start) if start is not None else end_ts - int(timedelta(days=1).total_seconds())
+    if start_ts >= end_ts:
+        raise HTTPException(status_code=400, detail="start must be before end")
+    max_pages = env_int("HISTORICAL_MAX_PAGES", 100)
+    if len(page_windows(start_ts, end_ts, granularity)) > max_pages:
+        raise HTTPException(status_code=400, detail=f"Range too large: at most {max_pages * 300} candles per request")
+
     try:
-        return await coinbase_service.get_historical_data(product_id)
+        candles = await coinbase_service.get_candle_range(product_id, start_ts, end_ts, granularity)
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to fetch historical data for {product_id}")
\ No newline at end of file
+        raise _upstream_error(e, f"Failed to fetch historical data for {product_id}")
+    return StreamingResponse(_stream_until_disconnected(request, candles.iter_json()), media_type="application/json")
+
+@router.get("/indicators/{product_id}")
+async def get_indicators(
+    product_id: str,
+    window: int = Query(14, ge=2, le=200),
+    coinbase_service: CoinbaseService = Depends(get_coinbase_service)
+) -> Dict[str, Any]:
+    """
+    Compute technical indicators over recent hourly candles.
+    
+    The last 24 hours of candles are used, or the last window + 1 hours when the
+    window needs more history, so every indicator has a value for the latest candle.
+    
+    Args:
+        product_id: Trading pair identifier (e.g., 'BTC-GBP', 'ETH-GBP')
+        window: Look-back window in candles for SMA, EMA, RSI, ATR and volatility
+        
+    Returns:
+        Dictionary with candle times and closes (oldest first), one series each for
+        sma, ema, rsi, vwap, atr and volatility (null where history is too short),
+        and the latest value of each indicator under "latest"
+        
+    Raises:
+        HTTPException(503): If Coinbase is rate limiting requests
+        HTTPException(500): If historical data fetch fails
+    """
+    try:
+        candles, _ = await coinbase_service.get_candle_series(product_id)
+        if len(candles) < window + 1:
+            end_ts = int(datetime.now(timezone.utc).timestamp())
+            start_ts = (end_ts // 3600 - window) * 3600
+            candles = await coinbase_service.get_candle_range(product_id, start_ts, end_ts, 3600)
+    except Exception as e:
+        raise _upstream_error(e, f"Failed to fetch historical data for {product_id}")
+    return {"product_id": product_id, **compute_indicators(candles, window, granularity=3600)}
+
+@router.get("/cache/stats")
+async def get_cache_stats(coinbase_service: CoinbaseService = Depends(get_coinbase_service)) -> Dict[str, Any]:
+    """
+    Report candle cache usage.
+    
+    Returns:
+        Dictionary with hit, miss and coalesced counters, hit ratio, entry count
+        and estimated memory use of the candle cache
+    """
+    return {"candles": coinbase_service.cache_stats()}
+
+@router.get("/upstream/stats")
+async def get_upstream_stats() -> Dict[str, Any]:
+    """
+    Report the Coinbase request scheduler's state per endpoint class and the
+    circuit breakers' state per upstream.
+    
+    Returns:
+        Dictionary keyed by endpoint class ('public', 'private') with the rate limit,
+        available tokens, current and peak queue depth, wait times, 429s and retries,
+        plus "circuits": {upstream: {"state", "consecutive_failures", "opened",
+        "rejected", "retry_after"}}
+    """
+    return {**get_upstream_scheduler().stats(), "circuits": circuit_stats()}
+
+@router.websocket("/stream")
+async def stream_prices(websocket: WebSocket, products: str = "") -> None:
+    """
+    Stream live price ticks over a WebSocket.
+    
+    Products can be given up front with `?products=BTC-GBP,ETH-GBP` and changed later
+    by sending {"type": "subscribe" | "unsubscribe", "product_ids": [...]}. Other
+    messages are answered with {"type": "error", "message"} and otherwise ignored.
+    Each tick is sent as {"type": "ticker", "product_id", "price", "time", "change_24h"}.
+    Slow clients skip the oldest queued ticks rather than falling behind.
+    """
+    await websocket.accept()
+    hub = get_price_stream_hub()
+    subscriber = hub.register()
+    await hub.subscribe(subscriber, [p.strip() for p in products.split(",") if p.strip()])
+
+    async def send_ticks() -> None:
+        while True:
+            await websocket.send_json(await subscriber.next_tick())
+
+    sender = asyncio.create_task(send_ticks())
+    try:
+        while True:
+            try:
+                message = await websocket.receive_json()
+            except (ValueError, KeyError):
+                await websocket.send_json({"type": "error", "message": "Expected a JSON message"})
+                continue
+            if not isinstance(message, dict):
+                await websocket.send_json({"type": "error", "message": "Expected a JSON object"})
+                continue
+            product_ids = message.get("product_ids") or []
+            if not isinstance(product_ids, list) or not all(isinstance(p, str) for p in product_ids):
+                await websocket.send_json({"type": "error", "message": "product_ids must be a list of strings"})
+                continue
+            if message.get("type") == "subscribe":
+                await hub.subscribe(subscriber, product_ids)
+            elif message.get("type") == "unsubscribe":
+                await hub.unsubscribe(subscriber, product_ids)
+            else:
+                await websocket.send_json({"type": "error", "message": "Unknown message type"})
+    except WebSocketDisconnect:
+        pass
+    finally:
+        sender.cancel()
+        await hub.unregister(subscriber)
+
+@router.get("/stream/sse")
+async def stream_prices_sse(ids: str = Query(..., description="Comma-separated product IDs, e.g. BTC-GBP,ETH-GBP")) -> StreamingResponse:
+    """
+    Stream live price ticks as Server-Sent Events, for clients without WebSocket support.
+    
+    Args:
+        ids: Comma-separated trading pair identifiers (e.g., 'BTC-GBP,ETH-GBP')
+        
+    Returns:
+        text/event-stream response; each event's data is a tick as sent by /stream
+    """
+    product_ids = _parse_product_ids(ids)
+    hub = get_price_stream_hub()
+    subscriber = hub.register()
+    await hub.subscribe(subscriber, product_ids)
+    keepalive = env_int("STREAM_SSE_KEEPALIVE", 15)
+
+    async def events():
+        try:
+            while True:
+                try:
+                    tick = await asyncio.wait_for(subscriber.next_tick(), keepalive)
+                except asyncio.TimeoutError:
+                    # Comment line keeps proxies from closing an idle stream
+                    yield ": keep-alive\n\n"
+                    continue
+                yield f"data: {json.dumps(tick)}\n\n"
+        finally:
+            await hub.unregister(subscriber)
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+@router.get("/stream/stats")
+async def get_stream_stats() -> Dict[str, Any]:
+    """
+    Report live stream usage.
+    
+    Returns:
+        Dictionary with upstream connection state, client count, followed products
+        and the number of ticks dropped for slow clients
+    """
+    return get_price_stream_hub().stats()
@@ -1,23 +1,98 @@
 # This module defines the API endpoint for generating cryptocurrency recommendations.
 # It fetches portfolio data, market data, and AI-based recommendations.
 
-from fastapi import APIRouter, HTTPException
-from typing import Dict, Any
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from functools import partial
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Tuple
+import asyncio
+import json
 import logging
+from app.dependencies import get_ai_service, get_coinbase_service
 from app.services.coinbase_service import CoinbaseService
 from app.services.ai_service import AIService
+from app.services.concurrency import DeadlineExceeded, gather_bounded
+from app.services.upstream_scheduler import Priority, upstream_priority
+from app.config import env_float, env_int
 
 router = APIRouter()
-coinbase_service = CoinbaseService()
-ai_service = AIService()
+
+async def _gather_market_data(
+    portfolio: List[Dict[str, Any]],
+    fetch: Callable[[str], Awaitable[Dict[str, Any]]],
+    quote_currency: str = "GBP"
+) -> Tuple[List[Dict[str, Any]], Dict[str, str]]:
+    """
+    Fetch market data for every holding concurrently.
+
+    At most RECOMMENDATIONS_CONCURRENCY assets are fetched at once, each asset gets
+    RECOMMENDATIONS_ASSET_TIMEOUT seconds, and anything still running after
+    RECOMMENDATIONS_DEADLINE seconds is cancelled. Upstream requests run at bulk
+    priority, so they queue behind price lookups when Coinbase rate limits bite.
+
+    Args:
+        portfolio: Holdings as returned by CoinbaseService.get_portfolio
+        fetch: Coroutine function taking a product ID (e.g. 'BTC-GBP') and
+            returning the market data fields for that asset
+        quote_currency: Quote currency of the fetched markets
+
+    Returns:
+        Tuple of (market data for assets that succeeded, error message per failed currency)
+    """
+    async def fetch_holding(holding: Dict[str, Any]) -> Dict[str, Any]:
+        # Format the product ID for fetching market data (e.g., BTC-GBP)
+        product_id = f"{holding['currency']}-{quote_currency}"
+        return {"currency": holding["currency"], **await fetch(product_id)}
+
+    with upstream_priority(Priority.BULK):
+        results = await gather_bounded(
+            portfolio,
+            fetch_holding,
+            limit=env_int("RECOMMENDATIONS_CONCURRENCY", 8),
+            item_timeout=env_float("RECOMMENDATIONS_ASSET_TIMEOUT", 10.0),
+            deadline=env_float("RECOMMENDATIONS_DEADLINE", 25.0)
+        )
+
+    market_data = []
+    errors = {}
+    for holding, result in zip(portfolio, results):
+        currency = holding["currency"]
+        if isinstance(result, DeadlineExceeded):
+            errors[currency] = "Request deadline exceeded before market data arrived"
+        elif isinstance(result, asyncio.TimeoutError):
+            errors[currency] = "Timed out fetching market data"
+        elif isinstance(result, Exception):
+            errors[currency] = f"Failed to fetch market data: {result}"
+        else:
+            market_data.append(result)
+            continue
+        logging.error(f"Error fetching market data for {currency}: {errors[currency]}")
+
+    return market_data, errors
+
+async def _historical_fields(coinbase_service: CoinbaseService, product_id: str) -> Dict[str, Any]:
+    """Fetch the market data fields used by the recommendations endpoint."""
+    return {"data": await coinbase_service.get_historical_data(product_id)}
+
+async def _analysis_fields(coinbase_service: CoinbaseService, product_id: str) -> Dict[str, Any]:
+    """Fetch current price and historical data for an asset concurrently."""
+    price_data, historical_data = await asyncio.gather(
+        coinbase_service.get_crypto_price(product_id),
+        coinbase_service.get_historical_data(product_id)
+    )
+    return {"current_price": price_data, "historical_data": historical_data}
 
 @router.get("/")
-async def get_recommendations() -> Dict[str, str]:
+async def get_recommendations(
+    coinbase_service: CoinbaseService = Depends(get_coinbase_service),
+    ai_service: AIService = Depends(get_ai_service)
+) -> Dict[str, Any]:
     """
     Fetches cryptocurrency recommendations.
 
     Returns:
-        A dictionary containing AI-generated recommendations based on the user's portfolio and market data.
+        A dictionary containing AI-generated recommendations based on the user's portfolio and market data,
+        plus an "errors" mapping of currencies whose market data could not be fetched.
 
     Raises:
         HTTPException: If there is an error in generating recommendations.
@@ -28,45 +103,36 @@ async def get_recommendations() -> Dict[str, str]:
         if not portfolio:
             return {"recommendations": "No cryptocurrency holdings found in your portfolio."}
 
-        # Initialize a list to store market data for each asset in the portfolio.
-        market_data = []
-
-        for holding in portfolio:
-            try:
-                # Format the product ID for fetching market data
-                product_id = f"{holding['currency']}-GBP"
-                # Fetch historical data for the asset
-                data = await coinbase_service.get_historical_data(product_id)
-                # Append the fetched data to the market_data list
-                market_data.append({
-                    "currency": holding["currency"],
-                    "data": data
-                })
-            except Exception as e:
-                logging.error(f"Error fetching data for {holding['currency']}: {e}")
-                continue
+        # Fetch historical data for every asset concurrently.
+        market_data, errors = await _gather_market_data(
+            portfolio, partial(_historical_fields, coinbase_service), coinbase_service.market_quote
+        )
 
         if not market_data:
-            return {"recommendations": "Unable to fetch market data for your holdings."}
+            return {"recommendations": "Unable to fetch market data for your holdings.", "errors": errors}
 
         # Get AI-based recommendations using the portfolio and market data.
         recommendations = await ai_service.get_recommendations(portfolio, market_data)
 
         # Return the recommendations as a JSON response.
-        return {"recommendations": recommendations}
+        return {"recommendations": recommendations, "errors": errors}
 
     except Exception as e:
         logging.error(f"Error generating recommendations: {e}")
         raise HTTPException(status_code=500, detail="Failed to generate recommendations")
 
 @router.get("/analysis")
-async def get_analysis() -> Dict[str, Any]:
+async def get_analysis(
+    coinbase_service: CoinbaseService = Depends(get_coinbase_service),
+    ai_service: AIService = Depends(get_ai_service)
+) -> Dict[str, Any]:
     """
     Fetches detailed cryptocurrency analysis and recommendations.
 
     Returns:
         A dictionary containing AI-generated recommendations based on the user's portfolio,
-        current prices, and historical market data.
+        current prices, and historical market data, plus an "errors" mapping of
+        currencies whose market data could not be fetched.
 
     Raises:
         HTTPException: If there is an error in generating recommendations.
@@ -77,36 +143,98 @@ async def get_analysis() -> Dict[str, Any]:
         if not portfolio:
             return {"recommendations": "No cryptocurrency holdings found in your portfolio."}
 
-        # Initialize a list to store market data for each asset in the portfolio.
-        market_data = []
-
-        for account in portfolio:
-            try:
-                # Format the product ID for fetching market data (e.g., BTC-GBP)
-                product_id = f"{account['currency']}-GBP"
-                # Fetch current price and historical data for the asset
-                price_data = await coinbase_service.get_crypto_price(product_id)
-                historical_data = await coinbase_service.get_historical_data(product_id)
-
-                # Append the fetched data to the market_data list
-                market_data.append({
-                    "currency": account["currency"],
-                    "current_price": price_data,
-                    "historical_data": historical_data
-                })
-            except Exception as e:
-                logging.error(f"Error fetching market data for {product_id}: {e}")
-                continue
+        # Fetch current price and historical data for every asset concurrently.
+        market_data, errors = await _gather_market_data(
+            portfolio, partial(_analysis_fields, coinbase_service), coinbase_service.market_quote
+        )
 
         if not market_data:
-            return {"recommendations": "Unable to fetch market data for your holdings."}
+            return {"recommendations": "Unable to fetch market data for your holdings.", "errors": errors}
 
         # Get AI-based recommendations using the portfolio and market data.
         recommendations = await ai_service.get_recommendations(portfolio, market_data)
 
         # Return the recommendations as a JSON response.
-        return {"recommendations": recommendations}
+        return {"recommendations": recommendations, "errors": errors}
 
     except Exception as e:
         logging.error(f"Error generating recommendations: {e}")
-        raise HTTPException(status_code=500, detail="Failed to generate recommendations")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail="Failed to generate recommendations")
+
+
+def _sse(event: str, data: Dict[str, Any]) -> str:
+    """Format a Server-Sent Event."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@router.get("/stream")
+async def stream_recommendations(
+    request: Request,
+    analysis: bool = False,
+    coinbase_service: CoinbaseService = Depends(get_coinbase_service),
+    ai_service: AIService = Depends(get_ai_service)
+) -> StreamingResponse:
+    """
+    Streams cryptocurrency recommendations as Server-Sent Events while they are generated.
+
+    Events, in order:
+        "meta": {"errors": {...}} once market data has been gathered
+        "token": {"text": str} for each piece of generated text
+        "done": {} when generation has finished, or "error": {"detail": str} on failure
+
+    If the client disconnects, generation stops before the next piece of text and
+    the upstream OpenAI stream is closed.
+
+    Args:
+        analysis: Use current prices and historical data per asset, as /analysis does
+
+    Returns:
+        A text/event-stream response.
+    """
+    async def events() -> AsyncIterator[str]:
+        try:
+            # Get portfolio data from the Coinbase service.
+            portfolio = await coinbase_service.get_portfolio()
+            if not portfolio:
+                yield _sse("token", {"text": "No cryptocurrency holdings found in your portfolio."})
+                yield _sse("done", {})
+                return
+
+            market_data, errors = await _gather_market_data(
+                portfolio, partial(_analysis_fields if analysis else _historical_fields, coinbase_service),
+                coinbase_service.market_quote
+            )
+            yield _sse("meta", {"errors": errors})
+            if not market_data:
+                yield _sse("token", {"text": "Unable to fetch market data for your holdings."})
+                yield _sse("done", {})
+                return
+
+            # Forward generated text as soon as it arrives. The upstream stream is
+            # closed here, not whenever this generator is garbage-collected.
+            stream = ai_service.stream_recommendations(portfolio, market_data)
+            try:
+                async for text in stream:
+                    if await request.is_disconnected():
+                        logging.info("Client disconnected, stopping recommendations stream")
+                        return
+                    yield _sse("token", {"text": text})
+            finally:
+                await stream.aclose()
+            yield _sse("done", {})
+
+        except Exception as e:
+            logging.error(f"Error streaming recommendations: {e}")
+            yield _sse("error", {"detail": "Failed to generate recommendations"})
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+@router.get("/cache/stats")
+async def get_cache_stats(ai_service: AIService = Depends(get_ai_service)) -> Dict[str, Any]:
+    """
+    Reports recommendation cache usage.
+
+    Returns:
+        A dictionary with hit, miss and coalesced counters, hit ratio, entry count and
+        the number of OpenAI calls saved by the cache.
+    """
+    return {"recommendations": ai_service.cache_stats()}
@@ -3,11 +3,17 @@ AI service module for generating cryptocurrency trading recommendations.
 Uses OpenAI's GPT models to analyze portfolio and market data.
 """
 
-from typing import Dict, List, Any
+from typing import AsyncIterator, Dict, List, Any, Optional
+import hashlib
+import json
+import math
 import os
 import logging
-from openai import AsyncOpenAI
-from dotenv import load_dotenv
+from .cache import MISSING, TTLCache
+from .shared_cache import get_shared_backend
+from .prompt_builder import build_prompt, estimate_tokens
+from ..config import env_float, env_int, env_list, load_env
+from ..metrics import record_token_usage, track_upstream
 
 class AIService:
     """
@@ -32,7 +38,7 @@ class AIService:
         if hasattr(self, 'initialized'):
             return
             
-        load_dotenv()
+        load_env()
         self.api_key = os.getenv("OPENAI_API_KEY")
         self.enable_ai_recommendations = os.getenv("ENABLE_AI_RECOMMENDATIONS", "true").lower() == "true"
         
@@ -41,18 +47,93 @@ class AIService:
             self.client = None
         else:
             try:
+                # Imported on first use: the SDK takes most of a second to import
+                from openai import AsyncOpenAI
                 self.client = AsyncOpenAI(api_key=self.api_key)
                 logging.info("Successfully initialized OpenAI client")
             except Exception as e:
                 logging.error(f"Failed to initialize OpenAI client: {e}")
                 self.client = None
+
+        # Recommendations for an unchanged portfolio and market picture are reused
+        self.recommendation_cache = TTLCache(max_entries=env_int("RECOMMENDATIONS_CACHE_MAX_ENTRIES", 64),
+                                             name="recommendations", shared=get_shared_backend())
+        self.recommendation_cache_ttl = env_float("RECOMMENDATIONS_CACHE_TTL", 600.0)
+        self.price_tolerance = env_float("RECOMMENDATIONS_PRICE_TOLERANCE", 0.01)
+        self.prompt_token_budget = env_int("RECOMMENDATIONS_PROMPT_TOKEN_BUDGET", 1500)
+        # Market data is fetched in this currency (see CoinbaseService.market_quote)
+        self.quote_currency = env_list("MARKET_QUOTE_CURRENCY", "GBP")[0].upper()
         
         self.initialized = True
 
+    def _latest_price(self, asset: Dict[str, Any]) -> Optional[float]:
+        """
+        Extract the most recent price from an asset's market data.
+        Uses the current price when present, otherwise the close of the newest candle.
+        """
+        try:
+            current = asset.get("current_price")
+            if isinstance(current, dict) and current.get("price") is not None:
+                return float(current["price"])
+            candles = asset.get("historical_data") or asset.get("data") or []
+            return float(candles[0]["close"]) if candles else None
+        except (KeyError, TypeError, ValueError):
+            return None
+
+    def _price_bucket(self, price: Optional[float]) -> Optional[float]:
+        """
+        Quantize a price so moves smaller than RECOMMENDATIONS_PRICE_TOLERANCE
+        (relative, e.g. 0.01 for 1%) usually map to the same bucket.
+        A tolerance of 0 keys on the exact price.
+        """
+        if price is None:
+            return None
+        if price <= 0 or self.price_tolerance <= 0:
+            return round(price, 8)
+        return math.floor(math.log(price) / math.log1p(self.price_tolerance))
+
+    def fingerprint(self, portfolio: List[Dict[str, Any]], market_data: List[Dict[str, Any]]) -> str:
+        """
+        Build a stable cache key for a portfolio and market picture.
+        Holdings are keyed by currency and balance; market data is reduced to the
+        quantized latest price per asset plus which fields were supplied, so the
+        /recommendations and /analysis prompts are cached separately.
+        
+        Returns:
+            Hex SHA-256 digest
+        """
+        summary = {
+            "portfolio": sorted((h.get("currency"), str(h.get("balance"))) for h in portfolio),
+            "market": sorted(
+                (str(asset.get("currency")), sorted(asset), self._price_bucket(self._latest_price(asset)))
+                for asset in market_data
+            ),
+        }
+        return hashlib.sha256(json.dumps(summary, sort_keys=True).encode()).hexdigest()
+
+    def cache_stats(self) -> Dict[str, Any]:
+        """
+        Report recommendation cache usage.
+        
+        Returns:
+            Dictionary with hit/miss counters, hit ratio, entry count and
+            "saved_calls": LLM calls avoided by cache hits and coalesced requests
+        """
+        stats = self.recommendation_cache.stats
+        return {
+            **stats.as_dict(),
+            "entries": len(self.recommendation_cache),
+            "saved_calls": stats.hits + stats.coalesced,
+        }
+
     async def get_recommendations(self, portfolio: List[Dict[str, Any]], market_data: List[Dict[str, Any]]) -> str:
         """
         Generate cryptocurrency trading recommendations based on portfolio and market data.
         
+        Results are cached for RECOMMENDATIONS_CACHE_TTL seconds under a fingerprint of
+        the portfolio and quantized prices (see fingerprint); concurrent requests with
+        the same fingerprint share one OpenAI call. Failures are not cached.
+        
         Args:
             portfolio: List of dictionaries containing current holdings
             market_data: List of dictionaries containing price and historical data
@@ -67,35 +148,102 @@ class AIService:
             return "AI recommendations are not available. Please check your OPENAI_API_KEY configuration."
 
         try:
-            prompt = f"""As a cryptocurrency expert analyst, provide specific buy, sell, or hold recommendations based on the following portfolio and market data:
+            return await self.recommendation_cache.get_or_load(
+                self.fingerprint(portfolio, market_data),
+                lambda: self._generate_recommendations(portfolio, market_data),
+                ttl=self.recommendation_cache_ttl
+            )
+        except Exception as e:
+            logging.error(f"OpenAI API error: {e}")
+            return "Unable to generate recommendations at this time. Please try again later."
+
+    def _messages(self, portfolio: List[Dict[str, Any]], market_data: List[Dict[str, Any]]) -> List[Dict[str, str]]:
+        """Build the chat messages for a recommendations request."""
+        prompt = build_prompt(portfolio, market_data, self.prompt_token_budget, self.quote_currency)
+        logging.debug(f"Recommendation prompt: ~{estimate_tokens(prompt)} tokens for {len(portfolio)} holdings")
+        return [
+            {
+                "role": "system",
+                "content": "You are an expert cryptocurrency analyst with deep knowledge of market trends, technical analysis, and risk management."
+            },
+            {
+                "role": "user",
+                "content": prompt
+            }
+        ]
+
+    async def stream_recommendations(self, portfolio: List[Dict[str, Any]], market_data: List[Dict[str, Any]]) -> AsyncIterator[str]:
+        """
+        Generate recommendations, yielding text as OpenAI produces it.
+        
+        A cached answer for the same fingerprint is yielded in one piece. A stream
+        read to the end is cached like get_recommendations results. If the caller
+        stops iterating (e.g. the client disconnected), the upstream stream is closed.
+        
+        Args:
+            portfolio: List of dictionaries containing current holdings
+            market_data: List of dictionaries containing price and historical data
+        
+        Yields:
+            Pieces of the recommendations text
+        
+        Raises:
+            Exception: If the OpenAI request fails
+        """
+        if not self.enable_ai_recommendations:
+            yield "AI recommendations are disabled. Please enable them in the .env file."
+            return
 
-Portfolio: {portfolio}
-Recent Market Data: {market_data}
+        if not self.client:
+            yield "AI recommendations are not available. Please check your OPENAI_API_KEY configuration."
+            return
 
-Please analyze the current market conditions, trends, and portfolio composition to provide:
-1. Specific recommendations for each holding
-2. Potential new investments to consider
-3. Risk assessment
-4. Market trend analysis
+        key = self.fingerprint(portfolio, market_data)
+        cached = await self.recommendation_cache.lookup(key)
+        if cached is not MISSING:
+            yield cached
+            return
 
-Provide concise, actionable insights."""
+        parts = []
+        # Only OpenAI's time is recorded, not the pauses while the caller handles each piece
+        with track_upstream("openai_chat") as upstream:
+            stream = await self.client.chat.completions.create(
+                model="gpt-4.1",
+                messages=self._messages(portfolio, market_data),
+                temperature=0.7,
+                max_tokens=1000,
+                stream=True,
+                # The final chunk then carries token usage (with no choices)
+                stream_options={"include_usage": True}
+            )
+            try:
+                async for chunk in stream:
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        parts.append(chunk.choices[0].delta.content)
+                        with upstream.paused():
+                            yield chunk.choices[0].delta.content
+                    record_token_usage(getattr(chunk, "usage", None))
+            finally:
+                # Releases the upstream connection, ending generation if it is still running
+                await stream.close()
+        await self.recommendation_cache.put(key, "".join(parts), self.recommendation_cache_ttl)
 
+    async def _generate_recommendations(self, portfolio: List[Dict[str, Any]], market_data: List[Dict[str, Any]]) -> str:
+        """
+        Ask OpenAI for recommendations.
+        
+        Returns:
+            String containing newline-separated recommendations
+        
+        Raises:
+            Exception: If the OpenAI request fails
+        """
+        with track_upstream("openai_chat"):
             response = await self.client.chat.completions.create(
                 model="gpt-4.1",
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "You are an expert cryptocurrency analyst with deep knowledge of market trends, technical analysis, and risk management."
-                    },
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ],
+                messages=self._messages(portfolio, market_data),
                 temperature=0.7,
                 max_tokens=1000
             )
-            return response.choices[0].message.content
-        except Exception as e:
-            logging.error(f"OpenAI API error: {e}")
-            return "Unable to generate recommendations at this time. Please try again later."
\ No newline at end of file
+        record_token_usage(getattr(response, "usage", None))
+        return response.choices[0].message.content
\ No newline at end of file
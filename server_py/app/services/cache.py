@@ -0,0 +1,425 @@
+"""
+In-process caching primitives.
+Provides a TTL cache with LRU eviction, an optional memory bound and single-flight
+loading, so concurrent misses for the same key share one upstream fetch. A cache
+can sit in front of a shared backend (see shared_cache), extending single-flight
+loading across worker processes. Expired entries can be kept for a while and
+served stale while they are refreshed in the background.
+"""
+
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple, Union
+import asyncio
+import logging
+import sys
+import time
+import weakref
+from ..metrics import registry
+from .shared_cache import JSON_CODEC, Codec, SharedCacheBackend, SharedCacheError
+
+# Sentinel returned by TTLCache.get for missing or expired keys
+MISSING = object()
+
+# Namespace of keys written to a shared backend
+SHARED_KEY_PREFIX = "crypto-viewer"
+
+# Caches given a name, reported on the metrics endpoint
+_named_caches: "weakref.WeakValueDictionary[str, TTLCache]" = weakref.WeakValueDictionary()
+
+
+def estimate_size(value: Any) -> int:
+    """
+    Roughly estimate the memory footprint of a value in bytes.
+    Walks lists, tuples and dicts one level deep, which covers the JSON-like
+    payloads cached by the services.
+    """
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(sys.getsizeof(k) + sys.getsizeof(v) for k, v in value.items())
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            size += sys.getsizeof(item)
+            if isinstance(item, dict):
+                size += sum(sys.getsizeof(k) + sys.getsizeof(v) for k, v in item.items())
+    return size
+
+
+class CacheStats:
+    """Counters describing how a cache is being used."""
+
+    __slots__ = ("hits", "misses", "coalesced", "loads", "errors", "evictions", "shared_hits", "shared_errors",
+                 "stale")
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.loads = 0
+        self.errors = 0
+        self.evictions = 0
+        self.shared_hits = 0
+        self.shared_errors = 0
+        self.stale = 0
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Return the counters plus the hit ratio as a dictionary."""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "loads": self.loads,
+            "errors": self.errors,
+            "evictions": self.evictions,
+            "shared_hits": self.shared_hits,
+            "shared_errors": self.shared_errors,
+            "stale": self.stale,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+class TTLCache:
+    """
+    Time-to-live cache with LRU eviction and single-flight loading.
+
+    Entries expire after their TTL. When the cache exceeds `max_entries` or
+    `max_bytes` the least recently used entries are evicted. `get_or_load`
+    coalesces concurrent misses for the same key into one loader call.
+
+    With a shared backend, local misses are looked up there before loading, and
+    loaded values are published for other workers. Only the worker holding the
+    key's lock in the backend runs the loader; the others wait for its result.
+
+    With a `stale_ttl`, expired entries are kept that much longer as last known
+    good values for `get_or_revalidate`.
+    """
+
+    def __init__(self, max_entries: int = 256, max_bytes: Optional[int] = None,
+                 sizeof: Callable[[Any], int] = estimate_size, name: Optional[str] = None,
+                 shared: Optional[SharedCacheBackend] = None, codec: Codec = JSON_CODEC,
+                 shared_poll_interval: float = 0.05, stale_ttl: float = 0.0,
+                 revalidate_timeout: Optional[float] = None):
+        """
+        Args:
+            max_entries: Maximum number of cached keys
+            max_bytes: Optional bound on the estimated size of all cached values
+            sizeof: Function estimating the size of a value in bytes
+            name: Label for the cache's metrics; unnamed caches are not reported
+            shared: Backend shared with other workers (requires a name, used as key namespace)
+            codec: Converts values to and from bytes for the shared backend (default: JSON)
+            shared_poll_interval: Seconds between checks while another worker loads a key
+            stale_ttl: Seconds an expired entry can still be served by get_or_revalidate
+            revalidate_timeout: Longest get_or_revalidate waits on a refresh before
+                serving the stale value (default: wait for the refresh)
+
+        Raises:
+            ValueError: If a shared backend is given without a name
+        """
+        if shared is not None and name is None:
+            raise ValueError("A cache with a shared backend needs a name")
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self.name = name
+        self.shared = shared
+        self.codec = codec
+        self.shared_poll_interval = shared_poll_interval
+        self.stale_ttl = stale_ttl
+        self.revalidate_timeout = revalidate_timeout
+        self.stats = CacheStats()
+        # key -> (value, expires at, estimated size, stored at)
+        self._entries: "OrderedDict[Hashable, Tuple[Any, float, int, float]]" = OrderedDict()
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        self._bytes = 0
+        if name is not None:
+            _named_caches[name] = self
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def size_bytes(self) -> int:
+        """Estimated size of all cached values in bytes."""
+        return self._bytes
+
+    def get(self, key: Hashable) -> Any:
+        """
+        Look up a key without recording hit/miss statistics.
+
+        Returns:
+            The cached value, or MISSING if absent or expired
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            return MISSING
+        value, expires_at, _, _ = entry
+        now = time.monotonic()
+        if expires_at <= now:
+            # Expired entries are kept within the stale window for get_or_revalidate
+            if expires_at + self.stale_ttl <= now:
+                self._remove(key)
+            return MISSING
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: float) -> None:
+        """
+        Store a value for `ttl` seconds, evicting least recently used entries if needed.
+        Values with a non-positive TTL are not stored.
+        """
+        if ttl <= 0:
+            return
+        self._remove(key)
+        size = self.sizeof(value) if self.max_bytes is not None else 0
+        if self.max_bytes is not None and size > self.max_bytes:
+            return
+        now = time.monotonic()
+        self._entries[key] = (value, now + ttl, size, now)
+        self._bytes += size
+        while self._entries and (
+            len(self._entries) > self.max_entries
+            or (self.max_bytes is not None and self._bytes > self.max_bytes)
+        ):
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.stats.evictions += 1
+
+    def items(self) -> List[Tuple[Hashable, Any]]:
+        """Return the fresh entries as (key, value) pairs, without touching LRU order or statistics."""
+        now = time.monotonic()
+        return [(key, entry[0]) for key, entry in self._entries.items() if entry[1] > now]
+
+    async def lookup(self, key: Hashable) -> Any:
+        """
+        Look up a key locally, then in the shared backend, without loading it.
+        A backend failure counts as a miss.
+
+        Returns:
+            The cached value, or MISSING if absent or expired
+        """
+        value = self.get(key)
+        if value is MISSING and self.shared is not None:
+            try:
+                value = await self._shared_get(key)
+            except SharedCacheError as e:
+                self._shared_failed(e)
+        return value
+
+    async def put(self, key: Hashable, value: Any, ttl: float) -> None:
+        """Store a value locally and publish it to the shared backend, if any."""
+        self.set(key, value, ttl)
+        if self.shared is not None and ttl > 0:
+            try:
+                await self.shared.set(self._shared_key(key), self.codec.dumps(value), ttl)
+            except SharedCacheError as e:
+                self._shared_failed(e)
+
+    def invalidate(self, key: Hashable) -> None:
+        """Drop a key from the cache if present."""
+        self._remove(key)
+
+    def clear(self) -> None:
+        """Drop all entries and reset the statistics."""
+        self._entries.clear()
+        self._bytes = 0
+        self.stats = CacheStats()
+
+    async def get_or_load(self, key: Hashable, loader: Callable[[], Awaitable[Any]],
+                          ttl: Union[float, Callable[[Any], float]]) -> Any:
+        """
+        Return the cached value for a key, loading it on a miss.
+
+        Concurrent callers that miss on the same key wait for a single loader call.
+        The load runs as its own task, so cancelling one waiting caller does not
+        abort the fetch for the others. Failed loads are not cached.
+
+        Args:
+            key: Cache key
+            loader: Coroutine function producing the value
+            ttl: Seconds to keep the value, or a function of the loaded value returning it
+
+        Returns:
+            The cached or freshly loaded value
+        """
+        value = self.get(key)
+        if value is not MISSING:
+            self.stats.hits += 1
+            return value
+
+        self.stats.misses += 1
+        if key in self._inflight:
+            self.stats.coalesced += 1
+        return await asyncio.shield(self._start_load(key, loader, ttl))
+
+    async def get_or_revalidate(self, key: Hashable, loader: Callable[[], Awaitable[Any]],
+                                ttl: Union[float, Callable[[Any], float]],
+                                available: Optional[Callable[[], bool]] = None) -> Tuple[Any, Optional[float]]:
+        """
+        Return the cached value for a key, serving the last known good value while
+        it is refreshed.
+
+        Fresh values and keys without a usable entry behave as in get_or_load. An
+        expired entry still within `stale_ttl` is returned at once, with its age,
+        if a refresh of the key is already in flight or `available` reports the
+        upstream unavailable; a refresh is started in the background either way.
+        Otherwise the caller waits up to `revalidate_timeout` for the refresh and
+        gets the stale value if it takes longer or fails.
+
+        Args:
+            key: Cache key
+            loader: Coroutine function producing the value
+            ttl: Seconds to keep the value, or a function of the loaded value returning it
+            available: Returns False when the loader is known to fail or stall
+                (e.g. its upstream's circuit is open)
+
+        Returns:
+            Tuple of (value, seconds since the value was cached if stale else None)
+        """
+        value = self.get(key)
+        if value is not MISSING:
+            self.stats.hits += 1
+            return value, None
+        entry = self._entries.get(key)
+        if entry is None:
+            return await self.get_or_load(key, loader, ttl), None
+
+        stale, _, _, stored_at = entry
+        refreshing = key in self._inflight
+        task = self._start_load(key, loader, ttl)
+        if not refreshing and (available is None or available()):
+            try:
+                return await asyncio.wait_for(asyncio.shield(task), self.revalidate_timeout), None
+            except asyncio.TimeoutError:
+                logging.debug("Refresh of %s %r is slow, serving the stale value", self.name, key)
+            except Exception as e:
+                logging.warning(f"Refresh of {self.name} {key!r} failed, serving the stale value: {e}")
+        self.stats.stale += 1
+        return stale, time.monotonic() - stored_at
+
+    def _start_load(self, key: Hashable, loader: Callable[[], Awaitable[Any]],
+                    ttl: Union[float, Callable[[Any], float]]) -> asyncio.Task:
+        """Return the in-flight load of a key, starting one if there is none."""
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._load(key, loader, ttl))
+            # Mark the outcome as retrieved even if every waiting caller was cancelled
+            task.add_done_callback(lambda t: t.cancelled() or t.exception())
+            self._inflight[key] = task
+        return task
+
+    async def _load(self, key: Hashable, loader: Callable[[], Awaitable[Any]],
+                    ttl: Union[float, Callable[[Any], float]]) -> Any:
+        """Run the loader for a key and cache its result."""
+        try:
+            if self.shared is not None:
+                return await self._load_shared(key, loader, ttl)
+            self.stats.loads += 1
+            value = await loader()
+            self.set(key, value, ttl(value) if callable(ttl) else ttl)
+            return value
+        except BaseException:
+            self.stats.errors += 1
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+    async def _load_shared(self, key: Hashable, loader: Callable[[], Awaitable[Any]],
+                           ttl: Union[float, Callable[[Any], float]]) -> Any:
+        """
+        Load a key through the shared backend.
+
+        A value another worker published is used until its remaining TTL runs
+        out. Otherwise the worker that takes the key's lock runs the loader and
+        publishes the result while the others poll for it. If nothing is
+        published before the lock expires (its holder failed or died), or the
+        backend is unavailable, the value is loaded locally.
+        """
+        lock_key = f"{self._shared_key(key)}:lock"
+        token = None
+        try:
+            try:
+                deadline = time.monotonic() + self.shared.lock_ttl
+                while True:
+                    value = await self._shared_get(key)
+                    if value is not MISSING:
+                        return value
+                    if token is not None or time.monotonic() >= deadline:
+                        break
+                    token = await self.shared.acquire(lock_key, self.shared.lock_ttl)
+                    # With the lock taken, check once more in case its previous holder just published
+                    if token is None:
+                        await asyncio.sleep(self.shared_poll_interval)
+            except SharedCacheError as e:
+                self._shared_failed(e)
+
+            self.stats.loads += 1
+            value = await loader()
+            await self.put(key, value, ttl(value) if callable(ttl) else ttl)
+            return value
+        finally:
+            if token is not None:
+                try:
+                    await self.shared.release(lock_key, token)
+                except SharedCacheError as e:
+                    self._shared_failed(e)
+
+    async def _shared_get(self, key: Hashable) -> Any:
+        """
+        Read a key from the shared backend and keep it locally for its remaining TTL.
+
+        Raises:
+            SharedCacheError: If the backend fails or the stored value cannot be decoded
+        """
+        found = await self.shared.get(self._shared_key(key))
+        if found is None:
+            return MISSING
+        data, remaining = found
+        try:
+            value = self.codec.loads(data)
+        except Exception as e:
+            raise SharedCacheError(f"Undecodable shared value for {key!r}: {e}") from e
+        self.stats.shared_hits += 1
+        self.set(key, value, remaining)
+        return value
+
+    def _shared_key(self, key: Hashable) -> str:
+        """Build the backend key: namespace, cache name and the parts of the local key."""
+        parts = key if isinstance(key, tuple) else (key,)
+        return ":".join([SHARED_KEY_PREFIX, self.name, *map(str, parts)])
+
+    def _shared_failed(self, error: SharedCacheError) -> None:
+        """Record a shared backend failure; the cache keeps working locally."""
+        self.stats.shared_errors += 1
+        logging.warning(f"Shared cache backend failed for cache {self.name}: {error}")
+
+    def _remove(self, key: Hashable) -> None:
+        """Remove a key and update the size accounting."""
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry[2]
+
+
+def _collect_cache_metrics():
+    """Report hit, miss and size figures of named caches at scrape time."""
+    caches = sorted(_named_caches.items())
+    counters = [
+        ("cache_hits_total", "Cache lookups answered from the cache", "hits"),
+        ("cache_misses_total", "Cache lookups that required a load", "misses"),
+        ("cache_coalesced_total", "Misses that waited for a load already in progress", "coalesced"),
+        ("cache_evictions_total", "Entries evicted to stay within the cache bounds", "evictions"),
+        ("cache_shared_hits_total", "Misses answered by the cache shared between workers", "shared_hits"),
+        ("cache_shared_errors_total", "Failed operations on the shared cache backend", "shared_errors"),
+        ("cache_stale_total", "Expired values served while being refreshed", "stale"),
+    ]
+    families = [
+        (metric, "counter", help, [({"cache": name}, "", getattr(cache.stats, field)) for name, cache in caches])
+        for metric, help, field in counters
+    ]
+    families.append(("cache_entries", "gauge", "Entries currently cached",
+                     [({"cache": name}, "", len(cache)) for name, cache in caches]))
+    families.append(("cache_size_bytes", "gauge", "Estimated size of cached values (bounded caches only)",
+                     [({"cache": name}, "", cache.size_bytes) for name, cache in caches]))
+    return families
+
+
+registry.add_collector(_collect_cache_metrics)
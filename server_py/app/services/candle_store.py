@@ -0,0 +1,237 @@
+"""
+Persistent candle store.
+Keeps fetched candles in a local SQLite database so restarts do not lose history
+and only candles newer than what is already on disk are requested from Coinbase.
+"""
+
+from typing import Dict, Optional, Tuple
+import asyncio
+import logging
+import os
+import sqlite3
+import threading
+import time
+from .candles import CandleSeries
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS candles (
+    product_id TEXT NOT NULL,
+    granularity INTEGER NOT NULL,
+    time INTEGER NOT NULL,
+    low REAL NOT NULL,
+    high REAL NOT NULL,
+    open REAL NOT NULL,
+    close REAL NOT NULL,
+    volume REAL NOT NULL,
+    PRIMARY KEY (product_id, granularity, time)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS coverage (
+    product_id TEXT NOT NULL,
+    granularity INTEGER NOT NULL,
+    start INTEGER NOT NULL,
+    end INTEGER NOT NULL,
+    fetched_at REAL NOT NULL,
+    PRIMARY KEY (product_id, granularity)
+);
+"""
+
+
+class CandleStore:
+    """
+    SQLite-backed candle history per product and granularity.
+
+    Alongside the candles, each (product, granularity) pair records one contiguous
+    coverage range: the span of closed candles known to be complete on disk.
+    Candles inside it never need to be fetched again; the in-progress candle is
+    stored but never counted as covered.
+
+    All public coroutines run the blocking SQLite calls on a worker thread.
+    """
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path: Database file path; parent directories are created on open
+        """
+        self.path = path
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    def _open(self) -> None:
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        # auto_vacuum only takes effect before the first table is created
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA synchronous = NORMAL")
+        conn.executescript(_SCHEMA)
+        self._conn = conn
+
+    async def open(self) -> "CandleStore":
+        """Open (creating if needed) the database."""
+        await asyncio.to_thread(self._open)
+        logging.info(f"Opened candle store {self.path}")
+        return self
+
+    async def close(self) -> None:
+        """Stop maintenance and close the database."""
+        await self.stop_maintenance()
+        if self._conn is not None:
+            with self._lock:
+                self._conn.close()
+            self._conn = None
+
+    def _load(self, product_id: str, granularity: int, start: int, end: int) -> CandleSeries:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT time, low, high, open, close, volume FROM candles "
+                "WHERE product_id = ? AND granularity = ? AND time BETWEEN ? AND ? ORDER BY time",
+                (product_id, granularity, start, end),
+            ).fetchall()
+        return CandleSeries.from_coinbase(rows)
+
+    async def load(self, product_id: str, granularity: int, start: int, end: int) -> CandleSeries:
+        """
+        Read stored candles whose bucket starts between start and end inclusive.
+
+        Returns:
+            Candles oldest first (possibly empty)
+        """
+        return await asyncio.to_thread(self._load, product_id, granularity, start, end)
+
+    def _save(self, product_id: str, granularity: int, candles: CandleSeries,
+              covered: Optional[Tuple[int, int]]) -> None:
+        rows = zip([product_id] * len(candles), [granularity] * len(candles), candles.time.tolist(),
+                   candles.low.tolist(), candles.high.tolist(), candles.open.tolist(),
+                   candles.close.tolist(), candles.volume.tolist())
+        with self._lock, self._conn:
+            self._conn.executemany("INSERT OR REPLACE INTO candles VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            if covered is not None:
+                self._extend_coverage(product_id, granularity, *covered)
+            else:
+                self._conn.execute(
+                    "UPDATE coverage SET fetched_at = ? WHERE product_id = ? AND granularity = ?",
+                    (time.time(), product_id, granularity),
+                )
+
+    def _extend_coverage(self, product_id: str, granularity: int, start: int, end: int) -> None:
+        """
+        Merge a newly completed range into the stored coverage.
+        Overlapping or adjacent ranges are joined; otherwise the more recent one is kept.
+        """
+        row = self._conn.execute(
+            "SELECT start, end FROM coverage WHERE product_id = ? AND granularity = ?",
+            (product_id, granularity),
+        ).fetchone()
+        if row is not None:
+            covered_start, covered_end = row
+            if start <= covered_end + granularity and end >= covered_start - granularity:
+                start, end = min(start, covered_start), max(end, covered_end)
+            elif end < covered_start:
+                start, end = covered_start, covered_end
+        self._conn.execute(
+            "INSERT OR REPLACE INTO coverage VALUES (?, ?, ?, ?, ?)",
+            (product_id, granularity, start, end, time.time()),
+        )
+
+    async def save(self, product_id: str, granularity: int, candles: CandleSeries,
+                   covered: Optional[Tuple[int, int]] = None) -> None:
+        """
+        Store candles, replacing existing ones for the same buckets.
+
+        Args:
+            product_id: Trading pair identifier
+            granularity: Candle width in seconds
+            candles: Candles to store
+            covered: Range (first, last bucket start) now complete on disk, if any
+        """
+        await asyncio.to_thread(self._save, product_id, granularity, candles, covered)
+
+    def _coverage(self, product_id: str, granularity: int) -> Optional[Tuple[int, int]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT start, end FROM coverage WHERE product_id = ? AND granularity = ?",
+                (product_id, granularity),
+            ).fetchone()
+        return tuple(row) if row is not None else None
+
+    async def coverage(self, product_id: str, granularity: int) -> Optional[Tuple[int, int]]:
+        """Return the (first, last) bucket start known to be complete on disk, or None."""
+        return await asyncio.to_thread(self._coverage, product_id, granularity)
+
+    def _recent(self, granularity: int, since: int) -> Dict[str, Tuple[CandleSeries, float]]:
+        with self._lock:
+            products = self._conn.execute(
+                "SELECT product_id, fetched_at FROM coverage WHERE granularity = ? AND end >= ?",
+                (granularity, since),
+            ).fetchall()
+        recent = {}
+        for product_id, fetched_at in products:
+            recent[product_id] = (self._load(product_id, granularity, since, 2 ** 62), fetched_at)
+        return recent
+
+    async def recent(self, granularity: int, since: int) -> Dict[str, Tuple[CandleSeries, float]]:
+        """
+        Read recent candles for every product with coverage reaching `since`.
+        Used to warm in-memory stores on startup.
+
+        Returns:
+            Dictionary mapping product ID to (candles oldest first, Unix time of last fetch)
+        """
+        return await asyncio.to_thread(self._recent, granularity, since)
+
+    def _compact(self, retention: float) -> int:
+        cutoff = int(time.time() - retention)
+        with self._lock:
+            with self._conn:
+                deleted = self._conn.execute("DELETE FROM candles WHERE time < ?", (cutoff,)).rowcount
+                self._conn.execute("DELETE FROM coverage WHERE end < ?", (cutoff,))
+                self._conn.execute("UPDATE coverage SET start = ? WHERE start < ?", (cutoff, cutoff))
+            # Return pages freed by the deletes to the file system and fold the WAL back
+            self._conn.execute("PRAGMA incremental_vacuum").fetchall()
+            self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        return deleted
+
+    async def compact(self, retention: float) -> int:
+        """
+        Apply the retention policy and shrink the database file.
+
+        Args:
+            retention: Seconds of history to keep
+
+        Returns:
+            Number of candles deleted
+        """
+        deleted = await asyncio.to_thread(self._compact, retention)
+        if deleted:
+            logging.info(f"Candle store compaction removed {deleted} candles older than {retention:.0f}s")
+        return deleted
+
+    def start_maintenance(self, interval: float, retention: float) -> None:
+        """Compact the store now and then every `interval` seconds in the background."""
+        async def run() -> None:
+            while True:
+                try:
+                    await self.compact(retention)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    logging.error(f"Candle store compaction failed: {e}", exc_info=True)
+                await asyncio.sleep(interval)
+
+        if self._task is None:
+            self._task = asyncio.create_task(run())
+
+    async def stop_maintenance(self) -> None:
+        """Cancel the background compaction task."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
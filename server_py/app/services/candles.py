@@ -0,0 +1,204 @@
+"""
+Columnar candle representation.
+Holds OHLCV data as NumPy arrays so indicators and price calculations work on
+numbers directly; the legacy list-of-string-dicts JSON shape is only produced
+when a response is serialized.
+"""
+
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Sequence, Tuple
+import json
+import numpy as np
+
+# Bytes per candle: int64 time plus five float64 columns
+CANDLE_BYTES = 6 * 8
+
+# Most candles Coinbase returns for one request
+MAX_CANDLES_PER_REQUEST = 300
+
+# Candle widths in seconds accepted by the Coinbase Exchange candles endpoint
+GRANULARITIES = (60, 300, 900, 3600, 21600, 86400)
+
+
+def page_windows(start: int, end: int, granularity: int) -> List[Tuple[int, int]]:
+    """
+    Split a time range into pages of at most MAX_CANDLES_PER_REQUEST buckets.
+
+    Pages are aligned to fixed multiples of the page span from the Unix epoch, so
+    overlapping queries ask for the same pages and can share cached results.
+
+    Args:
+        start: Range start in Unix seconds
+        end: Range end in Unix seconds (inclusive)
+        granularity: Candle width in seconds
+
+    Returns:
+        List of (first bucket start, last bucket start) pairs, oldest first
+    """
+    span = MAX_CANDLES_PER_REQUEST * granularity
+    first = start // span * span
+    return [(page, page + span - granularity) for page in range(first, end + 1, span)]
+
+
+class CandleSeries:
+    """
+    OHLCV candles stored column-wise and sorted by time, oldest first.
+
+    Attributes:
+        time: Bucket start times as Unix seconds (int64)
+        low, high, open, close, volume: Candle values (float64)
+    """
+
+    __slots__ = ("time", "low", "high", "open", "close", "volume")
+
+    def __init__(self, time: np.ndarray, low: np.ndarray, high: np.ndarray,
+                 open: np.ndarray, close: np.ndarray, volume: np.ndarray):
+        self.time = time
+        self.low = low
+        self.high = high
+        self.open = open
+        self.close = close
+        self.volume = volume
+
+    @classmethod
+    def empty(cls) -> "CandleSeries":
+        """Return a series with no candles."""
+        return cls.from_coinbase([])
+
+    @classmethod
+    def from_coinbase(cls, rows: Sequence[Sequence[float]]) -> "CandleSeries":
+        """
+        Build a series from Coinbase candle rows.
+
+        Args:
+            rows: Rows of [time, low, high, open, close, volume] in any order
+                (Coinbase returns them newest first)
+
+        Returns:
+            CandleSeries sorted oldest first, with duplicate times removed
+        """
+        data = np.asarray(rows, dtype=np.float64).reshape(-1, 6)
+        times = data[:, 0].astype(np.int64)
+        # np.unique sorts ascending and keeps the first row for each time
+        times, index = np.unique(times, return_index=True)
+        data = data[index]
+        return cls(times, data[:, 1].copy(), data[:, 2].copy(), data[:, 3].copy(),
+                   data[:, 4].copy(), data[:, 5].copy())
+
+    def __len__(self) -> int:
+        return len(self.time)
+
+    @property
+    def nbytes(self) -> int:
+        """Memory used by the column arrays in bytes."""
+        return sum(getattr(self, name).nbytes for name in self.__slots__)
+
+    def _take(self, index: Any) -> "CandleSeries":
+        """Return a new series with every column indexed by `index`."""
+        return CandleSeries(*(getattr(self, name)[index] for name in self.__slots__))
+
+    def since(self, start: float) -> "CandleSeries":
+        """Return candles whose bucket starts at or after `start` (Unix seconds)."""
+        return self._take(slice(int(np.searchsorted(self.time, start, side="left")), None))
+
+    def tail(self, count: int) -> "CandleSeries":
+        """Return the newest `count` candles."""
+        return self._take(slice(max(0, len(self) - count), None))
+
+    def between(self, start: float, end: float) -> "CandleSeries":
+        """Return candles whose bucket starts between `start` and `end` inclusive (Unix seconds)."""
+        first = int(np.searchsorted(self.time, start, side="left"))
+        last = int(np.searchsorted(self.time, end, side="right"))
+        return self._take(slice(first, last))
+
+    @classmethod
+    def concat(cls, parts: Sequence["CandleSeries"]) -> "CandleSeries":
+        """
+        Combine several series into one sorted series without duplicate times.
+        Where parts overlap, the candle from the later part wins.
+        """
+        parts = [part for part in parts if len(part) > 0]
+        if not parts:
+            return cls.empty()
+        if len(parts) == 1:
+            return parts[0]
+        # Reverse so np.unique, which keeps the first occurrence, keeps the later part
+        parts = parts[::-1]
+        times, index = np.unique(np.concatenate([part.time for part in parts]), return_index=True)
+        columns = [np.concatenate([getattr(part, name) for part in parts])[index]
+                   for name in cls.__slots__[1:]]
+        return cls(times, *columns)
+
+    def merge(self, newer: "CandleSeries") -> "CandleSeries":
+        """
+        Combine with another series; where both hold a candle for the same time,
+        the candle from `newer` wins (the in-progress candle keeps updating).
+
+        Returns:
+            New series sorted oldest first without duplicate times
+        """
+        if len(self) == 0:
+            return newer
+        if len(newer) == 0:
+            return self
+        times = np.concatenate([newer.time, self.time])
+        # np.unique keeps the first occurrence, i.e. the row from `newer`
+        times, index = np.unique(times, return_index=True)
+        columns = [np.concatenate([getattr(newer, name), getattr(self, name)])[index]
+                   for name in self.__slots__[1:]]
+        return CandleSeries(times, *columns)
+
+    def to_bytes(self) -> bytes:
+        """Pack the columns into bytes: the int64 times followed by the five float64 columns."""
+        return self.time.astype(np.int64).tobytes() + np.stack(
+            [getattr(self, name) for name in self.__slots__[1:]]).astype(np.float64).tobytes()
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "CandleSeries":
+        """Unpack a series written by to_bytes."""
+        count = len(data) // CANDLE_BYTES
+        times = np.frombuffer(data, dtype=np.int64, count=count).copy()
+        columns = np.frombuffer(data, dtype=np.float64, offset=count * 8).reshape(5, count).copy()
+        return cls(times, *columns)
+
+    def iso_times(self) -> List[str]:
+        """Return bucket start times as ISO strings (server local time), oldest first."""
+        return [datetime.fromtimestamp(t).isoformat() for t in self.time.tolist()]
+
+    def to_records(self) -> List[Dict[str, Any]]:
+        """
+        Serialize to the API's legacy JSON shape.
+
+        Returns:
+            List of candle dictionaries newest first, with ISO timestamps and
+            stringified values:
+            [{"time": str, "low": str, "high": str, "open": str, "close": str, "volume": str}, ...]
+        """
+        columns = [getattr(self, name)[::-1].tolist() for name in self.__slots__[1:]]
+        return [
+            {
+                "time": time,
+                "low": str(low),
+                "high": str(high),
+                "open": str(open_),
+                "close": str(close),
+                "volume": str(volume)
+            }
+            for time, low, high, open_, close, volume in zip(self.iso_times()[::-1], *columns)
+        ]
+
+    def iter_json(self, chunk_size: int = 1000) -> Iterator[str]:
+        """
+        Serialize to the same JSON array as to_records, in pieces.
+        Only `chunk_size` candle dictionaries exist at a time, so large series can
+        be streamed without building the whole list.
+
+        Yields:
+            Consecutive fragments of a JSON array, newest candle first
+        """
+        yield "["
+        for stop in range(len(self), 0, -chunk_size):
+            records = self._take(slice(max(0, stop - chunk_size), stop)).to_records()
+            prefix = "" if stop == len(self) else ","
+            yield prefix + json.dumps(records)[1:-1]
+        yield "]"
@@ -0,0 +1,226 @@
+"""
+Circuit breakers for upstream Coinbase endpoints.
+After CIRCUIT_FAILURE_THRESHOLD consecutive failures an upstream's circuit opens
+and calls fail at once with CircuitOpenError instead of waiting on the upstream
+timeout. After CIRCUIT_RESET_TIMEOUT seconds the circuit half-opens and lets a
+probe call through; its outcome closes the circuit or opens it again. Only
+upstream faults count as failures: timeouts, connection errors and 5xx responses.
+Circuits are per process.
+"""
+
+from typing import Any, Awaitable, Callable, Dict, TypeVar
+import asyncio
+import logging
+import time
+from ..config import env_float, env_int
+from ..metrics import registry
+from .upstream_errors import is_transport_error, status_code
+
+T = TypeVar("T")
+
+# Circuit states
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+_STATE_VALUES = {CLOSED: 0, OPEN: 1, HALF_OPEN: 2}
+
+REJECTIONS = registry.counter(
+    "upstream_circuit_rejections_total", "Upstream calls failed fast because their circuit was open",
+    ("upstream",))
+TRANSITIONS = registry.counter(
+    "upstream_circuit_transitions_total", "Circuit state changes, by the state entered",
+    ("upstream", "state"))
+
+
+def is_upstream_failure(error: BaseException) -> bool:
+    """Check whether an error means the upstream is unhealthy rather than the request invalid."""
+    if isinstance(error, asyncio.TimeoutError) or is_transport_error(error):
+        return True
+    status = status_code(error)
+    return status is not None and status >= 500
+
+
+class CircuitOpenError(Exception):
+    """
+    Raised instead of calling an upstream whose circuit is open.
+
+    Attributes:
+        upstream: Name of the upstream
+        retry_after: Seconds until the circuit lets a probe call through
+    """
+
+    def __init__(self, upstream: str, retry_after: float):
+        super().__init__(f"Circuit for {upstream} is open")
+        self.upstream = upstream
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """
+    Closed / open / half-open circuit breaker for one upstream.
+
+    Closed passes calls through and counts consecutive failures. Open rejects
+    calls until `reset_timeout` has passed, then the circuit is half-open:
+    up to `half_open_calls` probes run while other calls are still rejected.
+    A successful probe closes the circuit; a failed one opens it again.
+    A `failure_threshold` of 0 or less disables the breaker.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0,
+                 half_open_calls: int = 1):
+        """
+        Args:
+            name: Upstream name, as used by track_upstream (e.g. 'coinbase_candles')
+            failure_threshold: Consecutive failures that open the circuit
+            reset_timeout: Seconds the circuit stays open before a probe is allowed
+            half_open_calls: Probes allowed at the same time while half-open
+        """
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.half_open_calls = max(1, half_open_calls)
+        self.failures = 0
+        self.opened = 0
+        self.rejected = 0
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._probes = 0
+
+    @property
+    def state(self) -> str:
+        """Current state; an open circuit becomes half-open once its reset timeout has passed."""
+        if self._state == OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+            self._transition(HALF_OPEN)
+        return self._state
+
+    @property
+    def available(self) -> bool:
+        """Whether a call made now would reach the upstream without waiting for a probe."""
+        return self.state == CLOSED
+
+    def retry_after(self) -> float:
+        """Seconds until the circuit lets a call through (0 when closed)."""
+        state = self.state
+        if state == OPEN:
+            return max(0.0, self._opened_at + self.reset_timeout - time.monotonic())
+        if state == HALF_OPEN and self._probes >= self.half_open_calls:
+            return 1.0
+        return 0.0
+
+    async def call(self, request: Callable[[], Awaitable[T]]) -> T:
+        """
+        Run `request` unless the circuit is open, recording its outcome.
+
+        Args:
+            request: Coroutine function calling the upstream
+
+        Returns:
+            The request's result
+
+        Raises:
+            CircuitOpenError: If the circuit is open, or half-open with its probes in flight
+            Exception: Whatever the request raised
+        """
+        if self.failure_threshold <= 0:
+            return await request()
+
+        state = self.state
+        if state == OPEN or (state == HALF_OPEN and self._probes >= self.half_open_calls):
+            self.rejected += 1
+            REJECTIONS.inc(self.name)
+            raise CircuitOpenError(self.name, self.retry_after())
+
+        probe = state == HALF_OPEN
+        if probe:
+            self._probes += 1
+        try:
+            result = await request()
+        except Exception as e:
+            if is_upstream_failure(e):
+                self._record_failure(probe)
+            else:
+                # The upstream answered, it just refused this request
+                self._record_success()
+            raise
+        finally:
+            if probe:
+                self._probes -= 1
+        self._record_success()
+        return result
+
+    def _record_success(self) -> None:
+        self.failures = 0
+        if self._state != CLOSED:
+            self._transition(CLOSED)
+
+    def _record_failure(self, probe: bool) -> None:
+        self.failures += 1
+        if probe or (self._state == CLOSED and self.failures >= self.failure_threshold):
+            self._opened_at = time.monotonic()
+            self.opened += 1
+            self._transition(OPEN)
+
+    def _transition(self, state: str) -> None:
+        if state == self._state:
+            return
+        log = logging.info if state == CLOSED else logging.warning
+        log(f"Circuit for {self.name} {self._state} -> {state} after {self.failures} consecutive failures")
+        self._state = state
+        if state == HALF_OPEN:
+            self._probes = 0
+        TRANSITIONS.inc(self.name, state)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return the circuit's state and counters."""
+        return {
+            "state": self.state,
+            "consecutive_failures": self.failures,
+            "opened": self.opened,
+            "rejected": self.rejected,
+            "retry_after": round(self.retry_after(), 3),
+        }
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+
+
+def get_circuit_breaker(name: str) -> CircuitBreaker:
+    """
+    Return the process-wide breaker for an upstream, created from environment variables on first use.
+
+    Environment variables:
+        CIRCUIT_FAILURE_THRESHOLD: Consecutive failures that open a circuit, 0 disables (default: 5)
+        CIRCUIT_RESET_TIMEOUT: Seconds a circuit stays open before probing (default: 30)
+        CIRCUIT_HALF_OPEN_CALLS: Concurrent probes while half-open (default: 1)
+    """
+    breaker = _breakers.get(name)
+    if breaker is None:
+        breaker = _breakers[name] = CircuitBreaker(
+            name,
+            failure_threshold=env_int("CIRCUIT_FAILURE_THRESHOLD", 5),
+            reset_timeout=env_float("CIRCUIT_RESET_TIMEOUT", 30.0),
+            half_open_calls=env_int("CIRCUIT_HALF_OPEN_CALLS", 1),
+        )
+    return breaker
+
+
+def circuits_available(*names: str) -> bool:
+    """Whether all the named upstreams' circuits are closed."""
+    return all(get_circuit_breaker(name).available for name in names)
+
+
+def circuit_stats() -> Dict[str, Dict[str, Any]]:
+    """Return the state of every breaker created so far, keyed by upstream."""
+    return {name: breaker.stats() for name, breaker in sorted(_breakers.items())}
+
+
+def _collect_circuit_metrics():
+    """Report each circuit's state at scrape time (0 closed, 1 open, 2 half-open)."""
+    if not _breakers:
+        return []
+    return [("upstream_circuit_state", "gauge", "Circuit state per upstream: 0 closed, 1 open, 2 half-open",
+             [({"upstream": name}, "", _STATE_VALUES[breaker.state]) for name, breaker in sorted(_breakers.items())])]
+
+
+registry.add_collector(_collect_circuit_metrics)
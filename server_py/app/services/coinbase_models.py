@@ -0,0 +1,140 @@
+"""
+Typed models for the Coinbase Advanced Trade responses the service uses.
+Reads only the fields the API endpoints need straight from SDK response objects
+(or plain dictionaries), instead of converting whole responses to nested dicts.
+"""
+
+from typing import Any, Dict, List, Optional
+
+
+def _field(obj: Any, name: str) -> Any:
+    """Read a field from an SDK response object or a plain dictionary."""
+    if isinstance(obj, dict):
+        return obj.get(name)
+    return getattr(obj, name, None)
+
+
+class AccountBalance:
+    """
+    Balance of one Coinbase account.
+
+    Attributes:
+        name: Account name
+        currency: Currency symbol (e.g. 'BTC')
+        value: Available balance as a decimal string
+        type: Account type, e.g. 'ACCOUNT_TYPE_CRYPTO' or 'ACCOUNT_TYPE_FIAT'
+        ready: Whether the account is ready for use
+    """
+
+    __slots__ = ("name", "currency", "value", "type", "ready")
+
+    def __init__(self, name: str, currency: str, value: str, type: str, ready: bool):
+        self.name = name
+        self.currency = currency
+        self.value = value
+        self.type = type
+        self.ready = ready
+
+    @classmethod
+    def from_sdk(cls, account: Any) -> Optional["AccountBalance"]:
+        """
+        Build from an SDK Account (or its dictionary form).
+
+        Returns:
+            AccountBalance, or None if the account has no available balance
+        """
+        balance = _field(account, "available_balance")
+        if balance is None:
+            return None
+        return cls(
+            name=_field(account, "name") or "",
+            currency=_field(balance, "currency") or "",
+            value=_field(balance, "value") or "0",
+            type=_field(account, "type") or "",
+            ready=bool(_field(account, "ready")),
+        )
+
+    def is_held(self) -> bool:
+        """
+        Whether the account belongs in the portfolio: a ready crypto account or a
+        fiat account, with a non-zero balance.
+        """
+        if self.type == "ACCOUNT_TYPE_CRYPTO" and not self.ready:
+            return False
+        return self.type in ("ACCOUNT_TYPE_CRYPTO", "ACCOUNT_TYPE_FIAT") and float(self.value) > 0
+
+
+def parse_accounts(response: Any) -> List[AccountBalance]:
+    """
+    Extract account balances from a list accounts response.
+
+    Args:
+        response: SDK ListAccountsResponse or its dictionary form
+
+    Returns:
+        Balances for accounts that report an available balance
+    """
+    balances = []
+    for account in _field(response, "accounts") or []:
+        balance = AccountBalance.from_sdk(account)
+        if balance is not None:
+            balances.append(balance)
+    return balances
+
+
+class Trade:
+    """
+    One market trade.
+
+    Attributes:
+        trade_id: Exchange trade identifier
+        product_id: Trading pair identifier
+        price: Trade price as a decimal string
+        size: Trade size as a decimal string
+        time: Trade timestamp (ISO 8601)
+        side: 'BUY' or 'SELL'
+    """
+
+    __slots__ = ("trade_id", "product_id", "price", "size", "time", "side")
+
+    def __init__(self, trade_id: Optional[str], product_id: Optional[str], price: str,
+                 size: Optional[str], time: Optional[str], side: Optional[str]):
+        self.trade_id = trade_id
+        self.product_id = product_id
+        self.price = price
+        self.size = size
+        self.time = time
+        self.side = side
+
+    @classmethod
+    def from_sdk(cls, trade: Any) -> "Trade":
+        """Build from an SDK HistoricalMarketTrade (or its dictionary form)."""
+        return cls(
+            trade_id=_field(trade, "trade_id"),
+            product_id=_field(trade, "product_id"),
+            price=_field(trade, "price"),
+            size=_field(trade, "size"),
+            time=_field(trade, "time"),
+            side=_field(trade, "side"),
+        )
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Return the trade as the dictionary shape used by the market store."""
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+def parse_trades(response: Any, limit: Optional[int] = None) -> List[Trade]:
+    """
+    Extract trades from a market trades response.
+
+    Args:
+        response: SDK GetMarketTradesResponse or its dictionary form
+        limit: Only parse the first `limit` trades (newest first)
+
+    Returns:
+        Trades, newest first
+    """
+    trades = _field(response, "trades") or []
+    if not isinstance(trades, list):
+        return []
+    return [Trade.from_sdk(trade) for trade in trades[:limit]]
@@ -1,23 +1,290 @@
 """
 Coinbase service module for interacting with the Coinbase Advanced Trade API.
 Handles authentication, data fetching, and formatting of cryptocurrency data.
+Several Coinbase accounts can be served at once; their balances are fetched with
+their own credentials while market data is fetched and cached once for all.
 """
 
 from datetime import datetime, timedelta, timezone
+import asyncio
 import os
-from typing import List, Dict, Any
+import time
+from typing import List, Dict, Any, Optional, Tuple
 import json
-from dotenv import load_dotenv
-from coinbase.rest import RESTClient
-import httpx
 import logging
+from .http_client import get_http_client
+from .rest_adapter import AsyncRESTClient
+from .cache import TTLCache
+from .circuit_breaker import CircuitOpenError, circuits_available, get_circuit_breaker
+from .shared_cache import Codec, get_shared_backend
+from .concurrency import gather_bounded
+from .market_store import market_store
+from .candles import CandleSeries, page_windows
+from .candle_store import CandleStore
+from .portfolio_history import PortfolioHistory
+from .coinbase_models import parse_accounts, parse_trades
+from .valuation import combine_portfolios, value_portfolio
+from .rates import RateGraph, markets_from_prices
+from ..config import env_float, env_int, env_list, load_env
+from .upstream_scheduler import PRIVATE, PUBLIC, UpstreamRateLimited, get_upstream_scheduler
+from ..logging_utils import log_payload
+from ..metrics import track_upstream
 
-class CoinbaseService:
+def credential_sets() -> Dict[str, Tuple[str, str]]:
+    """
+    Read the Coinbase credential sets from environment variables, default account first.
+
+    Environment variables:
+        COINBASE_API_KEY, COINBASE_API_SECRET: Credentials of the 'default' account
+        COINBASE_ACCOUNTS: Further account names, comma-separated (e.g. 'fund,family')
+        COINBASE_API_KEY_<NAME>, COINBASE_API_SECRET_<NAME>: Credentials of each named
+            account, with the name upper-cased and '-' replaced by '_'
+
+    Returns:
+        Dictionary mapping lower-case account names to (api_key, api_secret)
+
+    Raises:
+        ValueError: If a listed account has no credentials or a name is repeated
+    """
+    credentials = {}
+    api_key, api_secret = os.getenv("COINBASE_API_KEY"), os.getenv("COINBASE_API_SECRET")
+    if api_key and api_secret:
+        credentials["default"] = (api_key, api_secret)
+    for name in env_list("COINBASE_ACCOUNTS"):
+        name = name.lower()
+        suffix = name.upper().replace("-", "_")
+        api_key, api_secret = os.getenv(f"COINBASE_API_KEY_{suffix}"), os.getenv(f"COINBASE_API_SECRET_{suffix}")
+        if name in credentials:
+            raise ValueError(f"Coinbase account {name} is configured twice.")
+        if not api_key or not api_secret:
+            raise ValueError(
+                f"Missing Coinbase API credentials for account {name}. Please ensure "
+                f"COINBASE_API_KEY_{suffix} and COINBASE_API_SECRET_{suffix} are set in your .env file."
+            )
+        credentials[name] = (api_key, api_secret)
+    return credentials
+
+
+def _stale_settings() -> Dict[str, float]:
+    """Cache options serving expired entries as last known good values while Coinbase is slow or down."""
+    return dict(stale_ttl=env_float("CACHE_STALE_TTL", 3600.0),
+                revalidate_timeout=env_float("STALE_REVALIDATE_TIMEOUT", 1.0))
+
+
+def _create_rest_client(api_key: str, api_secret: str) -> AsyncRESTClient:
+    """
+    Create an SDK client for one credential set.
+
+    Raises:
+        ValueError: If the client cannot be created (e.g. a malformed key)
+    """
+    try:
+        # Imported on first use so the app can be imported without the SDK's dependencies loaded
+        from coinbase.rest import RESTClient
+        # COINBASE_API_BASE_URL is a host name (the SDK always uses HTTPS), e.g. for a local stub
+        client = RESTClient(api_key=api_key, api_secret=api_secret,
+                            base_url=os.getenv("COINBASE_API_BASE_URL", "api.coinbase.com"))
+    except Exception as e:
+        raise ValueError(f"Failed to initialize Coinbase client: {str(e)}")
+    # The SDK is synchronous; run its calls on a thread pool to keep the event loop free
+    return AsyncRESTClient(client)
+
+
+class AccountPortfolio:
+    """
+    Balances and valuations of one set of Coinbase credentials.
+
+    Shared by CoinbaseService, which is the default account, and CoinbaseAccount,
+    which adds further named accounts. Each has its own REST client, balance and
+    valuation caches; prices come from the service's shared market data.
+    """
+
+    account_name: str
+    rest_client: AsyncRESTClient
+    portfolio_cache: TTLCache
+    portfolio_ttl: float
+    valuation_cache: TTLCache
+    valuation_ttl: float
+    market_quote: str
+    market_store: Any
+
+    async def get_portfolio(self) -> List[Dict[str, Any]]:
+        """
+        Fetch and format the user's cryptocurrency portfolio from Coinbase.
+        
+        Returns:
+            Holdings as described in get_portfolio_snapshot, or an empty list
+            if they could not be fetched
+        """
+        portfolio, _ = await self.get_portfolio_snapshot()
+        return portfolio
+
+    async def get_portfolio_snapshot(self) -> Tuple[List[Dict[str, Any]], Optional[float]]:
+        """
+        Fetch the portfolio along with its age if it is a stale copy.
+        Balances are cached for PORTFOLIO_CACHE_TTL seconds; while the accounts
+        circuit is open or a refresh is slow, the last known balances are served.
+        
+        Returns:
+            Tuple of (holdings, seconds since they were fetched if stale else None).
+            Holdings:
+            List of dictionaries containing currency holdings:
+            [
+                {
+                    "currency": str,     # Cryptocurrency symbol
+                    "balance": str,      # Total balance
+                    "available": str     # Available balance for trading
+                },
+                ...
+            ]
+            An empty list with no age if the portfolio could not be fetched
+        """
+        try:
+            return await self.load_portfolio()
+        except Exception as e:
+            logging.error(f"Error fetching portfolio for account {self.account_name}: {str(e)}",
+                          exc_info=not isinstance(e, CircuitOpenError))
+            return [], None
+
+    async def load_portfolio(self) -> Tuple[List[Dict[str, Any]], Optional[float]]:
+        """
+        Fetch the portfolio as get_portfolio_snapshot does, but raise when it cannot
+        be fetched, so callers can tell a failure from an account that holds nothing.
+        
+        Returns:
+            Tuple of (holdings, seconds since they were fetched if stale else None)
+            
+        Raises:
+            Exception: If the balances could not be fetched and no stale copy is available
+        """
+        return await self.portfolio_cache.get_or_revalidate(
+            "accounts",
+            self._fetch_portfolio,
+            ttl=self.portfolio_ttl,
+            available=lambda: circuits_available("coinbase_accounts")
+        )
+
+    async def _fetch_portfolio(self) -> List[Dict[str, Any]]:
+        """Fetch the accounts and keep the held currencies."""
+        logging.debug("Fetching portfolio data...")
+        async def request():
+            with track_upstream("coinbase_accounts"):
+                return await self.rest_client.get_accounts()
+
+        response = await get_circuit_breaker("coinbase_accounts").call(
+            lambda: get_upstream_scheduler().run(PRIVATE, request))
+        accounts = parse_accounts(response)
+        logging.debug("Found %d accounts", len(accounts))
+
+        portfolio = []
+        for account in accounts:
+            logging.debug("Processing %s - Type: %s, Ready: %s, Balance for %s: %s",
+                          account.name, account.type, account.ready, account.currency, account.value)
+
+            # Include account if:
+            # 1. For crypto: account is ready AND has non-zero balance
+            # 2. For fiat: has non-zero balance
+            if account.is_held():
+                portfolio.append({
+                    "currency": account.currency,
+                    "balance": account.value,
+                    "available": account.value
+                })
+                logging.debug("Added %s to portfolio", account.currency)
+
+        log_payload("Final portfolio", portfolio, holdings=len(portfolio))
+        return portfolio
+
+    async def get_portfolio_valuation(self, quote_currency: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Value the portfolio at current prices.
+        
+        Balances and prices are fetched concurrently: prices for the products held at
+        the last valuation (or tracked by the market poller) are requested while the
+        balances load, and only newly held products are priced afterwards. Prices
+        are fetched in MARKET_QUOTE_CURRENCY; valuations in other currencies derive
+        their rates from those and the market store's markets, so they need no
+        further upstream requests while a path exists. Results are cached for
+        VALUATION_CACHE_TTL seconds and concurrent requests share one valuation.
+        
+        Args:
+            quote_currency: Currency to value holdings in (default: MARKET_QUOTE_CURRENCY)
+            
+        Returns:
+            Valuation dictionary as described in valuation.value_portfolio
+        """
+        quote_currency = (quote_currency or self.market_quote).upper()
+        return await self.valuation_cache.get_or_load(
+            quote_currency,
+            lambda: self._value_portfolio(quote_currency),
+            ttl=self.valuation_ttl
+        )
+
+    async def _value_portfolio(self, quote_currency: str) -> Dict[str, Any]:
+        """Fetch balances and prices and compute a fresh valuation."""
+        portfolio, prices = await asyncio.gather(self.get_portfolio(), self.get_prices(self._expected_products()))
+        self._valued_products[self.market_quote] = self._held_products(portfolio)
+        prices = await self._quote_prices(portfolio, quote_currency, prices)
+        return value_portfolio(portfolio, prices, quote_currency)
+
+    def _expected_products(self) -> List[str]:
+        """Products to price while balances load: those held at the last valuation, else those the poller tracks."""
+        market_quote = self.market_quote
+        return self._valued_products.get(market_quote) or [
+            product_id for product_id in self.market_store.products() if product_id.endswith(f"-{market_quote}")
+        ]
+
+
+class CoinbaseAccount(AccountPortfolio):
+    """
+    A further named Coinbase account served by the same CoinbaseService.
+
+    Balances and valuations use the account's own REST client and caches. The
+    market quote currency, cache TTLs, market store and pricing methods are the
+    service's, passed in explicitly, so market data is fetched and cached once
+    for every account.
+    """
+
+    def __init__(self, service: "CoinbaseService", name: str, rest_client: AsyncRESTClient):
+        """
+        Args:
+            service: Service providing the shared market data and settings
+            name: Account name, used in logs and cache names
+            rest_client: Client authenticated with the account's credentials
+        """
+        self.account_name = name
+        self.rest_client = rest_client
+        shared = get_shared_backend()
+        self.portfolio_cache = TTLCache(max_entries=1, name=f"portfolio:{name}", shared=shared, **_stale_settings())
+        self.valuation_cache = TTLCache(max_entries=8, name=f"valuation:{name}", shared=shared)
+        self._valued_products: Dict[str, List[str]] = {}
+
+        # Shared with the service
+        self.market_quote = service.market_quote
+        self.portfolio_ttl = service.portfolio_ttl
+        self.valuation_ttl = service.valuation_ttl
+        self.market_store = service.market_store
+        self.get_prices = service.get_prices
+        self._held_products = service._held_products
+        self._quote_prices = service._quote_prices
+
+
+class CoinbaseService(AccountPortfolio):
     """
     Service class for interacting with Coinbase Advanced Trade API.
     Handles portfolio data, price information, and historical data retrieval.
+    The service itself is the default account; further accounts configured with
+    COINBASE_ACCOUNTS are in `accounts` and share its market data.
     """
 
+    _instance = None
+
+    def __new__(cls):
+        """Implement singleton pattern so all routers share one client and candle cache."""
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+        return cls._instance
+
     def __init__(self):
         """
         Initialize the Coinbase service with API credentials from environment variables.
@@ -26,184 +293,440 @@ class CoinbaseService:
         Raises:
             ValueError: If API credentials are missing or invalid
         """
-        load_dotenv()
-        
-        api_key = os.getenv("COINBASE_API_KEY")
-        api_secret = os.getenv("COINBASE_API_SECRET")
+        # Skip initialization if already done
+        if hasattr(self, 'initialized'):
+            return
+
+        load_env()
         
-        if not api_key or not api_secret:
+        credentials = credential_sets()
+        if not credentials:
             raise ValueError(
                 "Missing Coinbase API credentials. Please ensure COINBASE_API_KEY and "
-                "COINBASE_API_SECRET are set in your .env file."
+                "COINBASE_API_SECRET (or COINBASE_ACCOUNTS) are set in your .env file."
             )
+
+        # The first credential set is the default account, used by the unscoped endpoints
+        self.account_name = next(iter(credentials))
+        self.rest_client = _create_rest_client(*credentials[self.account_name])
+        self.client = self.rest_client.client
+
+        # Base URL of the public Coinbase Exchange API used for candle data
+        self.exchange_api_url = os.getenv("COINBASE_EXCHANGE_API_URL", "https://api.exchange.coinbase.com")
+
+        # Currency of the markets fetched for holdings; other quote currencies are derived from them
+        self.market_quote = env_list("MARKET_QUOTE_CURRENCY", "GBP")[0].upper()
+
+        # Shared with the other worker processes when SHARED_CACHE_URL is set
+        shared = get_shared_backend()
+        stale = _stale_settings()
+
+        # Candle cache shared by every endpoint that needs historical data
+        self.candle_cache = TTLCache(
+            max_entries=env_int("CANDLE_CACHE_MAX_ENTRIES", 256),
+            max_bytes=env_int("CANDLE_CACHE_MAX_BYTES", 16 * 1024 * 1024),
+            sizeof=lambda candles: candles.nbytes,
+            name="candles",
+            shared=shared,
+            codec=Codec(CandleSeries.to_bytes, CandleSeries.from_bytes),
+            **stale,
+        )
+        self.candle_cache_max_ttl = env_float("CANDLE_CACHE_MAX_TTL", 60.0)
+        # Completed candles never change, so fully closed history pages are kept longer
+        self.history_page_ttl = env_float("HISTORICAL_PAGE_TTL", 3600.0)
+
+        # Portfolio valuations are cached as a unit per quote currency
+        self.valuation_cache = TTLCache(max_entries=8, name="valuation", shared=shared)
+        self.valuation_ttl = env_float("VALUATION_CACHE_TTL", 10.0)
+
+        # Prices fetched from Coinbase (not the market store) are reused briefly
+        self.price_cache = TTLCache(max_entries=env_int("PRICE_CACHE_MAX_ENTRIES", 256), name="prices",
+                                    shared=shared, **stale)
+        self.price_ttl = env_float("PRICE_CACHE_TTL", 2.0)
+
+        # Balances are reused briefly by valuations and recommendations
+        self.portfolio_cache = TTLCache(max_entries=1, name="portfolio", shared=shared, **stale)
+        self.portfolio_ttl = env_float("PORTFOLIO_CACHE_TTL", 5.0)
+        self._valued_products: Dict[str, List[str]] = {}
+
+        # Persistent candle history, opened by the application lifespan when enabled
+        self.candle_store: Optional[CandleStore] = None
+        # Recorded portfolio values, opened by the application lifespan when enabled
+        self.portfolio_history: Optional[PortfolioHistory] = None
+
+        # Store kept fresh by the background poller; data older than the max age is ignored
+        self.market_store = market_store
+        self.store_max_age = env_float("MARKET_STORE_MAX_AGE", 120.0)
+        self.store_stale_after = env_float("MARKET_STORE_STALE_AFTER", 60.0)
+
+        # Every account by name, each with its own REST client; market data stays shared
+        self.accounts: Dict[str, AccountPortfolio] = {self.account_name: self}
+        for name, (api_key, api_secret) in list(credentials.items())[1:]:
+            self.accounts[name] = CoinbaseAccount(self, name, _create_rest_client(api_key, api_secret))
+
+        self.initialized = True
+
+    def _format_product_id(self, base_currency: str, quote_currency: Optional[str] = None) -> str:
+        """
+        Format a trading pair ID according to Coinbase specifications.
         
-        try:
-            self.client = RESTClient(api_key=api_key, api_secret=api_secret)
-        except Exception as e:
-            raise ValueError(f"Failed to initialize Coinbase client: {str(e)}")
+        Args:
+            base_currency: The cryptocurrency symbol (e.g., 'BTC')
+            quote_currency: The currency to price against (default: MARKET_QUOTE_CURRENCY)
+            
+        Returns:
+            Formatted product ID (e.g., 'BTC-GBP')
+        """
+        return f"{base_currency.upper()}-{(quote_currency or self.market_quote).upper()}"
 
-    def _to_dict(self, obj: Any) -> Dict[str, Any]:
+    async def get_crypto_price(self, product_id: str) -> Dict[str, Any]:
         """
-        Convert API response objects to dictionaries for easier handling.
-        Handles special Coinbase API response types by converting them to basic Python types.
+        Fetch the current price and 24-hour change for a cryptocurrency.
+        Served from the market store when the background poller has recent data,
+        otherwise fetched and cached for PRICE_CACHE_TTL seconds. While the candles
+        or trades circuit is open or a refresh is slow, the last known price is
+        served with its age.
         
         Args:
-            obj: Response object from Coinbase API
+            product_id: The trading pair identifier (e.g., 'BTC-GBP')
             
         Returns:
-            Dict containing the response data
+            Dictionary containing price information:
+            {
+                "price": str,           # Current price
+                "time": str,            # Timestamp of the price
+                "change_24h": float,    # 24-hour price change percentage
+                "price_24h_ago": str,   # Price 24 hours ago
+                "age_seconds": float,   # Only when served from the store or stale: data age
+                "stale": bool           # Only when served from the store or stale: older than
+                                        # MARKET_STORE_STALE_AFTER, or a last known price
+            }
         """
+        stored = self._stored_price(product_id)
+        if stored is not None:
+            return stored
+
         try:
-            if hasattr(obj, '__dict__'):
-                # If object has a __dict__, convert its attributes to a dictionary
-                return {k: self._to_dict(v) for k, v in obj.__dict__.items() 
-                       if not k.startswith('_')}
-            elif isinstance(obj, (list, tuple)):
-                # Handle lists and tuples by converting their elements
-                return [self._to_dict(item) for item in obj]
-            elif isinstance(obj, dict):
-                # Handle dictionaries by converting their values
-                return {k: self._to_dict(v) for k, v in obj.items()}
-            elif isinstance(obj, (str, int, float, bool, type(None))):
-                # Basic types can be returned as-is
-                return obj
-            else:
-                # For any other type, try to convert to string
-                return str(obj)
+            price, age = await self.price_cache.get_or_revalidate(
+                product_id,
+                lambda: self._fetch_price(product_id),
+                ttl=self.price_ttl,
+                available=lambda: circuits_available("coinbase_candles", "coinbase_market_trades")
+            )
+            if age is None:
+                return price
+            return {**price, "age_seconds": round(age, 3), "stale": True}
+
+        except CircuitOpenError as e:
+            logging.warning(f"Not fetching price for {product_id}: {e}")
+            return {"error": "Coinbase is currently unavailable. Please try again shortly."}
+
+        except ValueError as ve:
+            logging.error(f"ValueError: {ve}")
+            return {"error": str(ve)}
+        except UpstreamRateLimited as e:
+            logging.warning(f"Rate limited fetching price for {product_id}: {e}")
+            return {"error": "Coinbase rate limit reached. Please try again shortly."}
         except Exception as e:
-            logging.error(f"Error converting object to dict: {e}")
-            return {}
+            logging.error(f"Error fetching price for {product_id}: {e}", exc_info=True)
+            return {"error": f"Unable to fetch price for {product_id}. Please check if the trading pair is supported."}
 
-    def _format_product_id(self, base_currency: str, quote_currency: str = "GBP") -> str:
+    async def _fetch_price(self, product_id: str) -> Dict[str, Any]:
+        """Fetch 24h candles and the latest trade and build a price summary."""
+        logging.debug("Fetching price for %s...", product_id)
+
+        # Get 24h candles and current market data concurrently
+        (candles, _), latest_trade = await asyncio.gather(
+            self.get_candle_series(product_id),
+            self.fetch_latest_trade(product_id)
+        )
+        return self._build_price(latest_trade, candles)
+
+    def _build_price(self, latest_trade: Dict[str, Any], candles: CandleSeries) -> Dict[str, Any]:
         """
-        Format a trading pair ID according to Coinbase specifications.
+        Combine the latest trade with 24h candles into a price summary.
         
         Args:
-            base_currency: The cryptocurrency symbol (e.g., 'BTC')
-            quote_currency: The currency to price against (default: 'GBP')
+            latest_trade: Trade dictionary with "price" and optionally "time"
+            candles: Candles covering the last 24 hours
             
         Returns:
-            Formatted product ID (e.g., 'BTC-GBP')
+            Price dictionary as described in get_crypto_price
+            
+        Raises:
+            ValueError: If no historical data is available
         """
-        return f"{base_currency.upper()}-{quote_currency.upper()}"
+        if len(candles) == 0:
+            raise ValueError("No historical data available")
 
-    async def get_portfolio(self) -> List[Dict[str, Any]]:
+        # Get current price from latest trade
+        current_price = float(latest_trade["price"])
+        
+        # Get price from 24h ago (close of the oldest candle in the window)
+        price_24h_ago = float(candles.close[0])
+        
+        # Calculate percentage change
+        change_24h = ((current_price - price_24h_ago) / price_24h_ago) * 100
+
+        return {
+            "price": str(current_price),
+            "time": latest_trade.get("time", datetime.now(timezone.utc).isoformat()),
+            "change_24h": round(change_24h, 2),
+            "price_24h_ago": str(price_24h_ago)
+        }
+
+    def _stored_price(self, product_id: str) -> Optional[Dict[str, Any]]:
         """
-        Fetch and format the user's cryptocurrency portfolio from Coinbase.
+        Build a price summary from the market store if it holds recent enough data.
         
+        Args:
+            product_id: The trading pair identifier (e.g., 'BTC-GBP')
+            
         Returns:
-            List of dictionaries containing currency holdings:
-            [
-                {
-                    "currency": str,     # Cryptocurrency symbol
-                    "balance": str,      # Total balance
-                    "available": str     # Available balance for trading
-                },
-                ...
-            ]
+            Price dictionary with "age_seconds" and "stale" fields added,
+            or None if the store cannot answer
         """
+        trade = self.market_store.latest_trade(product_id)
+        candles = self.market_store.get_candles(product_id)
+        if trade is None or candles is None or len(candles[0]) == 0:
+            return None
+        age = max(trade[1], candles[1])
+        if age > self.store_max_age:
+            return None
         try:
-            logging.info("Fetching portfolio data...")
-            response = self.client.get_accounts()
-            logging.debug(f"Raw response type: {type(response)}")
-            
-            portfolio = []
-            response_dict = self._to_dict(response)
-            accounts = response_dict.get('accounts', [])
-            logging.info(f"Found {len(accounts)} accounts")
+            price = self._build_price(trade[0], candles[0])
+        except (KeyError, ValueError, ZeroDivisionError):
+            return None
+        price["age_seconds"] = round(age, 3)
+        price["stale"] = age > self.store_stale_after
+        return price
+
+    async def fetch_latest_trade(self, product_id: str) -> Dict[str, Any]:
+        """
+        Fetch the most recent trade for a product from Coinbase.
+        
+        Args:
+            product_id: The trading pair identifier (e.g., 'BTC-GBP')
             
-            for account in accounts:
-                account_type = account.get('type', '')
-                available_balance = account.get('available_balance', {})
-                ready = account.get('ready', False)
-                
-                logging.debug(f"Processing {account.get('name')} - Type: {account_type}, Ready: {ready}")
-                
-                if isinstance(available_balance, dict):
-                    currency = available_balance.get('currency', '')
-                    value = available_balance.get('value', '0')
-                    
-                    logging.debug(f"Balance for {currency}: {value}")
-                    
-                    # Include account if:
-                    # 1. For crypto: account is ready AND has non-zero balance
-                    # 2. For fiat: has non-zero balance
-                    if (account_type == 'ACCOUNT_TYPE_CRYPTO' and ready and float(value) > 0) or \
-                       (account_type == 'ACCOUNT_TYPE_FIAT' and float(value) > 0):
-                        portfolio.append({
-                            "currency": currency,
-                            "balance": value,
-                            "available": value
-                        })
-                        logging.debug(f"Added {currency} to portfolio")
+        Returns:
+            Trade dictionary including "price", "time" and "trade_id"
             
-            logging.info(f"Final portfolio: {portfolio}")
-            return portfolio
+        Raises:
+            ValueError: If Coinbase returns no trades
+        """
+        async def request():
+            with track_upstream("coinbase_market_trades"):
+                return await self.rest_client.get_market_trades(product_id=product_id, limit=1)
+
+        market_data = await get_circuit_breaker("coinbase_market_trades").call(
+            lambda: get_upstream_scheduler().run(PRIVATE, request))
+
+        # Read just the newest trade's fields
+        trades = parse_trades(market_data, limit=1)
+        if not trades:
+            raise ValueError(f"No trades found in market data")
+        return trades[0].as_dict()
+
+    async def get_price_in(self, currency: str, quote_currency: str) -> Dict[str, Any]:
+        """
+        Fetch the price of a currency in any quote currency.
+        
+        Only the currency's market in MARKET_QUOTE_CURRENCY is fetched; the rate
+        to other quote currencies is derived from it and the markets the market
+        store already holds (see _cross_prices).
+        
+        Args:
+            currency: Currency to price (e.g., 'ETH')
+            quote_currency: Currency to price it in (e.g., 'USD')
             
-        except Exception as e:
-            logging.error(f"Error fetching portfolio: {str(e)}", exc_info=True)
-            return []
+        Returns:
+            Price dictionary as described in get_crypto_price when the quote
+            currency is MARKET_QUOTE_CURRENCY, otherwise as in RateGraph.price
+            ({"price", "change_24h", "price_24h_ago", "path", ...}), or {"error": str}
+        """
+        currency, quote_currency = currency.upper(), quote_currency.upper()
+        if quote_currency == self.market_quote:
+            return await self.get_crypto_price(self._format_product_id(currency))
+        fetched = {}
+        if currency != self.market_quote:
+            product_id = self._format_product_id(currency)
+            fetched[product_id] = await self.get_crypto_price(product_id)
+        prices = await self._cross_prices([currency], quote_currency, fetched)
+        return prices[self._format_product_id(currency, quote_currency)]
 
-    async def get_crypto_price(self, product_id: str) -> Dict[str, Any]:
+    def _known_prices(self) -> Dict[str, Dict[str, Any]]:
+        """Prices the price cache and market store hold without an upstream request, keyed by product ID."""
+        known = dict(self.price_cache.items())
+        for product_id in self.market_store.products():
+            price = self._stored_price(product_id)
+            if price is not None:
+                known[product_id] = price
+        return known
+
+    async def _cross_prices(self, currencies: List[str], quote_currency: str,
+                            fetched: Dict[str, Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
         """
-        Fetch the current price and 24-hour change for a cryptocurrency.
+        Price currencies in a quote currency through the cheapest chain of known markets.
+        
+        The rate graph is built from the fetched prices plus every fresh price in
+        the price cache and market store (e.g. a BTC-USD product tracked by the
+        poller links all GBP-priced holdings to USD). Only currencies that no
+        known market connects to the quote currency are fetched directly.
         
         Args:
-            product_id: The trading pair identifier (e.g., 'BTC-GBP')
+            currencies: Currencies to price (e.g., ['BTC', 'GBP'])
+            quote_currency: Currency to price them in (e.g., 'USD')
+            fetched: Prices already fetched for this request, keyed by product ID
             
         Returns:
-            Dictionary containing price information:
-            {
-                "price": str,           # Current price
-                "time": str,            # Timestamp of the price
-                "change_24h": float,    # 24-hour price change percentage
-                "price_24h_ago": str    # Price 24 hours ago
-            }
+            Price dictionaries keyed by product ID in the quote currency (e.g., 'BTC-USD')
         """
-        try:
-            # Get current price
-            logging.info(f"Fetching price for {product_id}...")
+        graph = RateGraph(markets_from_prices({**self._known_prices(), **fetched}))
+        prices = {}
+        missing = []
+        for currency in currencies:
+            product_id = self._format_product_id(currency, quote_currency)
+            price = graph.price(currency, quote_currency)
+            if price is None:
+                missing.append(product_id)
+            else:
+                prices[product_id] = price
+        if missing:
+            logging.info(f"No known markets connect {', '.join(missing)}; fetching them directly")
+            prices.update(await self.get_prices(missing))
+        return prices
+
+    async def get_prices(self, product_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Fetch current prices for several cryptocurrencies concurrently.
+        
+        Duplicate product IDs are fetched once. At most PRICE_BATCH_CONCURRENCY
+        products are fetched at the same time.
+        
+        Args:
+            product_ids: Trading pair identifiers (e.g., ['BTC-GBP', 'ETH-GBP'])
             
-            # Get 24h historical data
-            historical_data = await self.get_historical_data(product_id)
-            if not historical_data:
-                raise ValueError("No historical data available")
-                
-            # Get current market data
-            market_data = self.client.get_market_trades(
-                product_id=product_id,
-                limit=1
-            )
+        Returns:
+            Dictionary mapping each product ID to its price information
+            (see get_crypto_price) or to {"error": str} if it could not be fetched
+        """
+        unique_ids = list(dict.fromkeys(product_ids))
+        results = await gather_bounded(
+            unique_ids,
+            self.get_crypto_price,
+            limit=env_int("PRICE_BATCH_CONCURRENCY", 8)
+        )
 
-            # Convert market_data to a dictionary and validate
-            market_data_dict = self._to_dict(market_data)
-            trades = market_data_dict.get('trades', [])
-            if not isinstance(trades, list) or len(trades) == 0:
-                raise ValueError(f"No trades found in market data")
+        prices = {}
+        for product_id, result in zip(unique_ids, results):
+            if isinstance(result, Exception):
+                logging.error(f"Error fetching price for {product_id}: {result}")
+                result = {"error": f"Unable to fetch price for {product_id}."}
+            prices[product_id] = result
+        return prices
 
-            # Get current price from latest trade
-            latest_trade = trades[0]
-            current_price = float(latest_trade["price"])
+    def _held_products(self, portfolio: List[Dict[str, Any]]) -> List[str]:
+        """Products pricing the holdings in MARKET_QUOTE_CURRENCY."""
+        return [self._format_product_id(h["currency"]) for h in portfolio
+                if h["currency"].upper() != self.market_quote]
+
+    async def _quote_prices(self, portfolio: List[Dict[str, Any]], quote_currency: str,
+                            prices: Dict[str, Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+        """
+        Price holdings in a quote currency.
+        Products not already in `prices` are fetched in MARKET_QUOTE_CURRENCY; prices
+        in other quote currencies are derived from those (see _cross_prices).
+        
+        Args:
+            portfolio: Holdings to price
+            quote_currency: Currency to price them in
+            prices: Prices already fetched in MARKET_QUOTE_CURRENCY, keyed by product ID
             
-            # Get price from 24h ago
-            price_24h_ago = float(historical_data[-1]["close"])
+        Returns:
+            Prices keyed by product ID in the quote currency, as value_portfolio expects
+        """
+        missing = [product_id for product_id in self._held_products(portfolio) if product_id not in prices]
+        if missing:
+            prices = {**prices, **await self.get_prices(missing)}
+        if quote_currency != self.market_quote:
+            currencies = [h["currency"] for h in portfolio if h["currency"].upper() != quote_currency]
+            prices = await self._cross_prices(currencies, quote_currency, prices)
+        return prices
+
+    async def get_consolidated_valuation(self, quote_currency: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Value the holdings of every account together.
+        
+        All accounts' balances are fetched concurrently, while the products any of
+        them held at its last valuation are priced. Each product is priced once
+        however many accounts hold it, and the same prices value the combined
+        holdings and each account. Results are cached like get_portfolio_valuation.
+        
+        Args:
+            quote_currency: Currency to value holdings in (default: MARKET_QUOTE_CURRENCY)
             
-            # Calculate percentage change
-            change_24h = ((current_price - price_24h_ago) / price_24h_ago) * 100
-
-            return {
-                "price": str(current_price),
-                "time": latest_trade.get("time", datetime.now(timezone.utc).isoformat()),
-                "change_24h": round(change_24h, 2),
-                "price_24h_ago": str(price_24h_ago)
-            }
+        Returns:
+            Valuation dictionary of the combined holdings as described in
+            valuation.value_portfolio, plus "accounts" mapping each account name
+            to its own valuation
+        """
+        quote_currency = (quote_currency or self.market_quote).upper()
+        return await self.valuation_cache.get_or_load(
+            ("consolidated", quote_currency),
+            lambda: self._value_accounts(quote_currency),
+            ttl=self.valuation_ttl
+        )
 
-        except ValueError as ve:
-            logging.error(f"ValueError: {ve}")
-            return {"error": str(ve)}
-        except Exception as e:
-            logging.error(f"Error fetching price for {product_id}: {e}", exc_info=True)
-            return {"error": f"Unable to fetch price for {product_id}. Please check if the trading pair is supported."}
+    async def _value_accounts(self, quote_currency: str) -> Dict[str, Any]:
+        """Fetch every account's balances, price their union once and value them."""
+        accounts = self.accounts
+        expected = list(dict.fromkeys(
+            product_id for account in accounts.values() for product_id in account._expected_products()
+        ))
+        *portfolios, prices = await asyncio.gather(
+            *(account.get_portfolio() for account in accounts.values()),
+            self.get_prices(expected)
+        )
+        for account, portfolio in zip(accounts.values(), portfolios):
+            account._valued_products[self.market_quote] = self._held_products(portfolio)
+
+        combined = combine_portfolios(portfolios)
+        prices = await self._quote_prices(combined, quote_currency, prices)
+        valuation = value_portfolio(combined, prices, quote_currency)
+        valuation["accounts"] = {
+            name: value_portfolio(portfolio, prices, quote_currency)
+            for name, portfolio in zip(accounts, portfolios)
+        }
+        return valuation
+
+
+    def _candle_ttl(self, granularity: int) -> float:
+        """
+        Compute how long fetched candles stay fresh.
+        Entries never outlive the current candle bucket and are capped by
+        CANDLE_CACHE_MAX_TTL so the in-progress candle is refreshed regularly.
+
+        Args:
+            granularity: Candle width in seconds
+
+        Returns:
+            TTL in seconds
+        """
+        until_next_bucket = granularity - (time.time() % granularity)
+        return max(1.0, min(until_next_bucket, self.candle_cache_max_ttl))
+
+    def cache_stats(self) -> Dict[str, Any]:
+        """
+        Report candle cache usage.
+
+        Returns:
+            Dictionary with hit/miss counters, entry count and estimated size
+        """
+        return {
+            **self.candle_cache.stats.as_dict(),
+            "entries": len(self.candle_cache),
+            "size_bytes": self.candle_cache.size_bytes,
+        }
 
     async def get_historical_data(self, product_id: str) -> List[Dict[str, Any]]:
         """
@@ -213,7 +736,7 @@ class CoinbaseService:
             product_id: The trading pair identifier (e.g., 'BTC-GBP')
             
         Returns:
-            List of dictionaries containing historical price data:
+            List of dictionaries containing historical price data, newest first:
             [
                 {
                     "time": str,        # ISO format timestamp
@@ -226,42 +749,246 @@ class CoinbaseService:
                 ...
             ]
             
+        Raises:
+            Exception: If there is an error fetching the historical data
+        """
+        candles, _ = await self.get_candle_series(product_id)
+        return candles.to_records()
+
+    async def get_historical_snapshot(self, product_id: str) -> Tuple[List[Dict[str, Any]], Optional[float]]:
+        """
+        Fetch historical price data along with how old it is.
+        
+        Args:
+            product_id: The trading pair identifier (e.g., 'BTC-GBP')
+            
+        Returns:
+            Tuple of (candle dictionaries as in get_historical_data,
+            age in seconds if served from the market store or stale else None)
+            
+        Raises:
+            Exception: If there is an error fetching the historical data
+        """
+        candles, age = await self.get_candle_series(product_id)
+        return candles.to_records(), age
+
+    async def get_candle_series(self, product_id: str) -> Tuple[CandleSeries, Optional[float]]:
+        """
+        Fetch the last 24 hours of hourly candles in columnar form.
+        
+        Candles come from the market store when the poller has fresh data for the
+        product, otherwise from the candle cache. Candles are cached per product and
+        granularity until the current candle bucket ends (see _candle_ttl);
+        concurrent misses for the same key share one upstream request. While the
+        candles circuit is open or a refresh is slow, the last known candles are served.
+        
+        Args:
+            product_id: The trading pair identifier (e.g., 'BTC-GBP')
+            
+        Returns:
+            Tuple of (candles oldest first, age in seconds if served from the store
+            or stale else None)
+            
+        Raises:
+            Exception: If there is an error fetching the historical data
+        """
+        stored = self.market_store.get_candles(product_id)
+        if stored is not None and len(stored[0]) > 0 and stored[1] <= self.store_max_age:
+            return stored
+
+        granularity = 3600  # ONE_HOUR in seconds
+        return await self.candle_cache.get_or_revalidate(
+            (product_id, granularity),
+            lambda: self._load_last_day(product_id, granularity),
+            ttl=lambda _: self._candle_ttl(granularity),
+            available=lambda: circuits_available("coinbase_candles"),
+        )
+
+    async def get_candle_range(self, product_id: str, start: int, end: int, granularity: int) -> CandleSeries:
+        """
+        Fetch candles for an arbitrary time range.
+        
+        Coinbase returns at most 300 candles per request, so the range is split into
+        pages that are fetched concurrently (at most HISTORICAL_PAGE_CONCURRENCY at a
+        time) and then merged into one sorted series. Pages go through the candle
+        cache; pages that only hold closed candles stay cached for HISTORICAL_PAGE_TTL.
+        
+        Args:
+            product_id: The trading pair identifier (e.g., 'BTC-GBP')
+            start: Range start in Unix seconds
+            end: Range end in Unix seconds (inclusive)
+            granularity: Candle width in seconds
+            
+        Returns:
+            Candles with bucket start between start and end, oldest first
+            
+        Raises:
+            Exception: If any page could not be fetched
+        """
+        def page_ttl(page_end: int) -> float:
+            if page_end + granularity <= time.time():
+                return self.history_page_ttl
+            return self._candle_ttl(granularity)
+
+        async def load_page(page: Tuple[int, int]) -> CandleSeries:
+            page_start, page_end = page
+            return await self.candle_cache.get_or_load(
+                (product_id, granularity, page_start, page_end),
+                lambda: self._load_candles(product_id, granularity, page_start, page_end),
+                ttl=lambda _: page_ttl(page_end),
+            )
+
+        pages = page_windows(start, end, granularity)
+        logging.debug("Fetching %d candle pages for %s at %ss", len(pages), product_id, granularity)
+        results = await gather_bounded(pages, load_page, limit=env_int("HISTORICAL_PAGE_CONCURRENCY", 4))
+        for result in results:
+            if isinstance(result, Exception):
+                raise result
+        return CandleSeries.concat(results).between(start, end)
+
+    async def fetch_candles(self, product_id: str) -> CandleSeries:
+        """
+        Fetch the last 24 hours of hourly candles, bypassing the market store and
+        cache, and refresh the cache entry with the result.
+        Used by the background poller.
+        
+        Args:
+            product_id: The trading pair identifier (e.g., 'BTC-GBP')
+            
+        Returns:
+            Candles oldest first
+        """
+        granularity = 3600  # ONE_HOUR in seconds
+        candles = await self._load_last_day(product_id, granularity)
+        await self.candle_cache.put((product_id, granularity), candles, self._candle_ttl(granularity))
+        return candles
+
+    async def _load_last_day(self, product_id: str, granularity: int) -> CandleSeries:
+        """Load the last 24 hours of candles (see _load_candles)."""
+        end = int(time.time())
+        return await self._load_candles(product_id, granularity, end - int(timedelta(days=1).total_seconds()), end)
+
+    async def _load_candles(self, product_id: str, granularity: int, start: int, end: int) -> CandleSeries:
+        """
+        Load candles for a range, fetching from Coinbase only what the candle store lacks.
+        
+        Candles inside the store's coverage are read from disk; the missing head
+        and tail of the range are fetched, saved and added to the coverage. The
+        in-progress candle is never covered, so it is always re-fetched.
+        Without a candle store the whole range is fetched.
+        
+        Args:
+            product_id: The trading pair identifier (e.g., 'BTC-GBP')
+            granularity: Candle width in seconds
+            start: Range start in Unix seconds
+            end: Range end in Unix seconds (inclusive), at most 300 buckets after start
+            
+        Returns:
+            Candles oldest first
+        """
+        if self.candle_store is None:
+            return await self._fetch_candles(product_id, granularity, start, end)
+
+        first = -(-start // granularity) * granularity
+        last = end // granularity * granularity
+        last_closed = int(time.time()) // granularity * granularity - granularity
+        coverage = await self.candle_store.coverage(product_id, granularity)
+
+        if coverage is None or last < coverage[0] or first > coverage[1]:
+            gaps = [(first, last)]
+        else:
+            gaps = []
+            if first < coverage[0]:
+                gaps.append((first, coverage[0] - granularity))
+            if last > coverage[1]:
+                gaps.append((coverage[1] + granularity, last))
+
+        async def fill(gap: Tuple[int, int]) -> None:
+            gap_start, gap_end = gap
+            candles = await self._fetch_candles(product_id, granularity, gap_start, gap_end)
+            covered_end = min(gap_end, last_closed)
+            covered = (gap_start, covered_end) if covered_end >= gap_start else None
+            await self.candle_store.save(product_id, granularity, candles, covered)
+
+        if gaps:
+            logging.debug("Fetching %s for %s at %ss, rest from the candle store", gaps, product_id, granularity)
+            await asyncio.gather(*(fill(gap) for gap in gaps))
+        return await self.candle_store.load(product_id, granularity, start, end)
+
+    async def warm_start(self) -> int:
+        """
+        Load the last day of hourly candles from the candle store into the market store.
+        Data keeps its real age, so it is only served directly if it is still recent
+        enough; otherwise it still lets the poller fetch just the newest candles.
+        
+        Returns:
+            Number of products loaded
+        """
+        if self.candle_store is None:
+            return 0
+        granularity = 3600  # ONE_HOUR in seconds
+        recent = await self.candle_store.recent(granularity, int(time.time()) - int(timedelta(days=1).total_seconds()))
+        for product_id, (candles, fetched_at) in recent.items():
+            age = max(0.0, time.time() - fetched_at)
+            self.market_store.update_candles(product_id, candles, updated_at=time.monotonic() - age)
+        logging.info(f"Warm-loaded candles for {len(recent)} products from the candle store")
+        return len(recent)
+
+    async def _fetch_candles(self, product_id: str, granularity: int,
+                             start: Optional[int] = None, end: Optional[int] = None) -> CandleSeries:
+        """
+        Fetch candles from the Coinbase Exchange API, by default for the last 24 hours.
+        
+        Args:
+            product_id: The trading pair identifier (e.g., 'BTC-GBP')
+            granularity: Candle width in seconds
+            start: Range start in Unix seconds (default: 24 hours before end)
+            end: Range end in Unix seconds (default: now)
+            
+        Returns:
+            Candles oldest first
+            
         Raises:
             Exception: If there is an error fetching the historical data
         """
         try:
             # Use the product ID as-is since it's already formatted
-            logging.info(f"Fetching historical data for {product_id}...")
+            logging.debug("Fetching historical data for %s...", product_id)
 
-            end_time = datetime.now(timezone.utc)
-            start_time = end_time - timedelta(days=1)
-            granularity = 3600  # ONE_HOUR in seconds
+            if end is None:
+                end_time = datetime.now(timezone.utc)
+            else:
+                end_time = datetime.fromtimestamp(end, timezone.utc)
+            if start is None:
+                start_time = end_time - timedelta(days=1)
+            else:
+                start_time = datetime.fromtimestamp(start, timezone.utc)
 
-            url = f"https://api.exchange.coinbase.com/products/{product_id}/candles"
+            url = f"{self.exchange_api_url}/products/{product_id}/candles"
             params = {
                 "start": start_time.isoformat(),
                 "end": end_time.isoformat(),
                 "granularity": granularity
             }
 
-            async with httpx.AsyncClient() as client:
-                response = await client.get(url, params=params)
-                response.raise_for_status()
-                candles = response.json()
+            async def request():
+                # Reuse the shared pooled client so keep-alive connections are not torn down
+                with track_upstream("coinbase_candles"):
+                    response = await get_http_client().get(url, params=params)
+                    response.raise_for_status()
+                    return response
 
-            logging.debug(f"Received candles data: {candles}")
+            response = await get_circuit_breaker("coinbase_candles").call(
+                lambda: get_upstream_scheduler().run(PUBLIC, request))
+            candles = response.json()
 
-            return [
-                {
-                    "time": datetime.fromtimestamp(candle[0]).isoformat(),
-                    "low": str(candle[1]),
-                    "high": str(candle[2]),
-                    "open": str(candle[3]),
-                    "close": str(candle[4]),
-                    "volume": str(candle[5])
-                }
-                for candle in candles
-            ]
+            log_payload("Received candles data", candles, product_id=product_id, candles=len(candles))
+
+            return CandleSeries.from_coinbase(candles)
+
+        except CircuitOpenError as e:
+            logging.warning(f"Not fetching historical data for {product_id}: {e}")
+            raise
 
         except Exception as e:
             logging.error(f"Error fetching historical data for {product_id}: {e}", exc_info=True)
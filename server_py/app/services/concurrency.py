@@ -0,0 +1,66 @@
+"""
+Concurrency helpers for fanning out upstream calls.
+"""
+
+from typing import Any, Awaitable, Callable, Iterable, List, Optional, TypeVar
+import asyncio
+
+T = TypeVar("T")
+
+
+class DeadlineExceeded(asyncio.TimeoutError):
+    """Raised for work that was still pending when an overall deadline expired."""
+
+
+async def gather_bounded(items: Iterable[T], func: Callable[[T], Awaitable[Any]],
+                         limit: int, item_timeout: Optional[float] = None,
+                         deadline: Optional[float] = None) -> List[Any]:
+    """
+    Run `func` for every item concurrently, with at most `limit` calls in flight.
+
+    Args:
+        items: Inputs to process
+        func: Coroutine function called once per item
+        limit: Maximum number of concurrent calls
+        item_timeout: Seconds each call may run once it has started (default: no limit)
+        deadline: Seconds until all unfinished calls are cancelled (default: no limit)
+
+    Returns:
+        Results in the same order as `items`. A failed call yields its exception
+        instead of a result: asyncio.TimeoutError for calls exceeding
+        `item_timeout`, DeadlineExceeded for calls cut off by `deadline`.
+    """
+    semaphore = asyncio.Semaphore(max(1, limit))
+
+    async def run(item: T) -> Any:
+        async with semaphore:
+            if item_timeout is None:
+                return await func(item)
+            return await asyncio.wait_for(func(item), item_timeout)
+
+    if deadline is None:
+        return await asyncio.gather(*(run(item) for item in items), return_exceptions=True)
+
+    tasks = [asyncio.ensure_future(run(item)) for item in items]
+    if not tasks:
+        return []
+    try:
+        _, pending = await asyncio.wait(tasks, timeout=deadline)
+    except asyncio.CancelledError:
+        for task in tasks:
+            task.cancel()
+        raise
+    for task in pending:
+        task.cancel()
+    if pending:
+        await asyncio.gather(*pending, return_exceptions=True)
+
+    results = []
+    for task in tasks:
+        if task in pending:
+            results.append(DeadlineExceeded(f"Deadline of {deadline}s exceeded"))
+        elif task.exception() is not None:
+            results.append(task.exception())
+        else:
+            results.append(task.result())
+    return results
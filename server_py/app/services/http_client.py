@@ -0,0 +1,102 @@
+"""
+Shared upstream HTTP client module.
+Owns a single long-lived, connection-pooled httpx.AsyncClient per process so that
+upstream requests reuse TCP/TLS connections instead of reconnecting every call.
+"""
+
+from typing import Any, Optional
+import logging
+import httpx
+from ..config import env_bool, env_float, env_int
+
+_client: Optional[httpx.AsyncClient] = None
+
+
+def _http2_enabled() -> bool:
+    """
+    Check whether HTTP/2 was requested and is available.
+    HTTP/2 support in httpx needs the optional `h2` package.
+    """
+    if not env_bool("UPSTREAM_HTTP2", False):
+        return False
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        logging.warning("UPSTREAM_HTTP2 is enabled but the 'h2' package is not installed; using HTTP/1.1")
+        return False
+    return True
+
+
+def create_http_client(**overrides: Any) -> httpx.AsyncClient:
+    """
+    Build a pooled AsyncClient configured from environment variables.
+
+    Environment variables:
+        UPSTREAM_MAX_CONNECTIONS: Maximum concurrent connections (default: 100)
+        UPSTREAM_MAX_KEEPALIVE_CONNECTIONS: Idle connections kept open (default: 20)
+        UPSTREAM_KEEPALIVE_EXPIRY: Seconds an idle connection is kept (default: 30)
+        UPSTREAM_CONNECT_TIMEOUT: Connect timeout in seconds (default: 5)
+        UPSTREAM_READ_TIMEOUT: Read/write/pool timeout in seconds (default: 10)
+        UPSTREAM_HTTP2: Enable HTTP/2 when 'h2' is installed (default: false)
+
+    Args:
+        overrides: Keyword arguments passed straight to httpx.AsyncClient,
+            e.g. a custom `transport` for tests
+
+    Returns:
+        A new httpx.AsyncClient
+    """
+    limits = httpx.Limits(
+        max_connections=env_int("UPSTREAM_MAX_CONNECTIONS", 100),
+        max_keepalive_connections=env_int("UPSTREAM_MAX_KEEPALIVE_CONNECTIONS", 20),
+        keepalive_expiry=env_float("UPSTREAM_KEEPALIVE_EXPIRY", 30.0),
+    )
+    read_timeout = env_float("UPSTREAM_READ_TIMEOUT", 10.0)
+    timeout = httpx.Timeout(read_timeout, connect=env_float("UPSTREAM_CONNECT_TIMEOUT", 5.0))
+
+    options = {
+        "limits": limits,
+        "timeout": timeout,
+        "http2": _http2_enabled(),
+    }
+    options.update(overrides)
+    return httpx.AsyncClient(**options)
+
+
+def init_http_client(**overrides: Any) -> httpx.AsyncClient:
+    """
+    Create the process-wide client, replacing any existing one.
+    Called from the application lifespan on startup.
+
+    Args:
+        overrides: Keyword arguments passed to create_http_client
+
+    Returns:
+        The shared httpx.AsyncClient
+    """
+    global _client
+    _client = create_http_client(**overrides)
+    logging.info("Initialized shared upstream HTTP client")
+    return _client
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """
+    Return the process-wide client, creating it lazily if the lifespan has not run
+    (for example when the services are used outside of the FastAPI app).
+
+    Returns:
+        The shared httpx.AsyncClient
+    """
+    if _client is None or _client.is_closed:
+        return init_http_client()
+    return _client
+
+
+async def close_http_client() -> None:
+    """Close the process-wide client and release its pooled connections."""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+        logging.info("Closed shared upstream HTTP client")
@@ -0,0 +1,180 @@
+"""
+Vectorized technical indicators over columnar candles.
+Every function takes NumPy arrays ordered oldest first and returns an array of
+the same length; positions without enough history are NaN.
+"""
+
+from typing import Any, Dict, List, Optional
+import math
+import numpy as np
+from .candles import CandleSeries
+
+# Largest exponent used when rescaling exponential weights, well below float64 overflow
+_MAX_EXPONENT = 300.0
+
+
+def _nan_prefix(values: np.ndarray, count: int) -> np.ndarray:
+    """Set the first `count` positions to NaN in place and return the array."""
+    values[:min(count, len(values))] = np.nan
+    return values
+
+
+def ewm(values: np.ndarray, alpha: float) -> np.ndarray:
+    """
+    Exponentially weighted moving average, seeded with the first value
+    (y[0] = x[0], y[t] = alpha * x[t] + (1 - alpha) * y[t-1]).
+
+    The recurrence is evaluated with cumulative sums of rescaled weights. The
+    input is processed in blocks short enough that the weights cannot overflow,
+    carrying the last average across blocks.
+
+    Args:
+        values: Input series
+        alpha: Smoothing factor in (0, 1]
+
+    Returns:
+        Smoothed series of the same length
+    """
+    values = np.asarray(values, dtype=np.float64)
+    out = np.empty_like(values)
+    if len(values) == 0:
+        return out
+    decay = 1.0 - alpha
+    if decay <= 0.0:
+        out[:] = values
+        return out
+
+    block = max(1, int(_MAX_EXPONENT / -np.log(decay)))
+    previous = values[0]
+    for start in range(0, len(values), block):
+        chunk = values[start:start + block]
+        powers = decay ** np.arange(len(chunk), dtype=np.float64)
+        # y[k] = decay^k * (decay * previous + alpha * sum_j x[j] / decay^j)
+        scaled = np.cumsum(chunk / powers) * alpha + decay * previous
+        out[start:start + len(chunk)] = scaled * powers
+        previous = out[start + len(chunk) - 1]
+    return out
+
+
+def sma(close: np.ndarray, window: int) -> np.ndarray:
+    """Simple moving average over `window` candles."""
+    close = np.asarray(close, dtype=np.float64)
+    out = np.full(len(close), np.nan)
+    if window <= 0 or len(close) < window:
+        return out
+    sums = np.cumsum(np.concatenate([[0.0], close]))
+    out[window - 1:] = (sums[window:] - sums[:-window]) / window
+    return out
+
+
+def ema(close: np.ndarray, window: int) -> np.ndarray:
+    """Exponential moving average with span `window` (alpha = 2 / (window + 1))."""
+    return _nan_prefix(ewm(close, 2.0 / (window + 1)), window - 1)
+
+
+def rsi(close: np.ndarray, window: int = 14) -> np.ndarray:
+    """
+    Relative Strength Index using Wilder's smoothing (alpha = 1 / window).
+
+    Returns:
+        Values between 0 and 100; 100 when there were no losses in the window,
+        50 when the price did not move at all
+    """
+    close = np.asarray(close, dtype=np.float64)
+    out = np.full(len(close), np.nan)
+    if len(close) < 2:
+        return out
+    change = np.diff(close)
+    gains = ewm(np.clip(change, 0, None), 1.0 / window)
+    losses = ewm(np.clip(-change, 0, None), 1.0 / window)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        strength = 100.0 - 100.0 / (1.0 + gains / losses)
+    strength[losses == 0] = 100.0
+    strength[(gains == 0) & (losses == 0)] = 50.0
+    out[1:] = strength
+    return _nan_prefix(out, window)
+
+
+def vwap(high: np.ndarray, low: np.ndarray, close: np.ndarray, volume: np.ndarray) -> np.ndarray:
+    """Cumulative volume-weighted average of the typical price (high + low + close) / 3."""
+    typical = (np.asarray(high) + np.asarray(low) + np.asarray(close)) / 3.0
+    volume = np.asarray(volume, dtype=np.float64)
+    cumulative_volume = np.cumsum(volume)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        out = np.cumsum(typical * volume) / cumulative_volume
+    out[cumulative_volume == 0] = np.nan
+    return out
+
+
+def atr(high: np.ndarray, low: np.ndarray, close: np.ndarray, window: int = 14) -> np.ndarray:
+    """Average True Range with Wilder's smoothing."""
+    high = np.asarray(high, dtype=np.float64)
+    low = np.asarray(low, dtype=np.float64)
+    close = np.asarray(close, dtype=np.float64)
+    if len(close) == 0:
+        return np.empty(0)
+    previous_close = np.concatenate([[close[0]], close[:-1]])
+    true_range = np.maximum.reduce([
+        high - low,
+        np.abs(high - previous_close),
+        np.abs(low - previous_close),
+    ])
+    return _nan_prefix(ewm(true_range, 1.0 / window), window - 1)
+
+
+def realized_volatility(close: np.ndarray, window: int, periods_per_year: float) -> np.ndarray:
+    """
+    Rolling annualized volatility of log returns.
+
+    Args:
+        close: Closing prices
+        window: Number of returns per rolling window
+        periods_per_year: Candles per year, used to annualize (e.g. 8760 for hourly)
+
+    Returns:
+        Standard deviation of log returns times sqrt(periods_per_year)
+    """
+    close = np.asarray(close, dtype=np.float64)
+    out = np.full(len(close), np.nan)
+    if window < 2 or len(close) <= window:
+        return out
+    returns = np.diff(np.log(close))
+    windows = np.lib.stride_tricks.sliding_window_view(returns, window)
+    out[window:] = windows.std(axis=1, ddof=1) * np.sqrt(periods_per_year)
+    return out
+
+
+def _json_values(values: np.ndarray) -> List[Optional[float]]:
+    """Convert an array to a JSON-friendly list, mapping NaN to None."""
+    return [None if math.isnan(value) else round(value, 8) for value in values.tolist()]
+
+
+def compute_indicators(series: CandleSeries, window: int, granularity: int) -> Dict[str, Any]:
+    """
+    Compute all supported indicators for a candle series.
+
+    Args:
+        series: Candles oldest first
+        window: Look-back window used by SMA, EMA, RSI, ATR and volatility
+        granularity: Candle width in seconds, used to annualize volatility
+
+    Returns:
+        Dictionary with ISO timestamps, closes, one series per indicator and the
+        latest value of each indicator under "latest"
+    """
+    values = {
+        "sma": sma(series.close, window),
+        "ema": ema(series.close, window),
+        "rsi": rsi(series.close, window),
+        "vwap": vwap(series.high, series.low, series.close, series.volume),
+        "atr": atr(series.high, series.low, series.close, window),
+        "volatility": realized_volatility(series.close, window, 365 * 86400 / granularity),
+    }
+    return {
+        "window": window,
+        "granularity": granularity,
+        "time": series.iso_times(),
+        "close": _json_values(series.close),
+        **{name: _json_values(array) for name, array in values.items()},
+        "latest": {name: (_json_values(array[-1:]) or [None])[0] for name, array in values.items()},
+    }
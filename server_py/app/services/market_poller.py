@@ -0,0 +1,130 @@
+"""
+Background market data poller.
+Periodically refreshes candles and the latest trade for tracked products
+(portfolio currencies plus configured extras) into the in-memory market store.
+"""
+
+from typing import Any, List, Optional
+import asyncio
+import logging
+import time
+from .concurrency import gather_bounded
+from .market_store import MarketDataStore
+from .upstream_scheduler import Priority, upstream_priority
+from ..config import env_float, env_int, env_list
+
+
+class MarketDataPoller:
+    """
+    Asyncio task that keeps the market store fresh.
+
+    Environment variables:
+        MARKET_POLLER_INTERVAL: Seconds between polls (default: 30)
+        MARKET_POLLER_EXTRA_PRODUCTS: Comma-separated products tracked in addition
+            to portfolio currencies, e.g. 'BTC-GBP,ETH-GBP'
+        MARKET_POLLER_PORTFOLIO_REFRESH: Seconds between portfolio re-reads (default: 300)
+        MARKET_POLLER_CONCURRENCY: Products polled at once (default: 4)
+        MARKET_POLLER_QUOTE_CURRENCY: Quote currency for portfolio products
+            (default: the service's market quote currency, see MARKET_QUOTE_CURRENCY)
+    """
+
+    def __init__(self, service: Any, store: MarketDataStore):
+        """
+        Args:
+            service: CoinbaseService used for upstream calls
+            store: Store that receives the polled data
+        """
+        self.service = service
+        self.store = store
+        self.interval = env_float("MARKET_POLLER_INTERVAL", 30.0)
+        self.extra_products = env_list("MARKET_POLLER_EXTRA_PRODUCTS")
+        self.portfolio_refresh = env_float("MARKET_POLLER_PORTFOLIO_REFRESH", 300.0)
+        self.concurrency = env_int("MARKET_POLLER_CONCURRENCY", 4)
+        self.quote_currency = (env_list("MARKET_POLLER_QUOTE_CURRENCY") or [service.market_quote])[0].upper()
+        self._portfolio_products: List[str] = []
+        self._portfolio_read_at: Optional[float] = None
+        self._portfolio_failures = 0
+        self._portfolio_retry_at = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        """Start polling in the background."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+            logging.info(f"Started market data poller (interval {self.interval}s)")
+
+    async def stop(self) -> None:
+        """Cancel the polling task and wait for it to finish."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            logging.info("Stopped market data poller")
+
+    async def _run(self) -> None:
+        """Poll forever, never letting one failed round stop the loop."""
+        while True:
+            try:
+                await self.poll_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logging.error(f"Market data poll failed: {e}", exc_info=True)
+            await asyncio.sleep(self.interval)
+
+    async def tracked_products(self) -> List[str]:
+        """
+        Return the products to poll: portfolio currencies plus configured extras.
+        The portfolio is re-read at most every MARKET_POLLER_PORTFOLIO_REFRESH seconds.
+        If a read fails the previous products are kept and the read is retried after
+        one poll interval, doubling with each further failure up to the refresh period.
+        """
+        now = time.monotonic()
+        due = self._portfolio_read_at is None or now - self._portfolio_read_at >= self.portfolio_refresh
+        if due and now >= self._portfolio_retry_at:
+            try:
+                portfolio, _ = await self.service.load_portfolio()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self._portfolio_failures += 1
+                delay = min(self.interval * 2 ** (self._portfolio_failures - 1), self.portfolio_refresh)
+                self._portfolio_retry_at = now + delay
+                logging.warning(f"Failed to read the portfolio: {e}; keeping the previously tracked products "
+                                f"and retrying in {delay:.0f}s")
+            else:
+                self._portfolio_products = [
+                    f"{holding['currency']}-{self.quote_currency}"
+                    for holding in portfolio
+                    if holding["currency"].upper() != self.quote_currency
+                ]
+                self._portfolio_read_at = now
+                self._portfolio_failures = 0
+        return list(dict.fromkeys(self._portfolio_products + self.extra_products))
+
+    async def poll_once(self) -> None:
+        """
+        Refresh candles and the latest trade for every tracked product.
+        Upstream requests run at background priority, behind user-facing ones.
+        """
+        with upstream_priority(Priority.BACKGROUND):
+            products = await self.tracked_products()
+            for product_id in self.store.products():
+                if product_id not in products:
+                    self.store.discard(product_id)
+            results = await gather_bounded(products, self._poll_product, limit=self.concurrency)
+        for product_id, result in zip(products, results):
+            if isinstance(result, Exception):
+                logging.warning(f"Failed to poll {product_id}: {result}")
+
+    async def _poll_product(self, product_id: str) -> None:
+        """Fetch candles and the latest trade for one product into the store."""
+        candles, trade = await asyncio.gather(
+            self.service.fetch_candles(product_id),
+            self.service.fetch_latest_trade(product_id)
+        )
+        self.store.update_candles(product_id, candles)
+        self.store.add_trade(product_id, trade)
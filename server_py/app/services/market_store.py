@@ -0,0 +1,189 @@
+"""
+In-memory market data store.
+Keeps recent candles (columnar, capped at a fixed length) and trades (in a
+fixed-size ring buffer) per product so API requests can be answered without
+waiting on Coinbase.
+"""
+
+from datetime import timedelta
+from typing import Any, Dict, List, Optional, Tuple
+import logging
+import time
+from .candles import CANDLE_BYTES, CandleSeries
+
+# Rough memory footprint of one stored trade dictionary in bytes
+TRADE_BYTES = 600
+
+
+class RingBuffer:
+    """
+    Fixed-capacity buffer that overwrites its oldest item when full.
+    Storage is allocated once, so memory use does not grow after creation.
+    """
+
+    __slots__ = ("capacity", "_items", "_start", "_size")
+
+    def __init__(self, capacity: int):
+        self.capacity = max(1, capacity)
+        self._items: List[Any] = [None] * self.capacity
+        self._start = 0
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def append(self, item: Any) -> None:
+        """Add an item, dropping the oldest one if the buffer is full."""
+        end = (self._start + self._size) % self.capacity
+        self._items[end] = item
+        if self._size < self.capacity:
+            self._size += 1
+        else:
+            self._start = (self._start + 1) % self.capacity
+
+    def replace_last(self, item: Any) -> None:
+        """Overwrite the newest item, or append if the buffer is empty."""
+        if self._size == 0:
+            self.append(item)
+        else:
+            self._items[(self._start + self._size - 1) % self.capacity] = item
+
+    def last(self) -> Any:
+        """Return the newest item, or None if the buffer is empty."""
+        if self._size == 0:
+            return None
+        return self._items[(self._start + self._size - 1) % self.capacity]
+
+    def items(self) -> List[Any]:
+        """Return all items from oldest to newest."""
+        return [self._items[(self._start + i) % self.capacity] for i in range(self._size)]
+
+
+class ProductSeries:
+    """Candles, trade ring buffer and update times for a single product."""
+
+    __slots__ = ("candles", "trades", "candles_updated_at", "trades_updated_at")
+
+    def __init__(self, capacity: int):
+        self.candles = CandleSeries.empty()
+        self.trades = RingBuffer(capacity)
+        self.candles_updated_at: Optional[float] = None
+        self.trades_updated_at: Optional[float] = None
+
+
+class MarketDataStore:
+    """
+    Per-product candle and trade history bounded by a memory budget.
+
+    The budget is split evenly across `max_products` products; each product keeps
+    at most `capacity` candles and `capacity` trades.
+    """
+
+    def __init__(self, max_bytes: int = 8 * 1024 * 1024, max_products: int = 50):
+        """
+        Args:
+            max_bytes: Approximate memory budget for all stored entries
+            max_products: Maximum number of products tracked at once
+        """
+        self.configure(max_bytes, max_products)
+
+    def configure(self, max_bytes: int, max_products: int) -> None:
+        """
+        Set the memory budget and drop all stored data.
+
+        Args:
+            max_bytes: Approximate memory budget for all stored entries
+            max_products: Maximum number of products tracked at once
+        """
+        self.max_products = max(1, max_products)
+        self.capacity = max(1, max_bytes // (self.max_products * (CANDLE_BYTES + TRADE_BYTES)))
+        if self.capacity < 25:
+            logging.warning(f"Market store holds only {self.capacity} candles per product; "
+                            "increase MARKET_STORE_MAX_BYTES to keep a full 24h window")
+        self._series: Dict[str, ProductSeries] = {}
+
+    def _series_for(self, product_id: str) -> Optional[ProductSeries]:
+        """Return the series for a product, creating it while under the product limit."""
+        series = self._series.get(product_id)
+        if series is None:
+            if len(self._series) >= self.max_products:
+                logging.warning(f"Market store is full, not tracking {product_id}")
+                return None
+            series = self._series[product_id] = ProductSeries(self.capacity)
+        return series
+
+    def update_candles(self, product_id: str, candles: CandleSeries, updated_at: Optional[float] = None) -> None:
+        """
+        Merge freshly fetched candles into the product's history.
+        Fresh values replace stored ones for the same bucket, since the newest
+        candle is still in progress; the oldest candles beyond capacity are dropped.
+
+        Args:
+            product_id: Trading pair identifier
+            candles: Freshly fetched candles
+            updated_at: time.monotonic() value of when the candles were fetched (default: now)
+        """
+        series = self._series_for(product_id)
+        if series is None:
+            return
+        series.candles = series.candles.merge(candles).tail(self.capacity)
+        series.candles_updated_at = time.monotonic() if updated_at is None else updated_at
+
+    def add_trade(self, product_id: str, trade: Dict[str, Any]) -> None:
+        """
+        Record the latest trade for a product.
+
+        Args:
+            product_id: Trading pair identifier
+            trade: Dictionary with at least "price" and "time"
+        """
+        series = self._series_for(product_id)
+        if series is None:
+            return
+        last = series.trades.last()
+        if last is not None and last.get("trade_id") and last.get("trade_id") == trade.get("trade_id"):
+            series.trades.replace_last(trade)
+        else:
+            series.trades.append(trade)
+        series.trades_updated_at = time.monotonic()
+
+    def get_candles(self, product_id: str, window: timedelta = timedelta(days=1)) -> Optional[Tuple[CandleSeries, float]]:
+        """
+        Return stored candles inside a trailing time window.
+
+        Args:
+            product_id: Trading pair identifier
+            window: How far back to include candles (default: 24 hours)
+
+        Returns:
+            Tuple of (candles oldest first, age in seconds), or None if nothing is stored
+        """
+        series = self._series.get(product_id)
+        if series is None or series.candles_updated_at is None:
+            return None
+        candles = series.candles.since(time.time() - window.total_seconds())
+        return candles, time.monotonic() - series.candles_updated_at
+
+    def latest_trade(self, product_id: str) -> Optional[Tuple[Dict[str, Any], float]]:
+        """
+        Return the most recent trade for a product.
+
+        Returns:
+            Tuple of (trade, age in seconds), or None if nothing is stored
+        """
+        series = self._series.get(product_id)
+        if series is None or series.trades_updated_at is None:
+            return None
+        return series.trades.last(), time.monotonic() - series.trades_updated_at
+
+    def products(self) -> List[str]:
+        """Return the products currently held in the store."""
+        return list(self._series)
+
+    def discard(self, product_id: str) -> None:
+        """Stop holding data for a product."""
+        self._series.pop(product_id, None)
+
+
+# Process-wide store written by the background poller and read by the services
+market_store = MarketDataStore()
@@ -0,0 +1,338 @@
+"""
+Portfolio value history.
+Snapshots of the portfolio's total value and per-asset weights are appended at a
+fixed cadence to a compact binary file of fixed-width records, read back through
+a memory map. Records are in time order, so a range is found by binary search,
+and long ranges are downsampled with min/max decimation so peaks and troughs
+survive. Asset codes are kept in a small sidecar file and referenced by index.
+"""
+
+from typing import Any, Dict, List, Optional, Tuple
+import asyncio
+import logging
+import os
+import struct
+import time
+import numpy as np
+from ..config import env_float, env_int
+from .upstream_scheduler import Priority, upstream_priority
+
+try:
+    import fcntl
+except ImportError:  # Windows: no advisory locks, every process records
+    fcntl = None
+
+MAGIC = b"CVPH"
+VERSION = 1
+# Magic, version, asset slots per record, quote currency, record size
+HEADER = struct.Struct("<4sHH8sI12x")
+
+
+def record_dtype(max_assets: int) -> np.dtype:
+    """
+    Fixed-width snapshot record: Unix time, total value and up to `max_assets`
+    (asset index, weight) slots, largest holdings first; index 0 marks an empty slot.
+    """
+    return np.dtype([
+        ("time", "<i8"),
+        ("value", "<f8"),
+        ("assets", "<u2", (max_assets,)),
+        ("weights", "<f4", (max_assets,)),
+    ])
+
+
+def decimate(values: np.ndarray, points: int) -> np.ndarray:
+    """
+    Pick at most `points` indices of a series, keeping each bucket's extremes.
+
+    The series is split into points // 2 equal buckets and the positions of the
+    minimum and maximum of each bucket are kept, in time order, so spikes are
+    not averaged away however long the range is.
+
+    Args:
+        values: Series to downsample
+        points: Maximum number of indices to return (at least 2)
+
+    Returns:
+        Sorted indices into `values`
+    """
+    n = len(values)
+    if n <= points:
+        return np.arange(n)
+    buckets = max(1, points // 2)
+    size = -(-n // buckets)
+    padded = np.full(buckets * size, np.nan)
+    padded[:n] = values
+    grid = padded.reshape(buckets, size)
+    valid = ~np.isnan(grid).all(axis=1)
+    offsets = np.arange(buckets)[valid] * size
+    lows = np.nanargmin(grid[valid], axis=1) + offsets
+    highs = np.nanargmax(grid[valid], axis=1) + offsets
+    return np.unique(np.concatenate([lows, highs]))
+
+
+class PortfolioHistory:
+    """
+    Append-only file of portfolio snapshots.
+
+    The file starts with a 32-byte header naming the quote currency and the
+    number of asset slots, followed by fixed-width records (see record_dtype).
+    Readers map the file and pick up records appended by other processes.
+    """
+
+    def __init__(self, path: str, quote_currency: str, max_assets: int = 16):
+        """
+        Args:
+            path: History file; asset codes go to `path` + '.assets'
+            quote_currency: Currency values are recorded in
+            max_assets: Asset weight slots per record, used when creating the file
+
+        Raises:
+            ValueError: If an existing file is not a history file or records another quote currency
+        """
+        self.path = path
+        self.assets_path = f"{path}.assets"
+        self.quote_currency = quote_currency.upper()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        if not os.path.exists(path) or os.path.getsize(path) < HEADER.size:
+            self._create(max_assets)
+        with open(path, "rb") as f:
+            magic, version, slots, quote, itemsize = HEADER.unpack(f.read(HEADER.size))
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a portfolio history file")
+        recorded_quote = quote.rstrip(b"\0").decode("ascii")
+        if recorded_quote != self.quote_currency:
+            raise ValueError(f"{path} records values in {recorded_quote}, not {self.quote_currency}")
+        self.max_assets = slots
+        self.dtype = record_dtype(slots)
+        if self.dtype.itemsize != itemsize:
+            raise ValueError(f"{path} has {itemsize}-byte records, expected {self.dtype.itemsize}")
+        self._records: Optional[np.memmap] = None
+        self._assets: List[str] = []
+        self._asset_ids: Dict[str, int] = {}
+        self._lock_file = None
+        self._load_assets()
+
+    def _create(self, max_assets: int) -> None:
+        """Write the header of a new, empty history file."""
+        header = HEADER.pack(MAGIC, VERSION, max_assets, self.quote_currency.encode("ascii")[:8],
+                             record_dtype(max_assets).itemsize)
+        with open(self.path, "wb") as f:
+            f.write(header)
+
+    def _load_assets(self) -> None:
+        """Read the asset codes; a record's asset index i refers to line i."""
+        try:
+            with open(self.assets_path, encoding="ascii") as f:
+                self._assets = f.read().split()
+        except FileNotFoundError:
+            self._assets = []
+        self._asset_ids = {code: i + 1 for i, code in enumerate(self._assets)}
+
+    def __len__(self) -> int:
+        return len(self.records())
+
+    def records(self) -> np.ndarray:
+        """
+        All complete records, mapped read-only from the file.
+        The mapping is renewed when the file has grown; a partially written
+        trailing record is ignored.
+        """
+        count = max(0, os.path.getsize(self.path) - HEADER.size) // self.dtype.itemsize
+        if self._records is None or len(self._records) != count:
+            if count == 0:
+                return np.zeros(0, dtype=self.dtype)
+            self._records = np.memmap(self.path, dtype=self.dtype, mode="r", offset=HEADER.size, shape=(count,))
+        return self._records
+
+    def acquire_writer(self) -> bool:
+        """
+        Take the exclusive right to append, so only one worker process records.
+        Returns True if this process holds it (always where file locks are unavailable).
+        """
+        if self._lock_file is not None:
+            return True
+        lock_file = open(f"{self.path}.lock", "a")
+        if fcntl is not None:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                lock_file.close()
+                return False
+        self._lock_file = lock_file
+        # Drop a record left half-written by a previous writer that crashed
+        size = os.path.getsize(self.path)
+        complete = HEADER.size + (size - HEADER.size) // self.dtype.itemsize * self.dtype.itemsize
+        if complete != size:
+            os.truncate(self.path, complete)
+        return True
+
+    def append(self, timestamp: int, value: float, weights: Dict[str, float]) -> bool:
+        """
+        Append a snapshot. Snapshots must be later than the last one.
+
+        Args:
+            timestamp: Unix seconds
+            value: Total portfolio value in the quote currency
+            weights: Share of the total per asset; the largest `max_assets` are kept
+
+        Returns:
+            False if the snapshot is not after the last recorded one
+        """
+        records = self.records()
+        if len(records) and timestamp <= int(records["time"][-1]):
+            return False
+        kept = sorted(weights.items(), key=lambda item: item[1], reverse=True)[:self.max_assets]
+        new_codes = [code for code, _ in kept if code not in self._asset_ids]
+        if new_codes:
+            with open(self.assets_path, "a", encoding="ascii") as f:
+                f.write("".join(f"{code}\n" for code in new_codes))
+            self._load_assets()
+
+        record = np.zeros(1, dtype=self.dtype)
+        record["time"] = timestamp
+        record["value"] = value
+        for slot, (code, weight) in enumerate(kept):
+            record["assets"][0, slot] = self._asset_ids[code]
+            record["weights"][0, slot] = weight
+        with open(self.path, "ab") as f:
+            f.write(record.tobytes())
+        return True
+
+    def span(self, start: int, end: int) -> Tuple[int, int]:
+        """Index range [first, last) of records with start <= time <= end, by binary search."""
+        times = self.records()["time"]
+        return int(np.searchsorted(times, start, "left")), int(np.searchsorted(times, end, "right"))
+
+    def query(self, start: int, end: int, points: int) -> Dict[str, Any]:
+        """
+        Return the snapshots between two times, downsampled to at most `points`.
+
+        Args:
+            start: Range start in Unix seconds
+            end: Range end in Unix seconds (inclusive)
+            points: Maximum number of snapshots returned (see decimate)
+
+        Returns:
+            Columnar dictionary:
+            {
+                "quote_currency": str,
+                "count": int,                   # Snapshots in the range before downsampling
+                "time": [int],                  # Unix seconds
+                "value": [float],
+                "weights": {currency: [float]}  # 0 where the asset was not held
+            }
+        """
+        first, last = self.span(start, end)
+        selected = self.records()[first:last]
+        selected = selected[decimate(selected["value"], points)]
+
+        assets, weights = selected["assets"], selected["weights"]
+        if len(selected) and int(assets.max()) > len(self._assets):
+            # Another process recorded new assets
+            self._load_assets()
+        ids = np.unique(assets[assets > 0])
+        columns = np.zeros((len(selected), len(ids)), dtype=np.float32)
+        for slot in range(self.max_assets):
+            held = assets[:, slot] > 0
+            columns[held, np.searchsorted(ids, assets[held, slot])] = weights[held, slot]
+
+        return {
+            "quote_currency": self.quote_currency,
+            "count": last - first,
+            "time": selected["time"].tolist(),
+            "value": selected["value"].tolist(),
+            "weights": {self._assets[i - 1]: columns[:, column].astype(float).round(6).tolist()
+                        for column, i in enumerate(ids.tolist())},
+        }
+
+    def close(self) -> None:
+        """Release the mapping and the writer lock."""
+        self._records = None
+        if self._lock_file is not None:
+            self._lock_file.close()
+            self._lock_file = None
+
+
+class PortfolioRecorder:
+    """
+    Background task appending a portfolio valuation to the history at a fixed cadence.
+
+    Snapshots are taken on multiples of the interval (e.g. every 5 minutes on the
+    clock). With several worker processes only the one holding the history's
+    writer lock records; the others keep trying, taking over if it stops.
+    Valuations with no priced holdings (e.g. balances unavailable) are skipped.
+
+    Environment variables:
+        PORTFOLIO_HISTORY_INTERVAL: Seconds between snapshots (default: 300)
+    """
+
+    def __init__(self, service: Any, history: PortfolioHistory):
+        """
+        Args:
+            service: CoinbaseService used to value the portfolio
+            history: History receiving the snapshots
+        """
+        self.service = service
+        self.history = history
+        self.interval = env_float("PORTFOLIO_HISTORY_INTERVAL", 300.0)
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        """Start recording in the background."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+            logging.info(f"Started portfolio history recorder (interval {self.interval}s)")
+
+    async def stop(self) -> None:
+        """Cancel the recording task and wait for it to finish."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        """Record on every cadence tick, never letting one failure stop the loop."""
+        while True:
+            await asyncio.sleep(self.interval - time.time() % self.interval)
+            try:
+                if self.history.acquire_writer():
+                    await self.record_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logging.error(f"Portfolio snapshot failed: {e}", exc_info=True)
+
+    async def record_once(self) -> bool:
+        """
+        Value the portfolio in the history's quote currency and append it.
+
+        Returns:
+            True if a snapshot was recorded
+        """
+        with upstream_priority(Priority.BACKGROUND):
+            valuation = await self.service.get_portfolio_valuation(self.history.quote_currency)
+        weights = {asset["currency"]: float(asset["weight"]) for asset in valuation["assets"]
+                   if asset["weight"] is not None}
+        if not weights:
+            logging.warning("Skipping portfolio snapshot: no holdings could be valued")
+            return False
+        timestamp = int(time.time())
+        return self.history.append(timestamp, float(valuation["total_value"]), weights)
+
+
+def open_portfolio_history(quote_currency: str) -> PortfolioHistory:
+    """
+    Open the history file configured by environment variables.
+
+    Environment variables:
+        PORTFOLIO_HISTORY_PATH: History file (default: data/portfolio_history.bin)
+        PORTFOLIO_HISTORY_MAX_ASSETS: Asset weight slots per snapshot, for new files (default: 16)
+    """
+    return PortfolioHistory(os.getenv("PORTFOLIO_HISTORY_PATH", "data/portfolio_history.bin"), quote_currency,
+                            max_assets=env_int("PORTFOLIO_HISTORY_MAX_ASSETS", 16))
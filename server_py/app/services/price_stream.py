@@ -0,0 +1,235 @@
+"""
+Live price streaming hub.
+Maintains a single upstream Coinbase market data WebSocket subscription and
+multiplexes its ticker messages to every connected client, with a bounded
+per-client queue that drops the oldest ticks for slow consumers.
+"""
+
+from typing import Any, Dict, Iterable, Optional, Set
+import asyncio
+import json
+import logging
+import os
+from websockets.asyncio.client import connect
+from .market_store import MarketDataStore, market_store
+from ..config import env_float, env_int
+
+
+class StreamSubscriber:
+    """
+    One connected client: the products it follows and its outgoing tick queue.
+    When the queue is full the oldest tick is dropped to make room, so a slow
+    client always receives the most recent prices and never blocks the hub.
+    """
+
+    def __init__(self, queue_size: int):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max(1, queue_size))
+        self.products: Set[str] = set()
+        self.dropped = 0
+
+    def offer(self, tick: Dict[str, Any]) -> None:
+        """Queue a tick, discarding the oldest queued tick if the queue is full."""
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(tick)
+
+    async def next_tick(self) -> Dict[str, Any]:
+        """Wait for the next tick."""
+        return await self.queue.get()
+
+
+class PriceStreamHub:
+    """
+    Fan-out hub between one upstream ticker feed and many clients.
+
+    The upstream connection is opened when the first client registers, closed when
+    the last one leaves, and re-established with exponential backoff if it drops.
+    Products are subscribed upstream while at least one client follows them.
+
+    Environment variables:
+        COINBASE_WS_URL: Market data feed URL (default: wss://ws-feed.exchange.coinbase.com)
+        STREAM_CLIENT_QUEUE_SIZE: Ticks buffered per client before dropping the oldest (default: 100)
+        STREAM_RECONNECT_MAX_DELAY: Upper bound in seconds for the reconnect backoff (default: 30)
+    """
+
+    def __init__(self, url: Optional[str] = None, queue_size: Optional[int] = None,
+                 store: Optional[MarketDataStore] = None):
+        """
+        Args:
+            url: Upstream feed URL (default: COINBASE_WS_URL)
+            queue_size: Per-client queue size (default: STREAM_CLIENT_QUEUE_SIZE)
+            store: Market store that also receives streamed trades (default: shared store)
+        """
+        self.url = url or os.getenv("COINBASE_WS_URL", "wss://ws-feed.exchange.coinbase.com")
+        self.queue_size = queue_size or env_int("STREAM_CLIENT_QUEUE_SIZE", 100)
+        self.reconnect_max_delay = env_float("STREAM_RECONNECT_MAX_DELAY", 30.0)
+        self.store = store if store is not None else market_store
+        self._subscribers: Set[StreamSubscriber] = set()
+        self._followers: Dict[str, Set[StreamSubscriber]] = {}
+        self._ws: Any = None
+        self._task: Optional[asyncio.Task] = None
+
+    def register(self) -> StreamSubscriber:
+        """Add a client and make sure the upstream connection is running."""
+        subscriber = StreamSubscriber(self.queue_size)
+        self._subscribers.add(subscriber)
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        return subscriber
+
+    async def unregister(self, subscriber: StreamSubscriber) -> None:
+        """
+        Remove a client and drop upstream subscriptions nobody else needs.
+        The upstream connection is closed when no clients remain.
+        """
+        await self.unsubscribe(subscriber, list(subscriber.products))
+        self._subscribers.discard(subscriber)
+        if not self._subscribers:
+            await self._stop()
+
+    async def subscribe(self, subscriber: StreamSubscriber, product_ids: Iterable[str]) -> None:
+        """
+        Follow products for a client.
+        The last known trade from the market store is pushed immediately so the
+        client does not wait for the next upstream tick.
+        """
+        added = []
+        for product_id in product_ids:
+            product_id = product_id.upper()
+            if product_id in subscriber.products:
+                continue
+            subscriber.products.add(product_id)
+            followers = self._followers.setdefault(product_id, set())
+            if not followers:
+                added.append(product_id)
+            followers.add(subscriber)
+
+            latest = self.store.latest_trade(product_id)
+            if latest is not None:
+                subscriber.offer({"type": "ticker", "product_id": product_id,
+                                  "price": latest[0].get("price"), "time": latest[0].get("time")})
+        if added:
+            await self._send({"type": "subscribe", "product_ids": added, "channels": ["ticker"]})
+
+    async def unsubscribe(self, subscriber: StreamSubscriber, product_ids: Iterable[str]) -> None:
+        """Stop following products for a client."""
+        removed = []
+        for product_id in product_ids:
+            product_id = product_id.upper()
+            subscriber.products.discard(product_id)
+            followers = self._followers.get(product_id)
+            if followers is None:
+                continue
+            followers.discard(subscriber)
+            if not followers:
+                del self._followers[product_id]
+                removed.append(product_id)
+        if removed:
+            await self._send({"type": "unsubscribe", "product_ids": removed, "channels": ["ticker"]})
+
+    async def close(self) -> None:
+        """Disconnect from upstream and forget all clients."""
+        await self._stop()
+        self._subscribers.clear()
+        self._followers.clear()
+
+    async def _stop(self) -> None:
+        """Cancel the upstream connection task; the next registration starts a new one."""
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+    def stats(self) -> Dict[str, Any]:
+        """Report connected clients, followed products and dropped ticks."""
+        return {
+            "connected": self._ws is not None,
+            "clients": len(self._subscribers),
+            "products": sorted(self._followers),
+            "dropped_ticks": sum(subscriber.dropped for subscriber in self._subscribers),
+        }
+
+    async def _send(self, message: Dict[str, Any]) -> None:
+        """Send a control message upstream if connected; it is replayed on reconnect otherwise."""
+        if self._ws is None:
+            return
+        try:
+            await self._ws.send(json.dumps(message))
+        except Exception as e:
+            logging.warning(f"Failed to send {message['type']} to price feed: {e}")
+
+    async def _run(self) -> None:
+        """Keep the upstream connection alive and dispatch its messages."""
+        delay = 1.0
+        while True:
+            try:
+                async with connect(self.url) as ws:
+                    self._ws = ws
+                    delay = 1.0
+                    logging.info(f"Connected to price feed {self.url}")
+                    if self._followers:
+                        await self._send({"type": "subscribe", "product_ids": sorted(self._followers),
+                                          "channels": ["ticker"]})
+                    async for raw in ws:
+                        self._dispatch(raw)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logging.warning(f"Price feed connection lost: {e}; reconnecting in {delay:.0f}s")
+            finally:
+                self._ws = None
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self.reconnect_max_delay)
+
+    def _dispatch(self, raw: Any) -> None:
+        """Forward an upstream ticker message to the clients following its product."""
+        try:
+            message = json.loads(raw)
+        except ValueError:
+            return
+        if not isinstance(message, dict) or message.get("type") != "ticker":
+            return
+        product_id = message.get("product_id")
+        followers = self._followers.get(product_id)
+        if not followers:
+            return
+
+        tick = {
+            "type": "ticker",
+            "product_id": product_id,
+            "price": message.get("price"),
+            "time": message.get("time"),
+        }
+        try:
+            open_24h = float(message["open_24h"])
+            tick["change_24h"] = round((float(message["price"]) - open_24h) / open_24h * 100, 2)
+        except (KeyError, TypeError, ValueError, ZeroDivisionError):
+            pass
+
+        self.store.add_trade(product_id, {"trade_id": message.get("trade_id"),
+                                          "price": tick["price"], "time": tick["time"]})
+        for subscriber in followers:
+            subscriber.offer(tick)
+
+
+_hub: Optional[PriceStreamHub] = None
+
+
+def get_price_stream_hub() -> PriceStreamHub:
+    """Return the process-wide hub shared by all streaming endpoints, creating it on first use."""
+    global _hub
+    if _hub is None:
+        _hub = PriceStreamHub()
+    return _hub
+
+
+async def close_price_stream_hub() -> None:
+    """Close the process-wide hub if it was created."""
+    global _hub
+    if _hub is not None:
+        await _hub.close()
+        _hub = None
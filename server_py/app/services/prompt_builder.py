@@ -0,0 +1,159 @@
+"""
+Prompt construction for AI recommendations.
+Reduces each holding to a handful of precomputed features instead of sending raw
+candle data, and keeps the prompt within a token budget.
+"""
+
+from typing import Any, Dict, List, Optional
+import math
+import numpy as np
+
+# Rough characters per token for English text and numbers
+CHARS_PER_TOKEN = 4
+
+PROMPT_HEADER = (
+    "As a cryptocurrency expert analyst, provide specific buy, sell, or hold "
+    "recommendations based on the following portfolio and market data."
+)
+
+PROMPT_FOOTER = """Please analyze the current market conditions, trends, and portfolio composition to provide:
+1. Specific recommendations for each holding
+2. Potential new investments to consider
+3. Risk assessment
+4. Market trend analysis
+
+Provide concise, actionable insights."""
+
+FEATURE_LEGEND = (
+    "Columns: weight = share of portfolio value, price = last price, chg24h = change over "
+    "the window, range = low-high, vol = annualized volatility of hourly returns, "
+    "volume = last 6 candles' volume vs the window average."
+)
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimate the token count of a prompt (about four characters per token)."""
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def _candles(asset: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Return the candle records of an asset's market data, newest first."""
+    return asset.get("historical_data") or asset.get("data") or []
+
+
+def asset_features(holding: Dict[str, Any], asset: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Summarize one holding and its market data.
+
+    Args:
+        holding: Portfolio entry with "currency" and "balance"
+        asset: Market data for the holding ("data" or "historical_data" candle
+            records newest first, optionally "current_price"), or None
+
+    Returns:
+        Dictionary with currency, balance, price, change_24h, low, high,
+        volatility, volume_trend and value; fields without data are None
+    """
+    features: Dict[str, Any] = {
+        "currency": holding.get("currency"),
+        "balance": float(holding.get("balance") or 0),
+        "price": None, "change_24h": None, "low": None, "high": None,
+        "volatility": None, "volume_trend": None, "value": None,
+    }
+    if not asset:
+        return features
+
+    try:
+        # Records are newest first; reverse to oldest first for the calculations
+        records = list(reversed(_candles(asset)))
+        columns = {
+            name: np.array([float(record[name]) for record in records])
+            for name in ("low", "high", "close", "volume")
+        }
+    except (KeyError, TypeError, ValueError):
+        # Incomplete candles: describe the holding from the current price alone
+        records = []
+    if records:
+        close = columns["close"]
+        features["price"] = float(close[-1])
+        features["low"] = float(columns["low"].min())
+        features["high"] = float(columns["high"].max())
+        if close[0] > 0:
+            features["change_24h"] = float((close[-1] - close[0]) / close[0] * 100)
+        if len(close) > 2 and (close > 0).all():
+            features["volatility"] = float(np.diff(np.log(close)).std(ddof=1) * math.sqrt(365 * 24) * 100)
+        average_volume = columns["volume"].mean()
+        if len(close) > 6 and average_volume > 0:
+            features["volume_trend"] = float(columns["volume"][-6:].mean() / average_volume)
+
+    current = asset.get("current_price")
+    if isinstance(current, dict) and current.get("price") is not None:
+        features["price"] = float(current["price"])
+        if current.get("change_24h") is not None:
+            features["change_24h"] = float(current["change_24h"])
+
+    if features["price"] is not None:
+        features["value"] = features["balance"] * features["price"]
+    return features
+
+
+def _number(value: Optional[float], digits: int = 6) -> str:
+    """Format a number compactly with `digits` significant digits, or '-' when missing."""
+    return "-" if value is None else f"{value:.{digits}g}"
+
+
+def format_features(features: Dict[str, Any], weight: Optional[float]) -> str:
+    """Render one holding's features as a single compact line."""
+    change = "-" if features["change_24h"] is None else f"{features['change_24h']:+.2f}%"
+    volatility = "-" if features["volatility"] is None else f"{features['volatility']:.0f}%"
+    volume = "-" if features["volume_trend"] is None else f"{features['volume_trend']:.2f}x"
+    return (
+        f"{features['currency']}: weight={'-' if weight is None else f'{weight:.1%}'} "
+        f"balance={_number(features['balance'])} price={_number(features['price'])} "
+        f"chg24h={change} range={_number(features['low'])}-{_number(features['high'])} "
+        f"vol={volatility} volume={volume}"
+    )
+
+
+def build_prompt(portfolio: List[Dict[str, Any]], market_data: List[Dict[str, Any]],
+                 token_budget: int, quote_currency: str = "GBP") -> str:
+    """
+    Build the recommendations prompt from compact per-asset features.
+
+    Holdings are listed by portfolio weight, largest first. If the prompt would
+    exceed `token_budget` (estimated), the lowest-weight holdings are dropped first
+    and the number omitted is noted; the largest holding is always kept.
+
+    Args:
+        portfolio: Holdings as returned by CoinbaseService.get_portfolio
+        market_data: Market data entries with "currency" plus candle records
+        token_budget: Maximum estimated prompt tokens
+        quote_currency: Currency prices are quoted in; holdings of it are valued at 1
+
+    Returns:
+        Prompt text
+    """
+    by_currency = {asset.get("currency"): asset for asset in market_data}
+    by_currency.setdefault(quote_currency, {"current_price": {"price": 1}})
+    features = [asset_features(holding, by_currency.get(holding.get("currency"))) for holding in portfolio]
+    total = sum(f["value"] for f in features if f["value"])
+    weights = [f["value"] / total if total and f["value"] else None for f in features]
+    ranked = sorted(zip(features, weights), key=lambda item: item[1] or 0.0, reverse=True)
+    lines = [format_features(f, weight) for f, weight in ranked]
+
+    def render(count: int) -> str:
+        omitted = len(lines) - count
+        holdings = "\n".join(lines[:count])
+        if omitted:
+            holdings += f"\n({omitted} smaller holdings omitted)"
+        return (
+            f"{PROMPT_HEADER}\n\nPortfolio value: {_number(total, 8)} {quote_currency}\n{FEATURE_LEGEND}\n"
+            f"Holdings:\n{holdings}\n\n{PROMPT_FOOTER}"
+        )
+
+    count = len(lines)
+    prompt = render(count)
+    while count > 1 and estimate_tokens(prompt) > token_budget:
+        count -= 1
+        prompt = render(count)
+    return prompt
@@ -0,0 +1,177 @@
+"""
+Cross rates derived from known market prices.
+Markets the backend already fetches (e.g. BTC-GBP, ETH-BTC, BTC-USD) are edges of
+a currency graph. All-pairs cheapest paths are computed at once over a rate
+matrix, so any base/quote rate that is connected through those markets can be
+priced by triangulation without another upstream request.
+"""
+
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+import numpy as np
+
+# Cost of one conversion step. Data age adds a penalty that grows with age (half
+# its maximum at AGE_SCALE seconds) but stays below HOP_COST / n per step for n
+# currencies, so a whole path's penalty is below one step: paths with fewer steps
+# always win and fresher data breaks ties between them
+HOP_COST = 1.0
+AGE_SCALE = 3600.0
+
+
+class Market(NamedTuple):
+    """Latest known price of one market: 1 base costs `price` quote."""
+
+    base: str
+    quote: str
+    price: float
+    price_24h_ago: Optional[float] = None
+    age: float = 0.0
+
+
+def markets_from_prices(prices: Dict[str, Dict[str, Any]]) -> List[Market]:
+    """
+    Turn price dictionaries keyed by product ID into markets.
+
+    Args:
+        prices: Price information as returned by CoinbaseService.get_prices;
+            entries with "error", unparsable IDs or non-positive prices are skipped
+
+    Returns:
+        One market per usable price
+    """
+    markets = []
+    for product_id, data in prices.items():
+        base, _, quote = product_id.upper().partition("-")
+        if not base or not quote or "error" in data:
+            continue
+        try:
+            price = float(data["price"])
+        except (KeyError, TypeError, ValueError):
+            continue
+        try:
+            previous = float(data["price_24h_ago"])
+        except (KeyError, TypeError, ValueError):
+            previous = None
+        if not price > 0:
+            continue
+        markets.append(Market(base, quote, price, previous if previous and previous > 0 else None,
+                              float(data.get("age_seconds") or 0.0)))
+    return markets
+
+
+class RateGraph:
+    """
+    Exchange rates between every pair of currencies connected by known markets.
+
+    Each market gives a rate in both directions. The cheapest path between two
+    currencies has the fewest conversion steps, then the freshest data; rates
+    along it are multiplied. A market's own direction is used as-is, so direct
+    rates are exact.
+    """
+
+    def __init__(self, markets: Iterable[Market]):
+        """
+        Args:
+            markets: Known market prices; for a repeated pair the last one wins
+        """
+        markets = list(markets)
+        self.currencies: List[str] = sorted({m.base for m in markets} | {m.quote for m in markets})
+        self._index = {currency: i for i, currency in enumerate(self.currencies)}
+        n = len(self.currencies)
+
+        cost = np.full((n, n), np.inf)
+        rate = np.full((n, n), np.nan)
+        rate_24h = np.full((n, n), np.nan)
+        age = np.zeros((n, n))
+        np.fill_diagonal(cost, 0.0)
+        np.fill_diagonal(rate, 1.0)
+        np.fill_diagonal(rate_24h, 1.0)
+        max_age_cost = HOP_COST / max(n, 1)
+        for market in markets:
+            i, j = self._index[market.base], self._index[market.quote]
+            if i == j:
+                continue
+            edge_cost = HOP_COST + max_age_cost * market.age / (market.age + AGE_SCALE)
+            previous = np.nan if market.price_24h_ago is None else market.price_24h_ago
+            cost[i, j] = cost[j, i] = edge_cost
+            rate[i, j], rate[j, i] = market.price, 1.0 / market.price
+            rate_24h[i, j], rate_24h[j, i] = previous, 1.0 / previous
+            age[i, j] = age[j, i] = market.age
+
+        # next_hop[i, j]: the currency after i on the cheapest path to j
+        next_hop = np.where(np.isfinite(cost), np.arange(n)[None, :], -1)
+
+        # Floyd-Warshall, vectorized over all (i, j) pairs for each intermediate k
+        for k in range(n):
+            via = cost[:, k, None] + cost[None, k, :]
+            better = via < cost
+            if not better.any():
+                continue
+            cost = np.where(better, via, cost)
+            rate = np.where(better, rate[:, k, None] * rate[None, k, :], rate)
+            rate_24h = np.where(better, rate_24h[:, k, None] * rate_24h[None, k, :], rate_24h)
+            age = np.where(better, np.maximum(age[:, k, None], age[None, k, :]), age)
+            next_hop = np.where(better, next_hop[:, k, None], next_hop)
+
+        self.cost = cost
+        self.rate_matrix = rate
+        self.rate_24h_matrix = rate_24h
+        self.age_matrix = age
+        self._next_hop = next_hop
+
+    def __contains__(self, currency: str) -> bool:
+        return currency.upper() in self._index
+
+    def _indices(self, base: str, quote: str) -> Optional[Tuple[int, int]]:
+        i, j = self._index.get(base.upper()), self._index.get(quote.upper())
+        if i is None or j is None or not np.isfinite(self.cost[i, j]):
+            return None
+        return i, j
+
+    def rate(self, base: str, quote: str) -> Optional[float]:
+        """Price of one `base` in `quote`, or None if no known markets connect them."""
+        indices = self._indices(base, quote)
+        return None if indices is None else float(self.rate_matrix[indices])
+
+    def path(self, base: str, quote: str) -> Optional[List[str]]:
+        """Currencies along the cheapest conversion path, both ends included."""
+        indices = self._indices(base, quote)
+        if indices is None:
+            return None
+        i, j = indices
+        path = [self.currencies[i]]
+        while i != j:
+            i = int(self._next_hop[i, j])
+            path.append(self.currencies[i])
+        return path
+
+    def price(self, base: str, quote: str) -> Optional[Dict[str, Any]]:
+        """
+        Build a price summary for `base` in `quote` from the cheapest path.
+
+        Returns:
+            Dictionary like CoinbaseService.get_crypto_price:
+            {
+                "price": str,
+                "change_24h": float | None,   # None if a leg has no 24h price
+                "price_24h_ago": str | None,
+                "path": [str],                # e.g. ['ETH', 'BTC', 'USD']
+                "age_seconds": float          # Only when a leg has aged data: its oldest age
+            }
+            or None if no known markets connect the two currencies
+        """
+        indices = self._indices(base, quote)
+        if indices is None:
+            return None
+        price = float(self.rate_matrix[indices])
+        previous = float(self.rate_24h_matrix[indices])
+        has_previous = bool(np.isfinite(previous)) and previous > 0
+        summary = {
+            "price": str(price),
+            "change_24h": round((price - previous) / previous * 100, 2) if has_previous else None,
+            "price_24h_ago": str(previous) if has_previous else None,
+            "path": self.path(base, quote),
+        }
+        age = float(self.age_matrix[indices])
+        if age > 0:
+            summary["age_seconds"] = round(age, 3)
+        return summary
@@ -0,0 +1,106 @@
+"""
+Async facade over the synchronous Coinbase RESTClient.
+Runs blocking SDK calls on a bounded thread pool so they never stall the event loop,
+with per-call timeouts and cancellation.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Optional
+import asyncio
+import functools
+import logging
+from ..config import env_float, env_int
+
+_executor: Optional[ThreadPoolExecutor] = None
+
+# Sentinel meaning "use the adapter's default timeout"
+_DEFAULT = object()
+
+
+def get_rest_executor() -> ThreadPoolExecutor:
+    """
+    Return the process-wide thread pool used for blocking Coinbase SDK calls.
+
+    Environment variables:
+        COINBASE_REST_MAX_WORKERS: Maximum concurrent SDK calls (default: 8)
+
+    Returns:
+        The shared ThreadPoolExecutor, created on first use
+    """
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=env_int("COINBASE_REST_MAX_WORKERS", 8),
+            thread_name_prefix="coinbase-rest",
+        )
+    return _executor
+
+
+def shutdown_rest_executor() -> None:
+    """Shut down the shared thread pool, dropping calls that have not started yet."""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+        logging.info("Shut down Coinbase REST thread pool")
+
+
+class AsyncRESTClient:
+    """
+    Awaitable wrapper around a synchronous coinbase.rest.RESTClient.
+
+    Each call is submitted to a bounded thread pool. Awaiting callers can be
+    cancelled or time out; a call that has not started yet is dropped from the
+    queue, while a call already running in a thread finishes in the background
+    and its result is discarded.
+    """
+
+    def __init__(self, client: Any, executor: Optional[ThreadPoolExecutor] = None,
+                 timeout: Optional[float] = None):
+        """
+        Args:
+            client: Synchronous RESTClient (or any object with the same methods)
+            executor: Thread pool to run calls on (default: shared pool)
+            timeout: Default per-call timeout in seconds
+                (default: COINBASE_REST_TIMEOUT or 10; 0 disables it)
+        """
+        self.client = client
+        self._executor = executor
+        default_timeout = timeout if timeout is not None else env_float("COINBASE_REST_TIMEOUT", 10.0)
+        self.timeout = default_timeout if default_timeout > 0 else None
+
+    async def call(self, method: str, *args: Any, timeout: Any = _DEFAULT, **kwargs: Any) -> Any:
+        """
+        Run a RESTClient method on the thread pool and await its result.
+
+        Args:
+            method: Name of the RESTClient method, e.g. 'get_accounts'
+            args: Positional arguments for the method
+            timeout: Seconds to wait before giving up; None waits forever
+            kwargs: Keyword arguments for the method
+
+        Returns:
+            Whatever the RESTClient method returns
+
+        Raises:
+            asyncio.TimeoutError: If the call does not finish within the timeout
+        """
+        executor = self._executor or get_rest_executor()
+        func = functools.partial(getattr(self.client, method), *args, **kwargs)
+        future = asyncio.get_running_loop().run_in_executor(executor, func)
+        limit = self.timeout if timeout is _DEFAULT else timeout
+        try:
+            return await asyncio.wait_for(future, limit)
+        except asyncio.TimeoutError:
+            logging.error(f"Coinbase REST call {method} timed out after {limit}s")
+            raise
+
+    async def get_accounts(self, timeout: Any = _DEFAULT, **kwargs: Any) -> Any:
+        """Awaitable RESTClient.get_accounts."""
+        return await self.call("get_accounts", timeout=timeout, **kwargs)
+
+    async def get_market_trades(self, product_id: str, limit: int, timeout: Any = _DEFAULT,
+                                **kwargs: Any) -> Any:
+        """Awaitable RESTClient.get_market_trades."""
+        return await self.call("get_market_trades", product_id=product_id, limit=limit,
+                               timeout=timeout, **kwargs)
@@ -0,0 +1,401 @@
+"""
+Cache backends shared by every worker process on a host.
+With several uvicorn workers each process has its own in-memory caches; a shared
+backend lets a value fetched by one worker serve the others, and its locks make
+sure only one worker refreshes a given key at a time (see TTLCache).
+
+Two backends are available, selected by SHARED_CACHE_URL:
+- sqlite:///path/to/file.db: a local SQLite file in WAL mode with memory-mapped I/O
+- redis://host:port/db: any server speaking the Redis protocol (RESP)
+"""
+
+from typing import Any, Callable, Deque, List, NamedTuple, Optional, Tuple
+from abc import ABC, abstractmethod
+from collections import deque
+from urllib.parse import unquote, urlsplit
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from ..config import env_float
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    value BLOB NOT NULL,
+    expires_at REAL NOT NULL
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS locks (
+    key TEXT PRIMARY KEY,
+    token TEXT NOT NULL,
+    expires_at REAL NOT NULL
+) WITHOUT ROWID;
+"""
+
+# Expired entries are purged after this many writes
+_PURGE_EVERY = 256
+
+
+class SharedCacheError(Exception):
+    """Raised when the shared cache backend fails or answers with an error."""
+
+
+class Codec(NamedTuple):
+    """Converts cached values to and from bytes for a shared backend."""
+
+    dumps: Callable[[Any], bytes]
+    loads: Callable[[bytes], Any]
+
+
+JSON_CODEC = Codec(lambda value: json.dumps(value).encode(), json.loads)
+
+
+class SharedCacheBackend(ABC):
+    """
+    Interface of a shared cache backend.
+
+    Values are bytes with a TTL. Locks are keys held by one owner, identified by
+    a random token, until released or until their TTL runs out, so a worker that
+    dies while holding one cannot block the key forever.
+    """
+
+    lock_ttl: float = 30.0
+
+    @abstractmethod
+    async def get(self, key: str) -> Optional[Tuple[bytes, float]]:
+        """
+        Look up a key.
+
+        Returns:
+            Tuple of (value, remaining TTL in seconds), or None if absent or expired
+        """
+
+    @abstractmethod
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        """Store a value for `ttl` seconds."""
+
+    @abstractmethod
+    async def acquire(self, key: str, ttl: float) -> Optional[str]:
+        """
+        Try to take the lock for a key without waiting.
+
+        Returns:
+            Lock token to pass to release, or None if another owner holds the lock
+        """
+
+    @abstractmethod
+    async def release(self, key: str, token: str) -> None:
+        """Release a lock if it is still held with `token`."""
+
+    async def close(self) -> None:
+        """Close connections to the backend."""
+
+
+class SQLiteCacheBackend(SharedCacheBackend):
+    """
+    Shared cache in a local SQLite file.
+
+    Every worker opens its own connection to the same file. WAL mode lets readers
+    proceed while another process writes, and the memory-mapped I/O serves reads
+    from the shared page cache. Blocking calls run on a worker thread.
+    """
+
+    def __init__(self, path: str, lock_ttl: float = 30.0, mmap_size: int = 64 * 1024 * 1024):
+        """
+        Args:
+            path: Database file path; parent directories are created on first use
+            lock_ttl: Longest time a refresh lock is held, in seconds
+            mmap_size: Bytes of the file accessed through memory-mapped I/O
+        """
+        self.path = path
+        self.lock_ttl = lock_ttl
+        self.mmap_size = mmap_size
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._writes = 0
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            # Autocommit; the timeout waits for another process's write to finish
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode = WAL")
+            # Cached values can always be fetched again, so writes are not synced to disk
+            conn.execute("PRAGMA synchronous = OFF")
+            conn.execute(f"PRAGMA mmap_size = {int(self.mmap_size)}")
+            conn.executescript(_SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    async def _run(self, function: Callable[..., Any], *args: Any) -> Any:
+        def call() -> Any:
+            with self._lock:
+                try:
+                    return function(self._connection(), *args)
+                except sqlite3.Error as e:
+                    raise SharedCacheError(f"SQLite shared cache error: {e}") from e
+        return await asyncio.to_thread(call)
+
+    @staticmethod
+    def _get(conn: sqlite3.Connection, key: str) -> Optional[Tuple[bytes, float]]:
+        now = time.time()
+        row = conn.execute("SELECT value, expires_at FROM entries WHERE key = ? AND expires_at > ?",
+                           (key, now)).fetchone()
+        return None if row is None else (bytes(row[0]), row[1] - now)
+
+    async def get(self, key: str) -> Optional[Tuple[bytes, float]]:
+        return await self._run(self._get, key)
+
+    def _set(self, conn: sqlite3.Connection, key: str, value: bytes, ttl: float) -> None:
+        now = time.time()
+        conn.execute("INSERT OR REPLACE INTO entries (key, value, expires_at) VALUES (?, ?, ?)",
+                     (key, value, now + ttl))
+        self._writes += 1
+        if self._writes % _PURGE_EVERY == 0:
+            conn.execute("DELETE FROM entries WHERE expires_at <= ?", (now,))
+            conn.execute("DELETE FROM locks WHERE expires_at <= ?", (now,))
+
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        await self._run(self._set, key, value, ttl)
+
+    @staticmethod
+    def _acquire(conn: sqlite3.Connection, key: str, token: str, ttl: float) -> bool:
+        now = time.time()
+        # Takes the lock if it is free or its previous owner let it expire
+        cursor = conn.execute(
+            "INSERT INTO locks (key, token, expires_at) VALUES (?, ?, ?) "
+            "ON CONFLICT (key) DO UPDATE SET token = excluded.token, expires_at = excluded.expires_at "
+            "WHERE locks.expires_at <= ?",
+            (key, token, now + ttl, now))
+        return cursor.rowcount == 1
+
+    async def acquire(self, key: str, ttl: float) -> Optional[str]:
+        token = uuid.uuid4().hex
+        return token if await self._run(self._acquire, key, token, ttl) else None
+
+    @staticmethod
+    def _release(conn: sqlite3.Connection, key: str, token: str) -> None:
+        conn.execute("DELETE FROM locks WHERE key = ? AND token = ?", (key, token))
+
+    async def release(self, key: str, token: str) -> None:
+        await self._run(self._release, key, token)
+
+    def _close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    async def close(self) -> None:
+        await asyncio.to_thread(self._close)
+
+
+def encode_command(*args: Any) -> bytes:
+    """Encode a command as a RESP array of bulk strings."""
+    parts = [b"*%d\r\n" % len(args)]
+    for arg in args:
+        if not isinstance(arg, bytes):
+            arg = str(arg).encode()
+        parts.append(b"$%d\r\n%s\r\n" % (len(arg), arg))
+    return b"".join(parts)
+
+
+async def read_reply(reader: asyncio.StreamReader) -> Any:
+    """
+    Read one RESP reply.
+
+    Returns:
+        str for simple strings, int for integers, bytes or None for bulk
+        strings and a list for arrays
+
+    Raises:
+        SharedCacheError: If the server answered with an error
+    """
+    line = await reader.readline()
+    if not line.endswith(b"\r\n"):
+        raise SharedCacheError("Connection to the Redis server closed")
+    kind, body = line[:1], line[1:-2]
+    if kind == b"+":
+        return body.decode()
+    if kind == b"-":
+        raise SharedCacheError(f"Redis error: {body.decode()}")
+    if kind == b":":
+        return int(body)
+    if kind == b"$":
+        length = int(body)
+        if length < 0:
+            return None
+        data = await reader.readexactly(length + 2)
+        return data[:-2]
+    if kind == b"*":
+        count = int(body)
+        if count < 0:
+            return None
+        return [await read_reply(reader) for _ in range(count)]
+    raise SharedCacheError(f"Unexpected Redis reply: {line!r}")
+
+
+class RedisCacheBackend(SharedCacheBackend):
+    """
+    Shared cache on a Redis-protocol server, using a minimal RESP client.
+
+    Only GET, SET (with NX and PX), PTTL and DEL are used, so Redis, Valkey,
+    KeyDB or a local stand-in all work. Connections are pooled; commands sent
+    together are pipelined on one connection.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 6379, db: int = 0,
+                 password: Optional[str] = None, lock_ttl: float = 30.0,
+                 timeout: float = 2.0, max_idle: int = 8):
+        """
+        Args:
+            host: Server host
+            port: Server port
+            db: Database number selected on connect
+            password: Password sent with AUTH on connect, if any
+            lock_ttl: Longest time a refresh lock is held, in seconds
+            timeout: Seconds to wait for a connection or a reply
+            max_idle: Idle connections kept for reuse
+        """
+        self.host = host
+        self.port = port
+        self.db = db
+        self.password = password
+        self.lock_ttl = lock_ttl
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self._idle: Deque[Tuple[asyncio.StreamReader, asyncio.StreamWriter]] = deque()
+
+    async def _connect(self) -> Tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+        reader, writer = await asyncio.open_connection(self.host, self.port)
+        setup = []
+        if self.password:
+            setup.append(("AUTH", self.password))
+        if self.db:
+            setup.append(("SELECT", self.db))
+        if setup:
+            writer.write(b"".join(encode_command(*command) for command in setup))
+            for _ in setup:
+                await read_reply(reader)
+        return reader, writer
+
+    @staticmethod
+    async def _read_replies(reader: asyncio.StreamReader, count: int) -> List[Any]:
+        return [await read_reply(reader) for _ in range(count)]
+
+    async def _pipeline(self, *commands: Tuple[Any, ...]) -> List[Any]:
+        """Send commands on one connection and return their replies in order."""
+        connection = self._idle.pop() if self._idle else None
+        try:
+            if connection is None:
+                connection = await asyncio.wait_for(self._connect(), self.timeout)
+            reader, writer = connection
+            writer.write(b"".join(encode_command(*command) for command in commands))
+            replies = await asyncio.wait_for(self._read_replies(reader, len(commands)), self.timeout)
+        except BaseException as e:
+            # Replies left unread (after an error or cancellation) would answer the next command
+            if connection is not None:
+                connection[1].close()
+            if isinstance(e, (OSError, asyncio.IncompleteReadError, asyncio.TimeoutError, ValueError)):
+                raise SharedCacheError(f"Redis connection error: {e!r}") from e
+            raise
+        if len(self._idle) < self.max_idle:
+            self._idle.append(connection)
+        else:
+            connection[1].close()
+        return replies
+
+    async def get(self, key: str) -> Optional[Tuple[bytes, float]]:
+        value, pttl = await self._pipeline(("GET", key), ("PTTL", key))
+        # PTTL is -2 if the key expired between the two commands
+        if value is None or pttl == -2:
+            return None
+        return value, max(pttl, 0) / 1000
+
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        await self._pipeline(("SET", key, value, "PX", max(1, int(ttl * 1000))))
+
+    async def acquire(self, key: str, ttl: float) -> Optional[str]:
+        token = uuid.uuid4().hex
+        (reply,) = await self._pipeline(("SET", key, token, "NX", "PX", max(1, int(ttl * 1000))))
+        return token if reply == "OK" else None
+
+    async def release(self, key: str, token: str) -> None:
+        # Compare-then-delete is not atomic, but the lock TTL bounds any overlap
+        (holder,) = await self._pipeline(("GET", key))
+        if holder == token.encode():
+            await self._pipeline(("DEL", key))
+
+    async def close(self) -> None:
+        while self._idle:
+            _, writer = self._idle.pop()
+            writer.close()
+
+
+def create_shared_backend(url: str, lock_ttl: float = 30.0) -> SharedCacheBackend:
+    """
+    Create a backend from a URL.
+
+    Args:
+        url: 'sqlite:///relative/path.db', 'sqlite:////absolute/path.db' or
+            'redis://[:password@]host[:port][/db]'
+        lock_ttl: Longest time a refresh lock is held, in seconds
+
+    Returns:
+        The backend; connections are opened on first use
+
+    Raises:
+        ValueError: If the URL scheme is not supported
+    """
+    if url.startswith("sqlite:///"):
+        return SQLiteCacheBackend(url[len("sqlite:///"):], lock_ttl=lock_ttl)
+    parts = urlsplit(url)
+    if parts.scheme == "redis":
+        db = parts.path.strip("/")
+        return RedisCacheBackend(
+            host=parts.hostname or "127.0.0.1",
+            port=parts.port or 6379,
+            db=int(db) if db else 0,
+            password=unquote(parts.password) if parts.password else None,
+            lock_ttl=lock_ttl,
+        )
+    raise ValueError(f"Unsupported shared cache URL: {url}")
+
+
+_backend: Optional[SharedCacheBackend] = None
+_configured = False
+
+
+def get_shared_backend() -> Optional[SharedCacheBackend]:
+    """
+    Return the process-wide shared cache backend, created from environment
+    variables on first use, or None when no shared cache is configured.
+
+    Environment variables:
+        SHARED_CACHE_URL: Backend URL (see create_shared_backend); empty disables sharing
+        SHARED_CACHE_LOCK_TTL: Longest time one worker holds a refresh lock (default: 30s)
+    """
+    global _backend, _configured
+    if not _configured:
+        _configured = True
+        url = os.getenv("SHARED_CACHE_URL", "")
+        if url:
+            try:
+                _backend = create_shared_backend(url, lock_ttl=env_float("SHARED_CACHE_LOCK_TTL", 30.0))
+                logging.info(f"Using shared cache backend {type(_backend).__name__}")
+            except ValueError as e:
+                logging.warning(f"{e}; caches are not shared between workers")
+    return _backend
+
+
+async def close_shared_backend() -> None:
+    """Close the shared backend's connections, if one was created."""
+    if _backend is not None:
+        await _backend.close()
@@ -0,0 +1,24 @@
+"""
+Classification of failed upstream requests.
+Coinbase is reached through the shared httpx client and through the Coinbase SDK
+(requests); these helpers read either library's errors without importing the SDK.
+"""
+
+from typing import Optional
+import sys
+import httpx
+
+
+def is_transport_error(error: BaseException) -> bool:
+    """Check for a connection failure of the shared httpx client or the Coinbase SDK (requests)."""
+    if isinstance(error, httpx.TransportError):
+        return True
+    # requests is only loaded once the SDK is in use; checked without importing it
+    requests = sys.modules.get("requests")
+    return requests is not None and isinstance(error, requests.exceptions.ConnectionError)
+
+
+def status_code(error: BaseException) -> Optional[int]:
+    """HTTP status of a failed request, for httpx and requests (Coinbase SDK) errors."""
+    response = getattr(error, "response", None)
+    return getattr(response, "status_code", None)
@@ -0,0 +1,343 @@
+"""
+Rate-limit-aware scheduler for upstream Coinbase requests.
+Each endpoint class (public Exchange API, private Advanced Trade API) has its own
+token bucket. Callers waiting for a token are served in priority order, so
+user-facing requests overtake background polling and recommendation fetches.
+Rate-limited and transient failures are retried with jittered exponential
+backoff that honours Retry-After. Buckets are per process.
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from enum import IntEnum
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, Optional, Tuple, TypeVar
+import asyncio
+import heapq
+import itertools
+import logging
+import random
+import time
+from ..config import env_float, env_int
+from ..metrics import registry
+from .upstream_errors import is_transport_error, status_code
+
+T = TypeVar("T")
+
+# Endpoint classes with separate Coinbase rate limits
+PUBLIC = "public"      # Exchange API market data (candles), limited per IP
+PRIVATE = "private"    # Advanced Trade API (accounts, trades), limited per API key
+
+# HTTP statuses worth retrying: rate limited or a transient server failure
+RETRYABLE_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+QUEUE_WAIT = registry.histogram(
+    "upstream_queue_wait_seconds", "Time spent waiting for an upstream rate limit token",
+    ("endpoint_class", "priority"),
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0))
+RETRIES = registry.counter(
+    "upstream_retries_total", "Upstream requests retried, by HTTP status (or 'transport')",
+    ("endpoint_class", "reason"))
+
+
+class Priority(IntEnum):
+    """Scheduling priority of upstream requests; lower values are served first."""
+
+    INTERACTIVE = 0   # A user is waiting on the response
+    BACKGROUND = 1    # Market data poller
+    BULK = 2          # Recommendation and analysis data gathering
+
+
+_priority: ContextVar[Priority] = ContextVar("upstream_priority", default=Priority.INTERACTIVE)
+
+
+@contextmanager
+def upstream_priority(priority: Priority) -> Iterator[None]:
+    """
+    Run upstream requests made in this block (and tasks started from it) at `priority`.
+
+    Usage:
+        with upstream_priority(Priority.BACKGROUND):
+            await service.fetch_candles(product_id)
+    """
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def current_priority() -> Priority:
+    """Priority of upstream requests in the current context (default: INTERACTIVE)."""
+    return _priority.get()
+
+
+class UpstreamRateLimited(Exception):
+    """
+    Raised when Coinbase keeps rate limiting a request after all retries, or asks
+    for a longer pause than UPSTREAM_RETRY_MAX_DELAY.
+
+    Attributes:
+        retry_after: Seconds the upstream asked to wait, if it said
+    """
+
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """
+    Token bucket refilled at `rate` tokens per second up to `burst`, with a
+    priority queue of waiters. A rate of 0 or less disables limiting.
+    """
+
+    def __init__(self, name: str, rate: float, burst: int):
+        self.name = name
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.tokens = float(self.burst)
+        self.paused_until = 0.0
+        self._updated = time.monotonic()
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self._sequence = itertools.count()
+        self._wakeup: Optional[asyncio.TimerHandle] = None
+        self._wakeup_loop: Optional[asyncio.AbstractEventLoop] = None
+        self.waiting = 0
+        self.max_waiting = 0
+        self.granted = 0
+        self.delayed = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self.throttled = 0
+        self.retries = 0
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.burst, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def _available(self, now: float) -> bool:
+        return now >= self.paused_until and self.tokens >= 1
+
+    async def acquire(self, priority: Priority = Priority.INTERACTIVE) -> float:
+        """
+        Take one token, waiting behind higher-priority callers if none is free.
+
+        Returns:
+            Seconds spent waiting
+        """
+        if self.rate <= 0:
+            self.granted += 1
+            return 0.0
+        started = time.monotonic()
+        self._refill(started)
+        if not self._waiters and self._available(started):
+            self.tokens -= 1
+            self.granted += 1
+            return 0.0
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (int(priority), next(self._sequence), future))
+        self.waiting += 1
+        self.max_waiting = max(self.max_waiting, self.waiting)
+        self._schedule()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Granted just as the caller was cancelled: hand the token on
+                self.tokens += 1
+                self._dispatch()
+            raise
+        finally:
+            self.waiting -= 1
+
+        waited = time.monotonic() - started
+        self.granted += 1
+        self.delayed += 1
+        self.wait_seconds += waited
+        self.max_wait_seconds = max(self.max_wait_seconds, waited)
+        return waited
+
+    def pause(self, seconds: float) -> None:
+        """Stop granting tokens for `seconds`, e.g. after a 429 from the upstream."""
+        now = time.monotonic()
+        self.paused_until = max(self.paused_until, now + seconds)
+        self.tokens = 0.0
+        self._updated = now
+
+    def _dispatch(self) -> None:
+        """Grant tokens to waiters in priority order and schedule the next wake-up."""
+        self._wakeup = None
+        loop = asyncio.get_running_loop()
+        now = time.monotonic()
+        self._refill(now)
+        while self._waiters and self._available(now):
+            _, _, future = heapq.heappop(self._waiters)
+            if future.done() or future.get_loop() is not loop:
+                continue  # Caller was cancelled while queued, or its loop is gone
+            self.tokens -= 1
+            future.set_result(None)
+        while self._waiters and self._waiters[0][2].done():
+            heapq.heappop(self._waiters)
+        if self._waiters:
+            self._schedule()
+
+    def _schedule(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._wakeup is not None and self._wakeup_loop is loop:
+            return
+        now = time.monotonic()
+        delay = max(self.paused_until - now, (1 - self.tokens) / self.rate, 0.0)
+        self._wakeup = loop.call_later(delay, self._dispatch)
+        self._wakeup_loop = loop
+
+    def stats(self) -> Dict[str, Any]:
+        """Return the bucket's configuration, queue depth and wait statistics."""
+        self._refill(time.monotonic())
+        return {
+            "rate": self.rate,
+            "burst": self.burst,
+            "tokens": round(self.tokens, 3),
+            "queue_depth": self.waiting,
+            "max_queue_depth": self.max_waiting,
+            "granted": self.granted,
+            "delayed": self.delayed,
+            "mean_wait_seconds": round(self.wait_seconds / self.delayed, 4) if self.delayed else 0.0,
+            "max_wait_seconds": round(self.max_wait_seconds, 4),
+            "throttled": self.throttled,
+            "retries": self.retries,
+            "paused_for_seconds": round(max(0.0, self.paused_until - time.monotonic()), 3),
+        }
+
+
+def _retry_after(error: BaseException) -> Optional[float]:
+    """Seconds to wait from a Retry-After header (delta seconds or HTTP date), if any."""
+    response = getattr(error, "response", None)
+    value = getattr(response, "headers", {}).get("Retry-After") if response is not None else None
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+
+class UpstreamScheduler:
+    """
+    Runs upstream requests through per-endpoint-class token buckets, retrying
+    rate-limited (429), transient server (5xx) and connection failures.
+    """
+
+    def __init__(self, limits: Dict[str, Tuple[float, int]], max_retries: int = 3,
+                 base_delay: float = 0.25, max_delay: float = 8.0):
+        """
+        Args:
+            limits: (requests per second, burst) per endpoint class
+            max_retries: Retries after the first attempt
+            base_delay: Backoff before the first retry, doubled for each later one
+            max_delay: Upper bound for any single backoff, including Retry-After
+        """
+        self.buckets = {name: TokenBucket(name, rate, burst) for name, (rate, burst) in limits.items()}
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def backoff(self, attempt: int) -> float:
+        """Full-jitter exponential backoff for the given retry attempt (0-based)."""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    async def run(self, endpoint_class: str, request: Callable[[], Awaitable[T]],
+                  priority: Optional[Priority] = None) -> T:
+        """
+        Run `request` once a rate limit token is available, retrying on failure.
+
+        Args:
+            endpoint_class: PUBLIC or PRIVATE
+            request: Coroutine function performing one attempt; it should raise
+                httpx.HTTPStatusError or requests.HTTPError for error responses
+            priority: Scheduling priority (default: the current context's priority)
+
+        Returns:
+            The result of the first successful attempt
+
+        Raises:
+            UpstreamRateLimited: If still rate limited after all retries
+            Exception: The last error for other failures
+        """
+        bucket = self.buckets[endpoint_class]
+        priority = current_priority() if priority is None else priority
+        for attempt in range(self.max_retries + 1):
+            waited = await bucket.acquire(priority)
+            QUEUE_WAIT.observe(waited, endpoint_class, priority.name.lower())
+            try:
+                return await request()
+            except Exception as e:
+                status = status_code(e)
+                if status is None and not is_transport_error(e):
+                    raise
+                if status is not None and status not in RETRYABLE_STATUSES:
+                    raise
+                retry_after = _retry_after(e)
+                if status == 429:
+                    bucket.throttled += 1
+                    bucket.pause(retry_after if retry_after is not None else self.backoff(attempt))
+                if attempt == self.max_retries or (retry_after is not None and retry_after > self.max_delay):
+                    if status == 429:
+                        raise UpstreamRateLimited(
+                            f"Coinbase {endpoint_class} API rate limit exceeded", retry_after) from e
+                    raise
+                delay = retry_after if retry_after is not None else self.backoff(attempt)
+                bucket.retries += 1
+                RETRIES.inc(endpoint_class, str(status) if status is not None else "transport")
+                logging.warning(f"Coinbase {endpoint_class} request failed ({status or type(e).__name__}), "
+                                f"retrying in {delay:.2f}s (attempt {attempt + 1}/{self.max_retries})")
+                await asyncio.sleep(delay)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Return queue and retry statistics per endpoint class."""
+        return {name: bucket.stats() for name, bucket in self.buckets.items()}
+
+
+_scheduler: Optional[UpstreamScheduler] = None
+
+
+def get_upstream_scheduler() -> UpstreamScheduler:
+    """
+    Return the process-wide scheduler, created from environment variables on first use.
+
+    Environment variables:
+        COINBASE_PUBLIC_RATE / COINBASE_PUBLIC_BURST: Exchange API limit (default: 10/s, burst 15)
+        COINBASE_PRIVATE_RATE / COINBASE_PRIVATE_BURST: Advanced Trade limit (default: 30/s, burst 30)
+        UPSTREAM_MAX_RETRIES: Retries per request (default: 3)
+        UPSTREAM_RETRY_BASE_DELAY: First backoff in seconds (default: 0.25)
+        UPSTREAM_RETRY_MAX_DELAY: Longest backoff or Retry-After honoured (default: 8)
+    """
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = UpstreamScheduler(
+            limits={
+                PUBLIC: (env_float("COINBASE_PUBLIC_RATE", 10.0), env_int("COINBASE_PUBLIC_BURST", 15)),
+                PRIVATE: (env_float("COINBASE_PRIVATE_RATE", 30.0), env_int("COINBASE_PRIVATE_BURST", 30)),
+            },
+            max_retries=env_int("UPSTREAM_MAX_RETRIES", 3),
+            base_delay=env_float("UPSTREAM_RETRY_BASE_DELAY", 0.25),
+            max_delay=env_float("UPSTREAM_RETRY_MAX_DELAY", 8.0),
+        )
+    return _scheduler
+
+
+def _collect_queue_metrics():
+    """Report current queue depth per endpoint class at scrape time."""
+    if _scheduler is None:
+        return []
+    return [("upstream_queue_depth", "gauge", "Upstream requests waiting for a rate limit token",
+             [({"endpoint_class": name}, "", bucket.waiting) for name, bucket in _scheduler.buckets.items()])]
+
+
+registry.add_collector(_collect_queue_metrics)
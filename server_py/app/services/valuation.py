@@ -0,0 +1,150 @@
+"""
+Portfolio valuation.
+Combines balances and prices into per-asset values, weights and 24h profit and
+loss using Decimal arithmetic, so totals are exact for the decimal strings
+Coinbase returns.
+"""
+
+from decimal import Decimal, InvalidOperation
+from typing import Any, Dict, Iterable, List, Optional
+
+# Quantization steps for the derived figures
+WEIGHT_STEP = Decimal("0.000001")
+PERCENT_STEP = Decimal("0.01")
+
+
+def _decimal(value: Any) -> Optional[Decimal]:
+    """Parse a price or balance, returning None for missing or malformed values."""
+    try:
+        number = Decimal(str(value))
+    except (InvalidOperation, TypeError, ValueError):
+        return None
+    return number if number.is_finite() else None
+
+
+def _string(value: Optional[Decimal]) -> Optional[str]:
+    """Format a Decimal without exponent notation."""
+    return None if value is None else format(value.normalize(), "f")
+
+
+def _percent(part: Decimal, whole: Decimal) -> Optional[str]:
+    """Return part / whole as a percentage string, or None when whole is zero."""
+    if whole == 0:
+        return None
+    return _string((part / whole * 100).quantize(PERCENT_STEP))
+
+
+def combine_portfolios(portfolios: Iterable[List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    """
+    Sum the balances of several portfolios (e.g. of different accounts) per currency.
+
+    Args:
+        portfolios: Holdings as returned by CoinbaseService.get_portfolio
+
+    Returns:
+        One holding per currency, in order of first appearance; holdings with a
+        malformed balance are kept separately so value_portfolio reports them
+    """
+    combined: Dict[str, Dict[str, Any]] = {}
+    invalid = []
+    for portfolio in portfolios:
+        for holding in portfolio:
+            currency = holding.get("currency", "")
+            balance, available = _decimal(holding.get("balance")), _decimal(holding.get("available"))
+            if balance is None:
+                invalid.append(holding)
+                continue
+            total = combined.setdefault(currency, {"currency": currency, "balance": Decimal(0), "available": Decimal(0)})
+            total["balance"] += balance
+            total["available"] += available if available is not None else Decimal(0)
+    return [
+        {"currency": currency, "balance": _string(total["balance"]), "available": _string(total["available"])}
+        for currency, total in combined.items()
+    ] + invalid
+
+
+def value_portfolio(portfolio: List[Dict[str, Any]], prices: Dict[str, Dict[str, Any]],
+                    quote_currency: str = "GBP") -> Dict[str, Any]:
+    """
+    Value holdings at current prices.
+
+    Args:
+        portfolio: Holdings as returned by CoinbaseService.get_portfolio
+        prices: Price information keyed by product ID (e.g. 'BTC-GBP'), as returned
+            by CoinbaseService.get_prices; entries with "error" are reported as errors
+        quote_currency: Currency values are expressed in; holdings of it are valued at par
+
+    Returns:
+        Dictionary with decimal strings:
+        {
+            "quote_currency": str,
+            "total_value": str,     # Sum of valued holdings
+            "pnl_24h": str,         # Change in value over 24h at current balances
+            "change_24h": str,      # pnl_24h as a percentage of the value 24h ago of the
+                                    # holdings with a 24h price
+            "assets": [             # Largest value first; unpriced holdings last
+                {"currency", "balance", "price", "value", "weight", "pnl_24h", "change_24h"},
+                ...
+            ],
+            "errors": {currency: str}
+        }
+    """
+    quote_currency = quote_currency.upper()
+    assets = []
+    valued = []
+    errors = {}
+    total = Decimal(0)
+    total_pnl = Decimal(0)
+    total_previous = Decimal(0)
+
+    for holding in portfolio:
+        currency = holding.get("currency", "")
+        balance = _decimal(holding.get("balance"))
+        if balance is None:
+            errors[currency] = "Invalid balance"
+            continue
+
+        if currency.upper() == quote_currency:
+            price = previous = Decimal(1)
+        else:
+            quote = prices.get(f"{currency}-{quote_currency}") or {}
+            price = _decimal(quote.get("price"))
+            previous = _decimal(quote.get("price_24h_ago"))
+            if price is None:
+                errors[currency] = quote.get("error") or "Price unavailable"
+                assets.append({"currency": currency, "balance": _string(balance), "price": None,
+                               "value": None, "weight": None, "pnl_24h": None, "change_24h": None})
+                continue
+
+        value = balance * price
+        pnl = balance * (price - previous) if previous is not None else None
+        total += value
+        if pnl is not None:
+            total_pnl += pnl
+            total_previous += balance * previous
+        asset = {
+            "currency": currency,
+            "balance": _string(balance),
+            "price": _string(price),
+            "value": _string(value),
+            "weight": None,
+            "pnl_24h": _string(pnl),
+            "change_24h": _percent(price - previous, previous) if previous is not None else None,
+        }
+        assets.append(asset)
+        valued.append((asset, value))
+
+    if total:
+        for asset, value in valued:
+            asset["weight"] = _string((value / total).quantize(WEIGHT_STEP))
+    assets.sort(key=lambda asset: _decimal(asset["value"]) if asset["value"] is not None else Decimal(-1),
+                reverse=True)
+
+    return {
+        "quote_currency": quote_currency,
+        "total_value": _string(total),
+        "pnl_24h": _string(total_pnl),
+        "change_24h": _percent(total_pnl, total_previous),
+        "assets": assets,
+        "errors": errors,
+    }
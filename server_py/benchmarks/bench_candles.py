@@ -0,0 +1,92 @@
+"""
+Benchmark: parsing candles into the old list of string dictionaries versus the
+columnar CandleSeries, plus indicator computation over the columnar form.
+
+Usage (from server_py/):
+    python -m benchmarks.bench_candles --candles 300 --rounds 200
+"""
+
+import argparse
+import statistics
+import time
+import tracemalloc
+from datetime import datetime
+from app.services.candles import CandleSeries
+from app.services.indicators import compute_indicators, sma
+
+
+def _rows(count: int) -> list:
+    """Synthetic Coinbase candle rows, newest first."""
+    now = int(time.time()) // 3600 * 3600
+    return [[now - i * 3600, 99.5 + i % 7, 101.5 + i % 5, 100.0 + i % 3, 100.5 + i % 11, 12.5 + i]
+            for i in range(count)]
+
+
+def _dict_path(rows: list) -> list:
+    """Old path: one dictionary of strings per candle, closes re-parsed for use."""
+    candles = [
+        {
+            "time": datetime.fromtimestamp(row[0]).isoformat(),
+            "low": str(row[1]),
+            "high": str(row[2]),
+            "open": str(row[3]),
+            "close": str(row[4]),
+            "volume": str(row[5])
+        }
+        for row in rows
+    ]
+    closes = [float(candle["close"]) for candle in reversed(candles)]
+    return [sum(closes[i - 14:i]) / 14 for i in range(14, len(closes) + 1)]
+
+
+def _columnar_path(rows: list):
+    """New path: parse once into arrays and compute the same SMA."""
+    return sma(CandleSeries.from_coinbase(rows).close, 14)
+
+
+def _all_indicators(rows: list) -> dict:
+    """Full indicator endpoint payload, including JSON conversion."""
+    return compute_indicators(CandleSeries.from_coinbase(rows), 14, 3600)
+
+
+def _time(func, rows: list, rounds: int) -> list:
+    samples = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        func(rows)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def _footprint(rows: list) -> tuple:
+    """Peak bytes held by the dictionary form and by the columnar form."""
+    tracemalloc.start()
+    candles = [{"time": datetime.fromtimestamp(r[0]).isoformat(), "low": str(r[1]), "high": str(r[2]),
+                "open": str(r[3]), "close": str(r[4]), "volume": str(r[5])} for r in rows]
+    dict_bytes = tracemalloc.get_traced_memory()[0]
+    del candles
+    tracemalloc.stop()
+    return dict_bytes, CandleSeries.from_coinbase(rows).nbytes
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--candles", type=int, default=300, help="Candles per series")
+    parser.add_argument("--rounds", type=int, default=200, help="Repetitions per path")
+    args = parser.parse_args()
+
+    rows = _rows(args.candles)
+    dicts = _time(_dict_path, rows, args.rounds)
+    columnar = _time(_columnar_path, rows, args.rounds)
+    full = _time(_all_indicators, rows, args.rounds)
+    dict_bytes, columnar_bytes = _footprint(rows)
+
+    print(f"dicts + SMA            mean={statistics.mean(dicts) * 1000:7.3f}ms")
+    print(f"columnar + SMA         mean={statistics.mean(columnar) * 1000:7.3f}ms")
+    print(f"speedup (mean): {statistics.mean(dicts) / statistics.mean(columnar):.2f}x")
+    print(f"all indicators as JSON mean={statistics.mean(full) * 1000:7.3f}ms")
+    print(f"memory per series      dicts={dict_bytes / 1024:.1f}KiB columnar={columnar_bytes / 1024:.1f}KiB")
+
+
+if __name__ == "__main__":
+    main()
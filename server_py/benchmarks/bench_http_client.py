@@ -0,0 +1,73 @@
+"""
+Benchmark: per-request latency of a fresh httpx.AsyncClient per call versus the
+shared pooled client, against a local Coinbase Exchange stub.
+
+Usage (from server_py/):
+    python -m benchmarks.bench_http_client --requests 200
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+import httpx
+from app.services.http_client import create_http_client
+from benchmarks.stubs import StubServer, create_coinbase_exchange_stub
+
+
+def _summary(label: str, samples: list) -> str:
+    """Format latency samples (seconds) as a one-line summary in milliseconds."""
+    ordered = sorted(samples)
+    p95 = ordered[int(len(ordered) * 0.95) - 1]
+    return (
+        f"{label:<22} mean={statistics.mean(samples) * 1000:7.3f}ms "
+        f"p50={statistics.median(samples) * 1000:7.3f}ms p95={p95 * 1000:7.3f}ms"
+    )
+
+
+async def _fresh_client(url: str, count: int) -> list:
+    """Old path: open and close a new client for every request."""
+    samples = []
+    for _ in range(count):
+        start = time.perf_counter()
+        async with httpx.AsyncClient() as client:
+            response = await client.get(url, params={"granularity": 3600})
+            response.raise_for_status()
+            response.json()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+async def _shared_client(url: str, count: int) -> list:
+    """New path: one pooled client reused for every request."""
+    samples = []
+    client = create_http_client()
+    try:
+        for _ in range(count):
+            start = time.perf_counter()
+            response = await client.get(url, params={"granularity": 3600})
+            response.raise_for_status()
+            response.json()
+            samples.append(time.perf_counter() - start)
+    finally:
+        await client.aclose()
+    return samples
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200, help="Requests per mode")
+    args = parser.parse_args()
+
+    with StubServer(create_coinbase_exchange_stub()) as server:
+        url = f"{server.url}/products/BTC-GBP/candles"
+        fresh = asyncio.run(_fresh_client(url, args.requests))
+        shared = asyncio.run(_shared_client(url, args.requests))
+
+    print(_summary("fresh client per call", fresh))
+    print(_summary("shared pooled client", shared))
+    print(f"speedup (mean): {statistics.mean(fresh) / statistics.mean(shared):.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Benchmark: cost of the metrics instrumentation - a single histogram observation,
+an upstream call wrapped in track_upstream, and a request through the ASGI app
+with and without MetricsMiddleware.
+
+Usage (from server_py/):
+    python -m benchmarks.bench_metrics --rounds 200000 --requests 2000
+"""
+
+import argparse
+import asyncio
+import time
+import httpx
+from fastapi import FastAPI
+from app.metrics import MetricsMiddleware, Registry, track_upstream
+
+
+def _per_call(func, rounds: int) -> float:
+    """Mean time per call in nanoseconds."""
+    start = time.perf_counter()
+    for _ in range(rounds):
+        func()
+    return (time.perf_counter() - start) / rounds * 1e9
+
+
+def _app(instrumented: bool) -> FastAPI:
+    app = FastAPI()
+    if instrumented:
+        app.add_middleware(MetricsMiddleware)
+
+    @app.get("/api/crypto/price/{product_id}")
+    async def price(product_id: str):
+        return {"product_id": product_id, "price": "30000"}
+
+    return app
+
+
+async def _requests(app: FastAPI, count: int) -> float:
+    """Mean time per request in microseconds."""
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        for _ in range(50):
+            await client.get("/api/crypto/price/BTC-GBP")
+        start = time.perf_counter()
+        for _ in range(count):
+            await client.get("/api/crypto/price/BTC-GBP")
+        return (time.perf_counter() - start) / count * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rounds", type=int, default=200000, help="Observations per micro-benchmark")
+    parser.add_argument("--requests", type=int, default=2000, help="Requests per app variant")
+    args = parser.parse_args()
+
+    histogram = Registry().histogram("bench_seconds", "Benchmark", ("route",))
+
+    def wrapped():
+        with track_upstream("bench"):
+            pass
+
+    print(f"histogram.observe        {_per_call(lambda: histogram.observe(0.042, '/route'), args.rounds):8.0f} ns")
+    print(f"track_upstream (no-op)   {_per_call(wrapped, args.rounds):8.0f} ns")
+
+    plain = asyncio.run(_requests(_app(False), args.requests))
+    instrumented = asyncio.run(_requests(_app(True), args.requests))
+    print(f"request without metrics  {plain:8.1f} us")
+    print(f"request with middleware  {instrumented:8.1f} us  (+{instrumented - plain:.1f} us)")
+
+
+if __name__ == "__main__":
+    main()
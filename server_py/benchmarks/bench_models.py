@@ -0,0 +1,105 @@
+"""
+Benchmark: CPU time and allocations of turning a large accounts response into the
+portfolio, using the old recursive `__dict__` walk versus the slotted models.
+
+Usage (from server_py/):
+    python -m benchmarks.bench_models --accounts 2000 --rounds 50
+"""
+
+import argparse
+import statistics
+import time
+import tracemalloc
+from typing import Any
+from coinbase.rest.types.accounts_types import ListAccountsResponse
+from app.services.coinbase_models import parse_accounts
+
+
+def _synthetic_accounts(count: int) -> ListAccountsResponse:
+    """An SDK response with `count` accounts, a tenth of them holding a balance."""
+    accounts = []
+    for i in range(count):
+        held = i % 10 == 0
+        accounts.append({
+            "uuid": f"8bfc20d7-f7c6-4422-bf07-{i:012d}",
+            "name": f"COIN{i} Wallet",
+            "currency": f"COIN{i}",
+            "available_balance": {"value": "1.25" if held else "0", "currency": f"COIN{i}"},
+            "default": True,
+            "active": True,
+            "created_at": "2021-05-31T09:59:59Z",
+            "updated_at": "2021-05-31T09:59:59Z",
+            "deleted_at": None,
+            "type": "ACCOUNT_TYPE_CRYPTO" if i % 7 else "ACCOUNT_TYPE_FIAT",
+            "ready": True,
+            "hold": {"value": "0", "currency": f"COIN{i}"},
+            "retail_portfolio_id": "b87a2d3f-8a1e-49b3-a4ea-402d8c389aca",
+            "platform": "ACCOUNT_PLATFORM_CONSUMER",
+        })
+    return ListAccountsResponse({"accounts": accounts, "has_next": False, "cursor": "", "size": count})
+
+
+def _to_dict(obj: Any) -> Any:
+    """The previous CoinbaseService._to_dict conversion."""
+    if hasattr(obj, "__dict__"):
+        return {k: _to_dict(v) for k, v in obj.__dict__.items() if not k.startswith("_")}
+    elif isinstance(obj, (list, tuple)):
+        return [_to_dict(item) for item in obj]
+    elif isinstance(obj, dict):
+        return {k: _to_dict(v) for k, v in obj.items()}
+    elif isinstance(obj, (str, int, float, bool, type(None))):
+        return obj
+    return str(obj)
+
+
+def _old_portfolio(response: ListAccountsResponse) -> list:
+    portfolio = []
+    for account in _to_dict(response).get("accounts", []):
+        balance = account.get("available_balance", {})
+        if isinstance(balance, dict):
+            value = balance.get("value", "0")
+            if (account.get("type") == "ACCOUNT_TYPE_CRYPTO" and account.get("ready", False) and float(value) > 0) or \
+               (account.get("type") == "ACCOUNT_TYPE_FIAT" and float(value) > 0):
+                portfolio.append({"currency": balance.get("currency", ""), "balance": value, "available": value})
+    return portfolio
+
+
+def _new_portfolio(response: ListAccountsResponse) -> list:
+    return [
+        {"currency": account.currency, "balance": account.value, "available": account.value}
+        for account in parse_accounts(response) if account.is_held()
+    ]
+
+
+def _measure(func, response, rounds: int) -> tuple:
+    """Return (mean seconds per call, peak bytes allocated during one call)."""
+    samples = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        func(response)
+        samples.append(time.perf_counter() - start)
+    tracemalloc.start()
+    func(response)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return statistics.mean(samples), peak
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--accounts", type=int, default=2000, help="Accounts in the synthetic response")
+    parser.add_argument("--rounds", type=int, default=50, help="Repetitions per path")
+    args = parser.parse_args()
+
+    response = _synthetic_accounts(args.accounts)
+    assert _old_portfolio(response) == _new_portfolio(response)
+    old_time, old_peak = _measure(_old_portfolio, response, args.rounds)
+    new_time, new_peak = _measure(_new_portfolio, response, args.rounds)
+
+    print(f"_to_dict walk   mean={old_time * 1000:8.3f}ms peak={old_peak / 1024:8.1f}KiB")
+    print(f"slotted models  mean={new_time * 1000:8.3f}ms peak={new_peak / 1024:8.1f}KiB")
+    print(f"speedup (mean): {old_time / new_time:.2f}x, allocation reduction: {old_peak / new_peak:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Benchmark: latency of price, portfolio and valuation requests while Coinbase is
+down, with circuit breakers and stale-while-revalidate serving versus without.
+
+The backend runs against the local stubs. After a healthy phase the stubs start
+answering slower than the backend's upstream timeouts, simulating an outage.
+Without breakers every request whose cache entry has expired waits for the
+timeout; with them, the last known values are served while the circuits are open.
+
+Usage (from server_py/):
+    python -m benchmarks.bench_outage --duration 10
+"""
+
+import argparse
+import asyncio
+from benchmarks.loadtest import print_table, run_scenarios, stub_backend, write_report
+from benchmarks.stubs import StubLatency, create_openai_stub
+
+PATHS = {
+    "price": "/api/crypto/price/BTC-GBP",
+    "portfolio": "/api/crypto/portfolio",
+    "valuation": "/api/crypto/portfolio/valuation",
+}
+
+# Short timeouts and TTLs so the outage reaches every cache within the run
+SETTINGS = {
+    "CANDLE_STORE_ENABLED": "false",
+    "COINBASE_REST_TIMEOUT": "1",
+    "UPSTREAM_READ_TIMEOUT": "1",
+    "UPSTREAM_MAX_RETRIES": "1",
+    "PRICE_CACHE_TTL": "1",
+    "PORTFOLIO_CACHE_TTL": "1",
+    "VALUATION_CACHE_TTL": "1",
+    "CANDLE_CACHE_MAX_TTL": "1",
+}
+
+MODES = {
+    "without": {"CIRCUIT_FAILURE_THRESHOLD": "0", "CACHE_STALE_TTL": "0"},
+    "with": {"CIRCUIT_FAILURE_THRESHOLD": "5", "CACHE_STALE_TTL": "3600"},
+}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=8, help="Requests in flight per scenario")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds per scenario and phase")
+    parser.add_argument("--outage-latency", type=float, default=3000.0,
+                        help="Coinbase stub latency during the outage (ms), above the upstream timeouts")
+    parser.add_argument("--output", help="JSON results path (default: benchmarks/results/outage-<time>.json)")
+    args = parser.parse_args()
+
+    results = {}
+    for mode, breaker_settings in MODES.items():
+        upstream = StubLatency(0.0)
+        with stub_backend(upstream, create_openai_stub(), settings={**SETTINGS, **breaker_settings},
+                          quiet=True) as (backend_url, _):
+            healthy = asyncio.run(run_scenarios(backend_url, PATHS, args.concurrency, 0, args.duration))
+            upstream.latency = args.outage_latency / 1000
+            outage = asyncio.run(run_scenarios(backend_url, PATHS, args.concurrency, 0, args.duration, warmup=0))
+            # Let requests still held by the stubs finish before they shut down
+            upstream.latency = 0.0
+        results[mode] = {"healthy": healthy, "outage": outage}
+        for phase in ("healthy", "outage"):
+            print(f"\n{phase}, {mode} circuit breakers")
+            print_table(results[mode][phase])
+
+    print(f"\n{'outage':<12} {'p50 without':>12} {'p50 with':>10} {'p99 without':>12} {'p99 with':>10}")
+    for name in PATHS:
+        without, with_ = results["without"]["outage"][name], results["with"]["outage"][name]
+        print(f"{name:<12} {without['latency_ms'].get('p50', 0):>12.1f} {with_['latency_ms'].get('p50', 0):>10.1f} "
+              f"{without['latency_ms'].get('p99', 0):>12.1f} {with_['latency_ms'].get('p99', 0):>10.1f}")
+
+    output = write_report(results, vars(args), args.output, prefix="outage")
+    print(f"results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
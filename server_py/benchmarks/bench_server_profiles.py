@@ -0,0 +1,63 @@
+"""
+Benchmark: throughput and latency of the backend started through run.py in the
+dev profile (reload, one worker, DEBUG text logging) versus the prod profile
+(workers, uvloop/httptools when installed, orjson responses, sampled JSON
+logging), against the local Coinbase and OpenAI stubs. Startup time until the
+health check answers is reported for each profile.
+
+Usage (from server_py/):
+    python -m benchmarks.bench_server_profiles --workers 4 --duration 10
+"""
+
+import argparse
+import asyncio
+from benchmarks.loadtest import _scenarios, print_table, run_scenarios, stub_backend, write_report
+from benchmarks.stubs import StubLatency, create_openai_stub
+
+UNLIMITED = {"COINBASE_PUBLIC_RATE": "0", "COINBASE_PRIVATE_RATE": "0"}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", default="price,historical,indicators,valuation",
+                        help="Comma-separated load test scenarios")
+    parser.add_argument("--workers", type=int, default=4, help="Worker processes for the prod profile")
+    parser.add_argument("--concurrency", type=int, default=32, help="Requests in flight per scenario")
+    parser.add_argument("--requests", type=int, default=2000, help="Requests per scenario")
+    parser.add_argument("--duration", type=float, help="Seconds per scenario (overrides --requests)")
+    parser.add_argument("--upstream-latency", type=float, default=0.0,
+                        help="Coinbase stub latency (ms); 0 isolates server overhead")
+    parser.add_argument("--output", help="JSON results path (default: benchmarks/results/profiles-<time>.json)")
+    args = parser.parse_args()
+
+    paths = _scenarios(5)
+    selected = {name.strip(): paths[name.strip()] for name in args.scenarios.split(",") if name.strip()}
+    upstream = StubLatency(args.upstream_latency / 1000)
+
+    results = {}
+    startup = {}
+    for profile in ("dev", "prod"):
+        workers = args.workers if profile == "prod" else 1
+        # Per-worker rate limits would otherwise dominate the comparison
+        with stub_backend(upstream, create_openai_stub(), settings=UNLIMITED, profile=profile,
+                          workers=workers, quiet=True) as (backend_url, startup_seconds):
+            startup[profile] = round(startup_seconds, 3)
+            results[profile] = asyncio.run(run_scenarios(backend_url, selected, args.concurrency,
+                                                         args.requests, args.duration, warmup=50))
+        print(f"\n{profile} profile ({workers} worker{'s' if workers > 1 else ''}, "
+              f"started in {startup_seconds:.2f}s)")
+        print_table(results[profile])
+
+    print(f"\n{'scenario':<18} {'dev rps':>9} {'prod rps':>9} {'speedup':>8} {'dev p95':>9} {'prod p95':>9}")
+    for name in selected:
+        dev, prod = results["dev"][name], results["prod"][name]
+        speedup = prod["throughput_rps"] / dev["throughput_rps"] if dev["throughput_rps"] else 0.0
+        print(f"{name:<18} {dev['throughput_rps']:>9.1f} {prod['throughput_rps']:>9.1f} {speedup:>7.2f}x "
+              f"{dev['latency_ms'].get('p95', 0):>9.2f} {prod['latency_ms'].get('p95', 0):>9.2f}")
+
+    output = write_report(results, vars(args), args.output, prefix="profiles", startup_seconds=startup)
+    print(f"results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
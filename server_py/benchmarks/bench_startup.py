@@ -0,0 +1,95 @@
+"""
+Benchmark: import time of app.main and cold start of the backend.
+
+Import time is measured in fresh interpreters without credentials, and reports
+which heavy SDKs the import pulled in. Cold start starts the backend against the
+local stubs and measures the time until the health check answers, then the
+latency of the first request to each endpoint, which includes creating the
+services it depends on. Cold starts run with SDKs imported on first use and
+with PRELOAD_SDKS, which imports them in the background after startup.
+
+Usage (from server_py/):
+    python -m benchmarks.bench_startup --imports 5 --starts 3
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+import httpx
+from benchmarks.loadtest import SERVER_DIR, _scenarios, stub_backend, write_report
+from benchmarks.stubs import StubLatency, create_openai_stub
+
+HEAVY_MODULES = ("openai", "coinbase.rest", "requests")
+
+_MEASURE_IMPORT = f"""
+import json, sys, time
+started = time.perf_counter()
+import app.main
+print(json.dumps({{"seconds": time.perf_counter() - started,
+                  "loaded": [name for name in {HEAVY_MODULES!r} if name in sys.modules]}}))
+"""
+
+FIRST_REQUESTS = ("portfolio", "price", "historical", "recommendations")
+
+
+def measure_import() -> dict:
+    """Import app.main in a fresh interpreter without credentials."""
+    env = {name: value for name, value in os.environ.items()
+           if not name.startswith(("COINBASE_API_", "OPENAI_API_"))}
+    output = subprocess.run([sys.executable, "-c", _MEASURE_IMPORT], cwd=SERVER_DIR, env=env,
+                            capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def measure_cold_start(paths: dict, preload: bool, settle: float = 2.0) -> dict:
+    """
+    Start the backend and time its health check and first request to each path.
+    The first request is sent `settle` seconds after the health check, giving a
+    background preload time to finish, as it would before real traffic arrives.
+    """
+    settings = {"CANDLE_STORE_ENABLED": "false", "PRELOAD_SDKS": str(preload).lower()}
+    with stub_backend(StubLatency(0.0), create_openai_stub(), quiet=True,
+                      settings=settings) as (backend_url, startup_seconds):
+        first = {}
+        time.sleep(settle)
+        with httpx.Client(base_url=backend_url, timeout=60.0) as client:
+            for name in FIRST_REQUESTS:
+                started = time.perf_counter()
+                client.get(paths[name]).raise_for_status()
+                first[name] = (time.perf_counter() - started) * 1000
+    return {"startup_seconds": startup_seconds, "first_request_ms": first}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--imports", type=int, default=5, help="Fresh interpreters importing app.main")
+    parser.add_argument("--starts", type=int, default=3, help="Backend cold starts")
+    parser.add_argument("--output", help="JSON results path (default: benchmarks/results/startup-<time>.json)")
+    args = parser.parse_args()
+
+    imports = [measure_import() for _ in range(args.imports)]
+    import_seconds = [result["seconds"] for result in imports]
+    print(f"import app.main: median {statistics.median(import_seconds) * 1000:.0f} ms, "
+          f"min {min(import_seconds) * 1000:.0f} ms; heavy modules loaded: {imports[-1]['loaded'] or 'none'}")
+
+    paths = _scenarios(5)
+    starts = {mode: [measure_cold_start(paths, preload=mode == "preload") for _ in range(args.starts)]
+              for mode in ("lazy", "preload")}
+    print(f"\n{'cold start (median)':<22} {'lazy':>10} {'preload':>10}")
+    print(f"{'health check s':<22} " + " ".join(
+        f"{statistics.median(s['startup_seconds'] for s in starts[mode]):>10.2f}" for mode in starts))
+    for name in FIRST_REQUESTS:
+        print(f"{'first ' + name + ' ms':<22} " + " ".join(
+            f"{statistics.median(s['first_request_ms'][name] for s in starts[mode]):>10.1f}" for mode in starts))
+
+    results = {"import": imports, "cold_start": starts}
+    output = write_report(results, vars(args), args.output, prefix="startup")
+    print(f"results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""
+In-process fakes of the backend's services, injected with FastAPI dependency
+overrides. Serving the app with fakes measures the server's own overhead (routing,
+serialization, middleware) without upstream stubs, TLS or SDK code.
+
+Usage (from server_py/):
+    uvicorn --factory benchmarks.fakes:create_app --port 3001
+    python -m benchmarks.loadtest --fakes
+"""
+
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+import asyncio
+import os
+import time
+from fastapi import FastAPI
+from benchmarks.stubs import STUB_CURRENCIES, _synthetic_price
+from app.services.candles import CandleSeries
+from app.services.valuation import value_portfolio
+
+
+class FakeCoinbaseService:
+    """
+    Stand-in for CoinbaseService serving a synthetic portfolio and prices.
+
+    Args:
+        accounts: Funded crypto accounts in the portfolio
+        latency: Seconds each call waits, simulating upstream time
+    """
+
+    store_stale_after = 60.0
+    market_quote = "GBP"
+    portfolio_history = None
+    account_name = "default"
+
+    def __init__(self, accounts: int = 5, latency: float = 0.0):
+        self.holdings = accounts
+        self.accounts = {self.account_name: self}
+        self.latency = latency
+        self.calls = 0
+
+    async def _wait(self) -> None:
+        self.calls += 1
+        if self.latency > 0:
+            await asyncio.sleep(self.latency)
+
+    async def get_portfolio(self) -> List[Dict[str, Any]]:
+        await self._wait()
+        currencies = [STUB_CURRENCIES[i] if i < len(STUB_CURRENCIES) else f"C{i}" for i in range(self.holdings)]
+        return [{"currency": currency, "balance": "1.5", "available": "1.5"} for currency in currencies]
+
+    async def get_portfolio_snapshot(self) -> Tuple[List[Dict[str, Any]], Optional[float]]:
+        return await self.get_portfolio(), None
+
+    async def load_portfolio(self) -> Tuple[List[Dict[str, Any]], Optional[float]]:
+        return await self.get_portfolio_snapshot()
+
+    async def get_crypto_price(self, product_id: str) -> Dict[str, Any]:
+        await self._wait()
+        now = time.time()
+        price, price_24h_ago = _synthetic_price(product_id, now), _synthetic_price(product_id, now - 86400)
+        return {
+            "price": str(price),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(now)),
+            "change_24h": round((price - price_24h_ago) / price_24h_ago * 100, 2),
+            "price_24h_ago": str(price_24h_ago),
+        }
+
+    async def get_prices(self, product_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        unique_ids = list(dict.fromkeys(product_ids))
+        prices = await asyncio.gather(*(self.get_crypto_price(product_id) for product_id in unique_ids))
+        return dict(zip(unique_ids, prices))
+
+    async def get_price_in(self, currency: str, quote_currency: str) -> Dict[str, Any]:
+        return await self.get_crypto_price(f"{currency.upper()}-{quote_currency.upper()}")
+
+    async def get_portfolio_valuation(self, quote_currency: Optional[str] = None) -> Dict[str, Any]:
+        quote_currency = quote_currency or self.market_quote
+        portfolio = await self.get_portfolio()
+        prices = await self.get_prices([f"{h['currency']}-{quote_currency.upper()}" for h in portfolio])
+        return value_portfolio(portfolio, prices, quote_currency)
+
+    async def get_consolidated_valuation(self, quote_currency: Optional[str] = None) -> Dict[str, Any]:
+        valuation = await self.get_portfolio_valuation(quote_currency)
+        return {**valuation, "accounts": {self.account_name: valuation}}
+
+    async def get_candle_range(self, product_id: str, start: int, end: int, granularity: int) -> CandleSeries:
+        await self._wait()
+        first = -(-start // granularity) * granularity
+        rows = []
+        for bucket in range(first, end + 1, granularity):
+            price = _synthetic_price(product_id, bucket)
+            rows.append([bucket, price * 0.99, price * 1.01, price, price, 10.0])
+        return CandleSeries.from_coinbase(rows)
+
+    async def get_candle_series(self, product_id: str) -> Tuple[CandleSeries, Optional[float]]:
+        end = int(time.time())
+        return await self.get_candle_range(product_id, end - 86400, end, 3600), None
+
+    async def get_historical_snapshot(self, product_id: str) -> Tuple[List[Dict[str, Any]], Optional[float]]:
+        candles, age = await self.get_candle_series(product_id)
+        return candles.to_records(), age
+
+    async def get_historical_data(self, product_id: str) -> List[Dict[str, Any]]:
+        candles, _ = await self.get_candle_series(product_id)
+        return candles.to_records()
+
+    def cache_stats(self) -> Dict[str, Any]:
+        return {"calls": self.calls}
+
+
+class FakeAIService:
+    """Stand-in for AIService returning fixed recommendations."""
+
+    TEXT = "1. Hold BTC\n2. Rebalance towards stablecoins\n3. Review in a week"
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.calls = 0
+
+    async def get_recommendations(self, portfolio: List[Dict[str, Any]], market_data: List[Dict[str, Any]]) -> str:
+        self.calls += 1
+        if self.latency > 0:
+            await asyncio.sleep(self.latency)
+        return self.TEXT
+
+    async def stream_recommendations(self, portfolio: List[Dict[str, Any]],
+                                     market_data: List[Dict[str, Any]]) -> AsyncIterator[str]:
+        yield await self.get_recommendations(portfolio, market_data)
+
+    def cache_stats(self) -> Dict[str, Any]:
+        return {"calls": self.calls}
+
+
+def create_app() -> FastAPI:
+    """
+    Return the backend app with its services replaced by fakes.
+
+    Environment variables:
+        FAKE_ACCOUNTS: Funded accounts in the fake portfolio (default: 5)
+        FAKE_LATENCY_MS: Simulated upstream time per Coinbase call (default: 0)
+        FAKE_AI_LATENCY_MS: Simulated time per recommendations call (default: 0)
+    """
+    from app.dependencies import get_ai_service, get_coinbase_service
+    from app.main import app
+
+    coinbase = FakeCoinbaseService(accounts=int(os.getenv("FAKE_ACCOUNTS", "5")),
+                                   latency=float(os.getenv("FAKE_LATENCY_MS", "0")) / 1000)
+    ai = FakeAIService(latency=float(os.getenv("FAKE_AI_LATENCY_MS", "0")) / 1000)
+    app.dependency_overrides[get_coinbase_service] = lambda: coinbase
+    app.dependency_overrides[get_ai_service] = lambda: ai
+    return app
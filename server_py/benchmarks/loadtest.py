@@ -0,0 +1,347 @@
+"""
+Load test: drives the backend's /api/* endpoints at a fixed concurrency against
+local Coinbase (Advanced Trade, Exchange) and OpenAI stand-ins with configurable
+latency and jitter, and reports throughput and p50/p95/p99 latency per endpoint.
+
+The backend runs unmodified in a Uvicorn subprocess; only its upstream URLs and
+credentials are pointed at the stubs. With --fakes its services are replaced by
+in-process fakes (see benchmarks.fakes) to measure the server's own overhead.
+Results are printed as a table and written as JSON so runs can be compared
+before and after a change.
+
+Usage (from server_py/):
+    python -m benchmarks.loadtest --concurrency 20 --requests 500
+    python -m benchmarks.loadtest --scenarios valuation,prices --duration 30 \\
+        --upstream-latency 80 --upstream-jitter 40 --output results.json
+    python -m benchmarks.loadtest --fakes --env FAKE_LATENCY_MS=20
+"""
+
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import httpx
+from fastapi import FastAPI
+from benchmarks.stubs import (
+    STUB_CURRENCIES,
+    StubLatency,
+    StubServer,
+    _free_port,
+    create_coinbase_advanced_stub,
+    create_coinbase_exchange_stub,
+    create_openai_stub,
+    create_self_signed_cert,
+    generate_api_secret,
+)
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(SERVER_DIR, "benchmarks", "results")
+
+
+def _scenarios(accounts: int) -> Dict[str, str]:
+    """Request paths for each scenario, built for the stub portfolio."""
+    currencies = [STUB_CURRENCIES[i] if i < len(STUB_CURRENCIES) else f"C{i}" for i in range(accounts)]
+    products = ",".join(f"{currency}-GBP" for currency in currencies[:5])
+    return {
+        "portfolio": "/api/crypto/portfolio",
+        "valuation": "/api/crypto/portfolio/valuation",
+        "price": "/api/crypto/price/BTC-GBP",
+        "prices": f"/api/crypto/prices?ids={products}",
+        "historical": "/api/crypto/historical/BTC-GBP",
+        "historical_range": "/api/crypto/historical/BTC-GBP?start=2024-01-01T00:00:00Z"
+                            "&end=2024-01-15T00:00:00Z&granularity=3600",
+        "indicators": "/api/crypto/indicators/BTC-GBP?window=14",
+        "recommendations": "/api/recommendations/",
+        "analysis": "/api/recommendations/analysis",
+    }
+
+
+def _percentile(ordered: List[float], q: float) -> float:
+    """Nearest-rank percentile of sorted samples."""
+    index = max(0, min(len(ordered) - 1, int(round(q / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def summarize(samples: List[float], errors: int, elapsed: float) -> Dict[str, Any]:
+    """
+    Summarize one scenario.
+
+    Args:
+        samples: Latencies in seconds of all completed requests
+        errors: Number of failed requests (non-2xx or transport errors)
+        elapsed: Wall-clock duration of the scenario in seconds
+
+    Returns:
+        Dictionary with request counts, throughput and latency percentiles in milliseconds
+    """
+    ordered = sorted(samples)
+    latency = {}
+    if ordered:
+        latency = {
+            "mean": statistics.mean(ordered) * 1000,
+            "p50": _percentile(ordered, 50) * 1000,
+            "p95": _percentile(ordered, 95) * 1000,
+            "p99": _percentile(ordered, 99) * 1000,
+            "max": ordered[-1] * 1000,
+        }
+    return {
+        "requests": len(samples),
+        "errors": errors,
+        "duration_s": elapsed,
+        "throughput_rps": len(samples) / elapsed if elapsed else 0.0,
+        "latency_ms": {name: round(value, 3) for name, value in latency.items()},
+    }
+
+
+async def run_scenario(client: httpx.AsyncClient, path: str, concurrency: int,
+                       requests: int, duration: Optional[float], warmup: int) -> Dict[str, Any]:
+    """
+    Drive one endpoint with `concurrency` workers issuing requests back to back.
+
+    Args:
+        client: Client pointed at the backend
+        path: Request path including the query string
+        concurrency: Number of requests in flight at once
+        requests: Total requests to send (ignored when `duration` is given)
+        duration: Run for this many seconds instead of a fixed request count
+        warmup: Requests sent first and excluded from the results
+
+    Returns:
+        Scenario summary as returned by summarize()
+    """
+    for _ in range(warmup):
+        await client.get(path)
+
+    samples: List[float] = []
+    errors = 0
+    remaining = requests
+    deadline = time.perf_counter() + duration if duration else None
+
+    async def worker() -> None:
+        nonlocal errors, remaining
+        while True:
+            if deadline is not None:
+                if time.perf_counter() >= deadline:
+                    return
+            elif remaining <= 0:
+                return
+            else:
+                remaining -= 1
+            start = time.perf_counter()
+            try:
+                response = await client.get(path)
+                await response.aread()
+                failed = response.status_code >= 400
+            except httpx.HTTPError:
+                failed = True
+            samples.append(time.perf_counter() - start)
+            errors += failed
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(samples, errors, time.perf_counter() - started)
+
+
+def _git_commit() -> Optional[str]:
+    """Return the current commit hash, or None outside a git checkout."""
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=SERVER_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _wait_for_backend(url: str, process: subprocess.Popen, timeout: float = 60.0) -> None:
+    """Block until the backend answers its health check."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Backend exited with code {process.returncode}")
+        try:
+            if httpx.get(f"{url}/", timeout=1.0).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.05)
+    raise RuntimeError("Backend did not start")
+
+
+def backend_command(port: int, profile: Optional[str] = None, workers: int = 1, fakes: bool = False) -> List[str]:
+    """
+    Command line starting the backend: plain Uvicorn (serving the app with fake
+    services if `fakes` is set), or run.py with a server profile.
+    """
+    if fakes:
+        return [sys.executable, "-m", "uvicorn", "--factory", "benchmarks.fakes:create_app", "--host", "127.0.0.1",
+                "--port", str(port), "--log-level", "warning"]
+    if profile is None:
+        return [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1",
+                "--port", str(port), "--log-level", "warning"]
+    return [sys.executable, "run.py", "--profile", profile, "--host", "127.0.0.1",
+            "--port", str(port), "--workers", str(workers)]
+
+
+@contextmanager
+def stub_backend(upstream: StubLatency, openai_stub: FastAPI, accounts: int = 5, poller: bool = False,
+                 settings: Optional[Dict[str, str]] = None, profile: Optional[str] = None,
+                 workers: int = 1, quiet: bool = False, fakes: bool = False) -> Iterator[Tuple[str, float]]:
+    """
+    Start the Coinbase and OpenAI stubs and a backend process pointed at them.
+
+    Args:
+        upstream: Latency of the Coinbase stubs
+        openai_stub: OpenAI stub application (see create_openai_stub)
+        accounts: Funded crypto accounts in the stub portfolio
+        poller: Run the background market data poller
+        settings: Extra backend environment variables
+        profile: Start through run.py with this server profile instead of plain Uvicorn
+        workers: Worker processes for the prod profile
+        quiet: Discard the backend's output
+        fakes: Replace the backend's services with benchmarks.fakes (the stubs are then unused)
+
+    Yields:
+        Tuple of (backend URL, seconds until the backend answered its health check)
+    """
+    with tempfile.TemporaryDirectory() as workdir:
+        certfile, keyfile = create_self_signed_cert(workdir)
+        with StubServer(create_coinbase_advanced_stub(upstream, accounts=accounts),
+                        certfile=certfile, keyfile=keyfile) as advanced, \
+                StubServer(create_coinbase_exchange_stub(upstream)) as exchange, \
+                StubServer(openai_stub) as openai:
+            env = dict(
+                os.environ,
+                COINBASE_API_KEY="organizations/stub/apiKeys/stub",
+                COINBASE_API_SECRET=generate_api_secret(),
+                COINBASE_API_BASE_URL=advanced.url.removeprefix("https://"),
+                REQUESTS_CA_BUNDLE=certfile,
+                COINBASE_EXCHANGE_API_URL=exchange.url,
+                OPENAI_API_KEY="stub",
+                OPENAI_BASE_URL=f"{openai.url}/v1",
+                ENABLE_AI_RECOMMENDATIONS="true",
+                CANDLE_STORE_PATH=os.path.join(workdir, "candles.db"),
+                MARKET_POLLER_ENABLED=str(poller).lower(),
+            )
+            if fakes:
+                env.update(MARKET_POLLER_ENABLED="false", CANDLE_STORE_ENABLED="false")
+            env.update(settings or {})
+
+            port = _free_port()
+            backend_url = f"http://127.0.0.1:{port}"
+            output = subprocess.DEVNULL if quiet else None
+            started = time.perf_counter()
+            backend = subprocess.Popen(backend_command(port, profile, workers, fakes), cwd=SERVER_DIR, env=env,
+                                       stdout=output, stderr=output)
+            try:
+                _wait_for_backend(backend_url, backend)
+                yield backend_url, time.perf_counter() - started
+            finally:
+                backend.terminate()
+                backend.wait(timeout=30)
+
+
+async def run_scenarios(backend_url: str, paths: Dict[str, str], concurrency: int, requests: int,
+                        duration: Optional[float] = None, warmup: int = 5) -> Dict[str, Dict[str, Any]]:
+    """Run each scenario (name -> request path) in turn and return their summaries."""
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=backend_url, limits=limits, timeout=60.0) as client:
+        results = {}
+        for name, path in paths.items():
+            results[name] = await run_scenario(client, path, concurrency, requests, duration, warmup)
+        return results
+
+
+def print_table(results: Dict[str, Dict[str, Any]]) -> None:
+    """Print scenario summaries as a table."""
+    print(f"{'scenario':<18} {'reqs':>6} {'errs':>5} {'rps':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    for name, result in results.items():
+        latency = result["latency_ms"]
+        print(
+            f"{name:<18} {result['requests']:>6} {result['errors']:>5} {result['throughput_rps']:>9.1f} "
+            f"{latency.get('p50', 0):>9.2f} {latency.get('p95', 0):>9.2f} "
+            f"{latency.get('p99', 0):>9.2f} {latency.get('max', 0):>9.2f}"
+        )
+
+
+def write_report(results: Dict[str, Any], config: Dict[str, Any], output: Optional[str],
+                 prefix: str = "loadtest", **meta: Any) -> str:
+    """
+    Write results as JSON with run metadata.
+
+    Returns:
+        The path written (default: benchmarks/results/<prefix>-<time>.json)
+    """
+    report = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "git_commit": _git_commit(),
+            "python": platform.python_version(),
+            "config": config,
+            **meta,
+        },
+        "scenarios": results,
+    }
+    if not output:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output = os.path.join(RESULTS_DIR, f"{prefix}-{datetime.now():%Y%m%d-%H%M%S}.json")
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    return output
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", default=",".join(_scenarios(0)),
+                        help="Comma-separated scenarios to run (default: all)")
+    parser.add_argument("--concurrency", type=int, default=10, help="Requests in flight per scenario")
+    parser.add_argument("--requests", type=int, default=200, help="Requests per scenario")
+    parser.add_argument("--duration", type=float, help="Seconds per scenario (overrides --requests)")
+    parser.add_argument("--warmup", type=int, default=5, help="Unmeasured requests before each scenario")
+    parser.add_argument("--upstream-latency", type=float, default=50.0, help="Coinbase stub latency (ms)")
+    parser.add_argument("--upstream-jitter", type=float, default=20.0, help="Coinbase stub jitter (ms)")
+    parser.add_argument("--openai-latency", type=float, default=300.0, help="OpenAI stub latency (ms)")
+    parser.add_argument("--openai-jitter", type=float, default=100.0, help="OpenAI stub jitter (ms)")
+    parser.add_argument("--accounts", type=int, default=5, help="Funded crypto accounts in the stub portfolio")
+    parser.add_argument("--poller", action="store_true", help="Run the background market data poller")
+    parser.add_argument("--profile", choices=("dev", "prod"),
+                        help="Start the backend through run.py with this profile (default: plain Uvicorn)")
+    parser.add_argument("--workers", type=int, default=1, help="Worker processes for --profile prod")
+    parser.add_argument("--fakes", action="store_true",
+                        help="Serve the app with fake services (FAKE_* settings via --env) instead of the stubs")
+    parser.add_argument("--env", action="append", default=[], metavar="NAME=VALUE",
+                        help="Extra backend setting, e.g. --env RECOMMENDATIONS_CACHE_TTL=0 (repeatable)")
+    parser.add_argument("--output", help="JSON results path (default: benchmarks/results/loadtest-<time>.json)")
+    args = parser.parse_args()
+
+    scenarios = _scenarios(args.accounts)
+    selected = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = [name for name in selected if name not in scenarios]
+    if unknown:
+        parser.error(f"Unknown scenarios: {', '.join(unknown)}")
+    if args.fakes and args.profile:
+        parser.error("--fakes runs plain Uvicorn and cannot be combined with --profile")
+
+    upstream = StubLatency(args.upstream_latency / 1000, args.upstream_jitter / 1000)
+    openai_stub = create_openai_stub(StubLatency(args.openai_latency / 1000, args.openai_jitter / 1000))
+    settings = dict(setting.partition("=")[::2] for setting in args.env)
+
+    with stub_backend(upstream, openai_stub, args.accounts, args.poller, settings,
+                      profile=args.profile, workers=args.workers, fakes=args.fakes) as (backend_url, _):
+        results = asyncio.run(run_scenarios(backend_url, {name: scenarios[name] for name in selected},
+                                            args.concurrency, args.requests, args.duration, args.warmup))
+
+    print_table(results)
+    output = write_report(results, vars(args), args.output, openai_stub=dict(openai_stub.state.stats))
+    print(f"results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
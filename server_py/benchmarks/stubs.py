@@ -0,0 +1,474 @@
+"""
+Local stand-in servers for benchmarking and testing the backend without touching real upstreams.
+HTTP stubs are small FastAPI apps served by Uvicorn on a background thread; the
+market data feed stub (WebSocket) and the Redis stub (RESP) run on the caller's
+event loop.
+"""
+
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Set, Tuple
+import asyncio
+import ipaddress
+import json
+import os
+import random
+import socket
+import threading
+import time
+import uuid
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+from cryptography.x509.oid import NameOID
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+import uvicorn
+from websockets.asyncio.server import serve
+
+
+class StubLatency:
+    """
+    Simulated upstream latency with optional uniform jitter.
+
+    Args:
+        latency: Base delay in seconds added to every response
+        jitter: Maximum extra delay in seconds, drawn uniformly per request
+    """
+
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0):
+        self.latency = latency
+        self.jitter = jitter
+
+    async def wait(self) -> None:
+        """Sleep for the configured latency plus a random jitter."""
+        delay = self.latency + (random.uniform(0, self.jitter) if self.jitter else 0.0)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+def _synthetic_price(product_id: str, timestamp: float) -> float:
+    """Deterministic, slowly varying price for a product at a point in time."""
+    base = 100.0 + (sum(map(ord, product_id)) % 50) * 1000.0
+    return base * (1 + 0.02 * ((timestamp // 3600) % 24 - 12) / 12)
+
+
+def create_coinbase_exchange_stub(latency: Optional[StubLatency] = None) -> FastAPI:
+    """
+    Build a stub of the public Coinbase Exchange API.
+
+    Candles are generated for the requested `start`/`end` range (at most 300, like
+    Coinbase), or for the last 24 buckets when no range is given.
+
+    Args:
+        latency: Simulated latency applied to every request
+
+    Returns:
+        FastAPI application serving `/products/{product_id}/candles`
+    """
+    latency = latency or StubLatency()
+    app = FastAPI()
+
+    @app.get("/products/{product_id}/candles")
+    async def candles(product_id: str, granularity: int = 3600, start: Optional[str] = None,
+                      end: Optional[str] = None):
+        await latency.wait()
+        last = int((datetime.fromisoformat(end).timestamp() if end else time.time()) // granularity * granularity)
+        first = int(datetime.fromisoformat(start).timestamp()) if start else last - 23 * granularity
+        first = max(-(-first // granularity) * granularity, last - 299 * granularity)
+        # Coinbase returns [time, low, high, open, close, volume], newest first
+        rows = []
+        for timestamp in range(last, first - 1, -granularity):
+            price = _synthetic_price(product_id, timestamp)
+            rows.append([timestamp, price - 50, price + 50, price - 10, price + 10, 12.5])
+        return rows
+
+    return app
+
+
+# Currencies used for synthetic accounts before falling back to generated symbols
+STUB_CURRENCIES = ["BTC", "ETH", "SOL", "ADA", "DOT", "LINK", "XRP", "LTC", "AVAX", "ATOM"]
+
+
+def create_coinbase_advanced_stub(latency: Optional[StubLatency] = None, accounts: int = 10) -> FastAPI:
+    """
+    Build a stub of the Coinbase Advanced Trade API endpoints used by the service.
+    The SDK only speaks HTTPS, so serve it with a certificate from create_self_signed_cert.
+
+    Args:
+        latency: Simulated latency applied to every request
+        accounts: Number of funded crypto accounts (a GBP fiat account is always added)
+
+    Returns:
+        FastAPI application serving `/api/v3/brokerage/accounts` and
+        `/api/v3/brokerage/products/{product_id}/ticker`
+    """
+    latency = latency or StubLatency()
+    app = FastAPI()
+    currencies = [STUB_CURRENCIES[i] if i < len(STUB_CURRENCIES) else f"C{i}" for i in range(accounts)]
+
+    def account(currency: str, value: str, type: str) -> dict:
+        return {
+            "uuid": str(uuid.uuid5(uuid.NAMESPACE_DNS, currency)), "name": f"{currency} Wallet",
+            "currency": currency, "available_balance": {"value": value, "currency": currency},
+            "default": True, "active": True, "created_at": "2024-01-01T00:00:00Z",
+            "updated_at": "2024-01-01T00:00:00Z", "deleted_at": None, "type": type, "ready": True,
+            "hold": {"value": "0", "currency": currency}, "retail_portfolio_id": "stub",
+            "platform": "ACCOUNT_PLATFORM_CONSUMER",
+        }
+
+    @app.get("/api/v3/brokerage/accounts")
+    async def list_accounts():
+        await latency.wait()
+        listed = [account(c, f"{1.5 + i:.8f}", "ACCOUNT_TYPE_CRYPTO") for i, c in enumerate(currencies)]
+        listed.append(account("GBP", "250.00", "ACCOUNT_TYPE_FIAT"))
+        return {"accounts": listed, "has_next": False, "cursor": "", "size": len(listed)}
+
+    @app.get("/api/v3/brokerage/products/{product_id}/ticker")
+    async def market_trades(product_id: str, limit: int = 1):
+        await latency.wait()
+        now = time.time()
+        price = _synthetic_price(product_id, now) + random.uniform(-5, 5)
+        trades = [{
+            "trade_id": str(int(now * 1000) - i), "product_id": product_id, "price": f"{price:.2f}",
+            "size": "0.01", "time": datetime.fromtimestamp(now, timezone.utc).isoformat(),
+            "side": "BUY", "exchange": "stub",
+        } for i in range(limit)]
+        return {"trades": trades, "best_bid": f"{price - 1:.2f}", "best_ask": f"{price + 1:.2f}"}
+
+    return app
+
+
+def generate_api_secret() -> str:
+    """Return a fresh EC private key in PEM form, usable as a Coinbase API secret for stubs."""
+    key = ec.generate_private_key(ec.SECP256R1())
+    return key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8,
+                             serialization.NoEncryption()).decode()
+
+
+def create_self_signed_cert(directory: str) -> Tuple[str, str]:
+    """
+    Write a self-signed certificate for 127.0.0.1 and its key into `directory`.
+    Point REQUESTS_CA_BUNDLE at the certificate so the Coinbase SDK trusts the stub.
+
+    Returns:
+        Tuple of (certificate path, key path)
+    """
+    key = ec.generate_private_key(ec.SECP256R1())
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "127.0.0.1")])
+    now = datetime.now(timezone.utc)
+    cert = (
+        x509.CertificateBuilder()
+        .subject_name(name)
+        .issuer_name(name)
+        .public_key(key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(now - timedelta(minutes=5))
+        .not_valid_after(now + timedelta(days=1))
+        .add_extension(x509.SubjectAlternativeName([x509.IPAddress(ipaddress.ip_address("127.0.0.1"))]), critical=False)
+        .add_extension(x509.BasicConstraints(ca=True, path_length=None), critical=True)
+        .sign(key, hashes.SHA256())
+    )
+    cert_path = os.path.join(directory, "stub-cert.pem")
+    key_path = os.path.join(directory, "stub-key.pem")
+    with open(cert_path, "wb") as f:
+        f.write(cert.public_bytes(serialization.Encoding.PEM))
+    with open(key_path, "wb") as f:
+        f.write(key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.TraditionalOpenSSL,
+                                  serialization.NoEncryption()))
+    return cert_path, key_path
+
+
+def create_openai_stub(latency: Optional[StubLatency] = None, tokens: Optional[List[str]] = None,
+                       token_delay: float = 0.0) -> FastAPI:
+    """
+    Build a stub of the OpenAI chat completions API.
+
+    Streaming requests (`"stream": true`) receive one chunk per token, `token_delay`
+    seconds apart, in the OpenAI Server-Sent Events format, followed by a usage
+    chunk when `stream_options.include_usage` is set. Counters for requests,
+    streams read to the end and streams abandoned by the client are kept in
+    `app.state.stats`.
+
+    Args:
+        latency: Simulated latency before the first byte of every response
+        tokens: Completion text split into tokens (default: a short fixed answer)
+        token_delay: Delay in seconds between streamed tokens
+
+    Returns:
+        FastAPI application serving `/v1/chat/completions`
+    """
+    latency = latency or StubLatency()
+    tokens = tokens or ["Hold ", "BTC", "; ", "trim ", "ETH", " on ", "strength", "."]
+    app = FastAPI()
+    app.state.stats = {"requests": 0, "completed": 0, "aborted": 0}
+
+    def usage(body: dict) -> dict:
+        prompt_tokens = sum(len(str(m.get("content", ""))) for m in body.get("messages", [])) // 4
+        return {"prompt_tokens": prompt_tokens, "completion_tokens": len(tokens),
+                "total_tokens": prompt_tokens + len(tokens)}
+
+    @app.post("/v1/chat/completions")
+    async def completions(request: Request):
+        body = await request.json()
+        app.state.stats["requests"] += 1
+        await latency.wait()
+        model = body.get("model", "stub")
+        if not body.get("stream"):
+            app.state.stats["completed"] += 1
+            return {
+                "id": "chatcmpl-stub", "object": "chat.completion", "created": int(time.time()), "model": model,
+                "choices": [{"index": 0, "finish_reason": "stop",
+                             "message": {"role": "assistant", "content": "".join(tokens)}}],
+                "usage": usage(body),
+            }
+
+        async def chunks():
+            finished = False
+            try:
+                for token in tokens:
+                    chunk = {"id": "chatcmpl-stub", "object": "chat.completion.chunk", "created": int(time.time()),
+                             "model": model, "choices": [{"index": 0, "delta": {"content": token}, "finish_reason": None}]}
+                    yield f"data: {json.dumps(chunk)}\n\n"
+                    if token_delay:
+                        await asyncio.sleep(token_delay)
+                if (body.get("stream_options") or {}).get("include_usage"):
+                    chunk = {"id": "chatcmpl-stub", "object": "chat.completion.chunk", "created": int(time.time()),
+                             "model": model, "choices": [], "usage": usage(body)}
+                    yield f"data: {json.dumps(chunk)}\n\n"
+                yield "data: [DONE]\n\n"
+                finished = True
+            finally:
+                app.state.stats["completed" if finished else "aborted"] += 1
+
+        return StreamingResponse(chunks(), media_type="text/event-stream")
+
+    return app
+
+
+class CoinbaseFeedStub:
+    """
+    Stand-in for the Coinbase market data WebSocket feed.
+
+    Accepts subscribe/unsubscribe messages for the ticker channel and sends a
+    ticker message for every subscribed product each `interval` seconds. Runs on
+    the caller's event loop.
+
+    Usage:
+        async with CoinbaseFeedStub(interval=0.01) as feed:
+            hub = PriceStreamHub(url=feed.url)
+    """
+
+    def __init__(self, interval: float = 0.1, price: float = 30000.0):
+        self.interval = interval
+        self.price = price
+        self.connections = 0
+        self.subscribe_messages = 0
+        self.url = ""
+        self._server = None
+        self._sequence = 0
+
+    async def _handle(self, websocket) -> None:
+        self.connections += 1
+        products: Set[str] = set()
+
+        async def ticks() -> None:
+            while True:
+                await asyncio.sleep(self.interval)
+                for product_id in list(products):
+                    self._sequence += 1
+                    price = self.price + random.uniform(-10, 10)
+                    await websocket.send(json.dumps({
+                        "type": "ticker",
+                        "sequence": self._sequence,
+                        "trade_id": self._sequence,
+                        "product_id": product_id,
+                        "price": f"{price:.2f}",
+                        "open_24h": f"{self.price:.2f}",
+                        "time": time.strftime("%Y-%m-%dT%H:%M:%S.000000Z", time.gmtime()),
+                    }))
+
+        sender = asyncio.create_task(ticks())
+        try:
+            async for raw in websocket:
+                message = json.loads(raw)
+                if message.get("type") == "subscribe":
+                    self.subscribe_messages += 1
+                    products.update(message.get("product_ids", []))
+                elif message.get("type") == "unsubscribe":
+                    products.difference_update(message.get("product_ids", []))
+        except Exception:
+            pass
+        finally:
+            sender.cancel()
+
+    async def start(self) -> "CoinbaseFeedStub":
+        """Start listening on a free localhost port."""
+        self._server = await serve(self._handle, "127.0.0.1", 0)
+        port = self._server.sockets[0].getsockname()[1]
+        self.url = f"ws://127.0.0.1:{port}"
+        return self
+
+    async def stop(self) -> None:
+        """Close the server and all client connections."""
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+
+    async def __aenter__(self) -> "CoinbaseFeedStub":
+        return await self.start()
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.stop()
+
+
+class RedisStub:
+    """
+    In-process stand-in for a Redis server, speaking RESP over TCP.
+
+    Supports the commands used by the shared cache backend (GET, SET with NX/PX/EX,
+    PTTL, DEL) plus PING, SELECT, AUTH and FLUSHDB. Runs on the caller's event loop.
+
+    Usage:
+        async with RedisStub() as redis:
+            backend = create_shared_backend(redis.url)
+    """
+
+    def __init__(self):
+        self.commands = 0
+        self.connections = 0
+        self.url = ""
+        self._data: Dict[bytes, Tuple[bytes, Optional[float]]] = {}
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._clients: Dict[asyncio.Task, asyncio.StreamWriter] = {}
+
+    def _live(self, key: bytes) -> Optional[Tuple[bytes, Optional[float]]]:
+        entry = self._data.get(key)
+        if entry is not None and entry[1] is not None and entry[1] <= time.monotonic():
+            del self._data[key]
+            return None
+        return entry
+
+    def _execute(self, command: List[bytes]) -> bytes:
+        name, args = command[0].upper(), command[1:]
+        if name == b"PING":
+            return b"+PONG\r\n"
+        if name in (b"SELECT", b"AUTH"):
+            return b"+OK\r\n"
+        if name == b"FLUSHDB":
+            self._data.clear()
+            return b"+OK\r\n"
+        if name == b"GET":
+            entry = self._live(args[0])
+            return b"$-1\r\n" if entry is None else b"$%d\r\n%s\r\n" % (len(entry[0]), entry[0])
+        if name == b"PTTL":
+            entry = self._live(args[0])
+            if entry is None:
+                return b":-2\r\n"
+            if entry[1] is None:
+                return b":-1\r\n"
+            return b":%d\r\n" % int((entry[1] - time.monotonic()) * 1000)
+        if name == b"DEL":
+            removed = sum(self._data.pop(key, None) is not None for key in args)
+            return b":%d\r\n" % removed
+        if name == b"SET":
+            key, value, options = args[0], args[1], [option.upper() for option in args[2:]]
+            expires_at = None
+            for unit, scale in ((b"PX", 1000), (b"EX", 1)):
+                if unit in options:
+                    expires_at = time.monotonic() + int(options[options.index(unit) + 1]) / scale
+            if b"NX" in options and self._live(key) is not None:
+                return b"$-1\r\n"
+            self._data[key] = (value, expires_at)
+            return b"+OK\r\n"
+        return b"-ERR unknown command '%s'\r\n" % name
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.connections += 1
+        self._clients[asyncio.current_task()] = writer
+        try:
+            while True:
+                header = await reader.readline()
+                if not header:
+                    break
+                command = []
+                for _ in range(int(header[1:])):
+                    length = int((await reader.readline())[1:])
+                    command.append((await reader.readexactly(length + 2))[:-2])
+                self.commands += 1
+                writer.write(self._execute(command))
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self._clients.pop(asyncio.current_task(), None)
+            writer.close()
+
+    async def start(self) -> "RedisStub":
+        """Start listening on a free localhost port."""
+        self._server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        port = self._server.sockets[0].getsockname()[1]
+        self.url = f"redis://127.0.0.1:{port}/0"
+        return self
+
+    async def stop(self) -> None:
+        """Close the server and all client connections."""
+        if self._server is not None:
+            self._server.close()
+            clients = list(self._clients)
+            for writer in self._clients.values():
+                writer.close()
+            await asyncio.gather(*clients, return_exceptions=True)
+            await self._server.wait_closed()
+
+    async def __aenter__(self) -> "RedisStub":
+        return await self.start()
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.stop()
+
+
+def _free_port() -> int:
+    """Ask the OS for an unused TCP port on localhost."""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class StubServer:
+    """
+    Run an ASGI app with Uvicorn on a background thread, over HTTPS when a
+    certificate and key are given.
+
+    Usage:
+        with StubServer(create_coinbase_exchange_stub()) as server:
+            print(server.url)
+    """
+
+    def __init__(self, app: FastAPI, port: Optional[int] = None, certfile: Optional[str] = None,
+                 keyfile: Optional[str] = None):
+        self.port = port or _free_port()
+        self.url = f"{'https' if certfile else 'http'}://127.0.0.1:{self.port}"
+        config = uvicorn.Config(app, host="127.0.0.1", port=self.port, log_level="warning",
+                                ssl_certfile=certfile, ssl_keyfile=keyfile)
+        self.server = uvicorn.Server(config)
+        self.thread = threading.Thread(target=self.server.run, daemon=True)
+
+    def start(self) -> "StubServer":
+        """Start the server and block until it accepts connections."""
+        self.thread.start()
+        deadline = time.monotonic() + 10
+        while not self.server.started:
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"Stub server on port {self.port} did not start")
+            time.sleep(0.01)
+        return self
+
+    def stop(self) -> None:
+        """Ask the server to exit and wait for its thread."""
+        self.server.should_exit = True
+        self.thread.join(timeout=10)
+
+    def __enter__(self) -> "StubServer":
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
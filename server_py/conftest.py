@@ -0,0 +1,26 @@
+import os
+import pytest
+from dotenv import load_dotenv
+
+
+@pytest.fixture
+def coinbase_env(monkeypatch, tmp_path):
+    """
+    Make the app importable offline.
+    Real credentials from .env are kept; placeholders are only set when none exist.
+    Portfolio history goes to the test's temporary directory, never into the repo.
+    The Coinbase service is a process-wide singleton, so its balance, price, candle
+    and valuation caches are cleared afterwards to keep tests independent of order.
+    """
+    load_dotenv()
+    for name in ("COINBASE_API_KEY", "COINBASE_API_SECRET"):
+        if not os.getenv(name):
+            monkeypatch.setenv(name, "test")
+    monkeypatch.setenv("PORTFOLIO_HISTORY_PATH", str(tmp_path / "portfolio_history.bin"))
+    yield
+    from app.services.coinbase_service import CoinbaseService
+
+    service = CoinbaseService._instance
+    if service is not None and hasattr(service, "initialized"):
+        for cache in (service.portfolio_cache, service.price_cache, service.candle_cache, service.valuation_cache):
+            cache.clear()
@@ -0,0 +1,112 @@
+import httpx
+import pytest
+from app.services.cache import TTLCache
+from app.services.coinbase_service import CoinbaseAccount, credential_sets
+from app.services.market_store import MarketDataStore
+from app.services.valuation import combine_portfolios
+
+
+def test_credential_sets_from_environment(monkeypatch):
+    monkeypatch.setenv("COINBASE_API_KEY", "key")
+    monkeypatch.setenv("COINBASE_API_SECRET", "secret")
+    monkeypatch.setenv("COINBASE_ACCOUNTS", "Fund, family-office")
+    monkeypatch.setenv("COINBASE_API_KEY_FUND", "fund-key")
+    monkeypatch.setenv("COINBASE_API_SECRET_FUND", "fund-secret")
+    monkeypatch.setenv("COINBASE_API_KEY_FAMILY_OFFICE", "family-key")
+    monkeypatch.setenv("COINBASE_API_SECRET_FAMILY_OFFICE", "family-secret")
+    assert credential_sets() == {"default": ("key", "secret"), "fund": ("fund-key", "fund-secret"),
+                                 "family-office": ("family-key", "family-secret")}
+
+    # Named accounts alone are enough; the first one becomes the default
+    monkeypatch.delenv("COINBASE_API_KEY")
+    assert list(credential_sets()) == ["fund", "family-office"]
+
+    monkeypatch.setenv("COINBASE_ACCOUNTS", "fund,trading")
+    with pytest.raises(ValueError, match="COINBASE_API_KEY_TRADING"):
+        credential_sets()
+
+
+def test_combine_portfolios_sums_balances_per_currency():
+    combined = combine_portfolios([
+        [{"currency": "BTC", "balance": "0.1", "available": "0.1"},
+         {"currency": "GBP", "balance": "100", "available": "50"}],
+        [{"currency": "BTC", "balance": "0.25", "available": "0.2"},
+         {"currency": "ETH", "balance": "oops", "available": "0"}],
+    ])
+    assert combined == [
+        {"currency": "BTC", "balance": "0.35", "available": "0.3"},
+        {"currency": "GBP", "balance": "100", "available": "50"},
+        {"currency": "ETH", "balance": "oops", "available": "0"},
+    ]
+
+
+class FakeRESTClient:
+    def __init__(self, *balances):
+        self.balances = balances
+        self.calls = 0
+
+    async def get_accounts(self, **kwargs):
+        self.calls += 1
+        return {"accounts": [
+            {"name": f"{currency} Wallet", "currency": currency, "type": "ACCOUNT_TYPE_CRYPTO", "ready": True,
+             "available_balance": {"value": value, "currency": currency}, "hold": {"value": "0"}}
+            for currency, value in self.balances
+        ]}
+
+
+@pytest.mark.asyncio
+async def test_accounts_share_market_data_in_the_consolidated_view(coinbase_env, monkeypatch):
+    from app.main import app
+    from app.dependencies import get_coinbase_service
+
+    service = get_coinbase_service()
+    fetched = []
+
+    async def portfolio():
+        return [{"currency": "BTC", "balance": "1", "available": "1"},
+                {"currency": "GBP", "balance": "500", "available": "500"}]
+
+    async def fetch_price(product_id):
+        fetched.append(product_id)
+        prices = {"BTC-GBP": ("30000", "25000"), "ETH-GBP": ("1500", "1500")}
+        return {"price": prices[product_id][0], "price_24h_ago": prices[product_id][1]}
+
+    fund_client = FakeRESTClient(("BTC", "0.5"), ("ETH", "2"))
+    fund = CoinbaseAccount(service, "fund", fund_client)
+    monkeypatch.setattr(service, "accounts", {service.account_name: service, "fund": fund})
+    monkeypatch.setattr(service, "get_portfolio", portfolio)
+    monkeypatch.setattr(service, "_fetch_price", fetch_price)
+    monkeypatch.setattr(service, "price_cache", TTLCache())
+    monkeypatch.setattr(service, "price_ttl", 60.0)
+    monkeypatch.setattr(service, "market_quote", "GBP")
+    monkeypatch.setattr(service, "valuation_cache", TTLCache(max_entries=8))
+    monkeypatch.setattr(service, "_valued_products", {})
+    monkeypatch.setattr(service, "market_store", MarketDataStore())
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        accounts = (await client.get("/api/crypto/accounts")).json()
+        consolidated = (await client.get("/api/crypto/portfolio/consolidated")).json()
+        consolidated_fetches = sorted(fetched)
+        fund_portfolio = (await client.get("/api/crypto/accounts/FUND/portfolio")).json()
+        fund_valuation = (await client.get("/api/crypto/accounts/fund/portfolio/valuation")).json()
+        unknown = await client.get("/api/crypto/accounts/other/portfolio")
+
+    assert accounts == {"default": service.account_name, "accounts": [service.account_name, "fund"]}
+    # Both accounts hold BTC, but each market is fetched once
+    assert consolidated_fetches == ["BTC-GBP", "ETH-GBP"]
+    assert consolidated["total_value"] == "48500"
+    btc = next(asset for asset in consolidated["assets"] if asset["currency"] == "BTC")
+    assert btc["balance"] == "1.5" and btc["value"] == "45000"
+    assert consolidated["accounts"][service.account_name]["total_value"] == "30500"
+    assert consolidated["accounts"]["fund"]["total_value"] == "18000"
+
+    # Balances come from the account's own client and cache
+    assert fund_portfolio == [{"currency": "BTC", "balance": "0.5", "available": "0.5"},
+                              {"currency": "ETH", "balance": "2", "available": "2"}]
+    assert fund_client.calls == 1
+    assert fund_valuation["total_value"] == "18000" and "accounts" not in fund_valuation
+    assert fetched == consolidated_fetches
+    assert unknown.status_code == 404
+    # Only the shared pieces passed in explicitly are reachable from an account
+    assert not hasattr(fund, "candle_cache") and not hasattr(fund, "portfolio_history")
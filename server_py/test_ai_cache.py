@@ -0,0 +1,76 @@
+import asyncio
+from types import SimpleNamespace
+import pytest
+from app.services.ai_service import AIService
+from app.services.cache import TTLCache
+
+
+class FakeCompletions:
+    """Stand-in for client.chat.completions that counts calls."""
+
+    def __init__(self, fail=False):
+        self.calls = 0
+        self.fail = fail
+
+    async def create(self, **kwargs):
+        self.calls += 1
+        await asyncio.sleep(0.02)
+        if self.fail:
+            raise RuntimeError("rate limited")
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=f"advice {self.calls}"))])
+
+
+@pytest.fixture
+def ai(monkeypatch):
+    service = AIService()
+    completions = FakeCompletions()
+    monkeypatch.setattr(service, "client", SimpleNamespace(chat=SimpleNamespace(completions=completions)))
+    monkeypatch.setattr(service, "enable_ai_recommendations", True)
+    monkeypatch.setattr(service, "recommendation_cache", TTLCache())
+    monkeypatch.setattr(service, "recommendation_cache_ttl", 60.0)
+    monkeypatch.setattr(service, "price_tolerance", 0.01)
+    return service, completions
+
+
+def market(price):
+    return [{"currency": "BTC", "data": [{"close": str(price)}, {"close": "1"}]}]
+
+
+PORTFOLIO = [{"currency": "BTC", "balance": "0.5", "available": "0.5"}]
+
+
+@pytest.mark.asyncio
+async def test_concurrent_requests_share_one_llm_call(ai):
+    service, completions = ai
+    results = await asyncio.gather(*(service.get_recommendations(PORTFOLIO, market(30000)) for _ in range(10)))
+
+    assert results == ["advice 1"] * 10
+    assert completions.calls == 1
+    assert service.cache_stats()["saved_calls"] == 9
+
+
+@pytest.mark.asyncio
+async def test_small_price_moves_hit_and_large_moves_miss(ai):
+    service, completions = ai
+    await service.get_recommendations(PORTFOLIO, market(30000))
+    assert await service.get_recommendations(PORTFOLIO, market(30010)) == "advice 1"
+    assert await service.get_recommendations(PORTFOLIO, market(33000)) == "advice 2"
+    changed_portfolio = [{"currency": "BTC", "balance": "0.6", "available": "0.6"}]
+    assert await service.get_recommendations(changed_portfolio, market(30000)) == "advice 3"
+
+    stats = service.cache_stats()
+    assert completions.calls == 3
+    assert stats["hits"] == 1
+    assert stats["hit_ratio"] == 0.25
+
+
+@pytest.mark.asyncio
+async def test_failures_are_not_cached(ai):
+    service, completions = ai
+    completions.fail = True
+    first = await service.get_recommendations(PORTFOLIO, market(30000))
+    completions.fail = False
+    second = await service.get_recommendations(PORTFOLIO, market(30000))
+
+    assert first.startswith("Unable to generate")
+    assert second == "advice 2"
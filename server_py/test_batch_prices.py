@@ -0,0 +1,50 @@
+import asyncio
+import httpx
+import pytest
+
+
+@pytest.mark.asyncio
+async def test_batch_prices_dedupes_and_caps_concurrency(coinbase_env, monkeypatch):
+    from app.main import app
+    from app.dependencies import get_coinbase_service
+
+    in_flight = 0
+    peak = 0
+    calls = []
+
+    async def fake_price(product_id):
+        nonlocal in_flight, peak
+        calls.append(product_id)
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.02)
+        in_flight -= 1
+        if product_id == "BAD-GBP":
+            raise RuntimeError("boom")
+        return {"price": "1.0"}
+
+    monkeypatch.setenv("PRICE_BATCH_CONCURRENCY", "2")
+    monkeypatch.setattr(get_coinbase_service(), "get_crypto_price", fake_price)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        response = await client.get("/api/crypto/prices", params={"ids": "BTC-GBP,ETH-GBP,BTC-GBP,SOL-GBP,BAD-GBP"})
+
+    assert response.status_code == 200
+    body = response.json()
+    assert list(body) == ["BTC-GBP", "ETH-GBP", "SOL-GBP", "BAD-GBP"]
+    assert body["BTC-GBP"] == {"price": "1.0"}
+    assert "error" in body["BAD-GBP"]
+    assert sorted(calls) == ["BAD-GBP", "BTC-GBP", "ETH-GBP", "SOL-GBP"]
+    assert peak == 2
+
+
+@pytest.mark.asyncio
+async def test_batch_prices_requires_ids(coinbase_env):
+    from app.main import app
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        response = await client.get("/api/crypto/prices", params={"ids": " , "})
+
+    assert response.status_code == 400
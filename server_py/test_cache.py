@@ -0,0 +1,87 @@
+import asyncio
+import httpx
+import pytest
+from app.services.cache import TTLCache, MISSING
+from app.services.http_client import init_http_client, close_http_client
+
+
+@pytest.mark.asyncio
+async def test_concurrent_misses_share_one_load():
+    cache = TTLCache()
+    calls = 0
+
+    async def loader():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        return "candles"
+
+    results = await asyncio.gather(*(cache.get_or_load("BTC-GBP", loader, ttl=60) for _ in range(50)))
+
+    assert results == ["candles"] * 50
+    assert calls == 1
+    assert cache.stats.misses == 50
+    assert cache.stats.coalesced == 49
+    assert await cache.get_or_load("BTC-GBP", loader, ttl=60) == "candles"
+    assert cache.stats.hits == 1
+
+
+@pytest.mark.asyncio
+async def test_failed_load_is_not_cached():
+    cache = TTLCache()
+
+    async def failing():
+        raise RuntimeError("upstream down")
+
+    with pytest.raises(RuntimeError):
+        await cache.get_or_load("key", failing, ttl=60)
+    assert cache.get("key") is MISSING
+    assert cache.stats.errors == 1
+
+
+def test_expired_entries_are_dropped():
+    cache = TTLCache()
+    cache.set("key", "value", ttl=-1)
+    assert cache.get("key") is MISSING
+
+
+def test_lru_eviction_by_entries_and_bytes():
+    cache = TTLCache(max_entries=2)
+    cache.set("a", 1, ttl=60)
+    cache.set("b", 2, ttl=60)
+    cache.get("a")
+    cache.set("c", 3, ttl=60)
+    assert cache.get("b") is MISSING
+    assert cache.get("a") == 1
+    assert cache.stats.evictions == 1
+
+    bounded = TTLCache(max_entries=10, max_bytes=100, sizeof=lambda value: 40)
+    for key in "abc":
+        bounded.set(key, key, ttl=60)
+    assert len(bounded) == 2
+    assert bounded.size_bytes == 80
+
+
+@pytest.mark.asyncio
+async def test_historical_data_fetched_once_for_concurrent_requests(coinbase_env):
+    from app.services.coinbase_service import CoinbaseService
+
+    upstream_calls = 0
+
+    async def handler(request):
+        nonlocal upstream_calls
+        upstream_calls += 1
+        await asyncio.sleep(0.05)
+        return httpx.Response(200, json=[[1700000000, 1.0, 2.0, 1.5, 1.8, 10.0]])
+
+    service = CoinbaseService()
+    service.candle_cache.clear()
+    init_http_client(transport=httpx.MockTransport(handler))
+    try:
+        results = await asyncio.gather(*(service.get_historical_data("BTC-GBP") for _ in range(50)))
+    finally:
+        await close_http_client()
+        service.candle_cache.clear()
+
+    assert upstream_calls == 1
+    assert all(result == results[0] for result in results)
@@ -0,0 +1,80 @@
+import time
+from datetime import datetime
+import httpx
+import pytest
+from app.services.candle_store import CandleStore
+from app.services.candles import CandleSeries
+from app.services.http_client import init_http_client, close_http_client
+from app.services.market_store import MarketDataStore
+
+
+def upstream(requests):
+    """Candle endpoint stand-in returning one candle per bucket in the requested range."""
+    async def handler(request):
+        start = int(datetime.fromisoformat(request.url.params["start"]).timestamp())
+        end = int(datetime.fromisoformat(request.url.params["end"]).timestamp())
+        granularity = int(request.url.params["granularity"])
+        requests.append((start, end))
+        first = -(-start // granularity) * granularity
+        rows = [[t, 1.0, 2.0, 1.5, float(t), 3.0] for t in range(first, end + 1, granularity)]
+        return httpx.Response(200, json=rows[::-1])
+    return handler
+
+
+@pytest.mark.asyncio
+async def test_only_missing_candles_are_fetched_and_survive_restart(coinbase_env, monkeypatch, tmp_path):
+    from app.services.coinbase_service import CoinbaseService
+
+    path = str(tmp_path / "candles.db")
+    requests = []
+    service = CoinbaseService()
+    store = await CandleStore(path).open()
+    monkeypatch.setattr(service, "candle_store", store)
+    init_http_client(transport=httpx.MockTransport(upstream(requests)))
+    try:
+        first = await service._load_last_day("BTC-GBP", 3600)
+        second = await service._load_last_day("BTC-GBP", 3600)
+    finally:
+        await close_http_client()
+        await store.close()
+
+    assert len(first) >= 24
+    assert second.close.tolist() == first.close.tolist()
+    assert len(requests) == 2
+    # The second load only asks for candles after the last closed one on disk
+    current_bucket = int(time.time()) // 3600 * 3600
+    assert requests[1][0] >= current_bucket - 3600
+
+    # A new process reads the same history and warm-loads it with its real age
+    reopened = await CandleStore(path).open()
+    market_store = MarketDataStore()
+    monkeypatch.setattr(service, "candle_store", reopened)
+    monkeypatch.setattr(service, "market_store", market_store)
+    try:
+        assert await service.warm_start() == 1
+    finally:
+        await reopened.close()
+    candles, age = market_store.get_candles("BTC-GBP")
+    assert candles.close.tolist() == second.since(time.time() - 86400).close.tolist()
+    assert age < 5
+
+
+@pytest.mark.asyncio
+async def test_compaction_applies_retention(tmp_path):
+    store = await CandleStore(str(tmp_path / "candles.db")).open()
+    now = int(time.time()) // 3600 * 3600
+    old = [now - (400 + i) * 86400 for i in range(100)]
+    recent = [now - i * 3600 for i in range(1, 11)]
+    rows = [[t, 1, 1, 1, 1, 1] for t in old + recent]
+    try:
+        await store.save("BTC-GBP", 3600, CandleSeries.from_coinbase(rows), covered=(min(old), max(recent)))
+        deleted = await store.compact(retention=365 * 86400)
+        remaining = await store.load("BTC-GBP", 3600, 0, now)
+        coverage = await store.coverage("BTC-GBP", 3600)
+    finally:
+        await store.close()
+
+    assert deleted == 100
+    assert remaining.time.tolist() == sorted(recent)
+    assert coverage[0] >= now - 365 * 86400 - 3600
+    assert coverage[1] == max(recent)
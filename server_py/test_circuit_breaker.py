@@ -0,0 +1,171 @@
+import asyncio
+import time
+import httpx
+import pytest
+from app.services import circuit_breaker, upstream_scheduler
+from app.services.cache import TTLCache
+from app.services.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError
+from app.services.http_client import close_http_client, init_http_client
+from app.services.upstream_scheduler import PRIVATE, PUBLIC, UpstreamScheduler
+
+
+def _status_error(status):
+    request = httpx.Request("GET", "https://api.exchange.coinbase.com/products")
+    return httpx.HTTPStatusError("failed", request=request, response=httpx.Response(status, request=request))
+
+
+async def _fail(error):
+    raise error
+
+
+@pytest.mark.asyncio
+async def test_circuit_opens_fails_fast_and_recovers_through_a_probe():
+    breaker = CircuitBreaker("coinbase_candles", failure_threshold=2, reset_timeout=0.05)
+
+    # Client errors mean the upstream is up and do not count
+    for _ in range(3):
+        with pytest.raises(httpx.HTTPStatusError):
+            await breaker.call(lambda: _fail(_status_error(404)))
+    assert breaker.state == CLOSED
+
+    for _ in range(2):
+        with pytest.raises(httpx.HTTPStatusError):
+            await breaker.call(lambda: _fail(_status_error(503)))
+    assert breaker.state == OPEN
+
+    calls = 0
+
+    async def request():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.02)
+        return "ok"
+
+    with pytest.raises(CircuitOpenError) as raised:
+        await breaker.call(request)
+    assert calls == 0 and 0 < raised.value.retry_after <= 0.05
+
+    await asyncio.sleep(0.06)
+    assert breaker.state == HALF_OPEN
+    # One probe goes through; concurrent calls are still rejected
+    probe, rejected = await asyncio.gather(breaker.call(request), breaker.call(request), return_exceptions=True)
+    assert probe == "ok" and isinstance(rejected, CircuitOpenError)
+    assert breaker.state == CLOSED and calls == 1
+
+
+@pytest.mark.asyncio
+async def test_failed_probe_reopens_the_circuit():
+    breaker = CircuitBreaker("coinbase_accounts", failure_threshold=1, reset_timeout=0.05)
+    with pytest.raises(asyncio.TimeoutError):
+        await breaker.call(lambda: _fail(asyncio.TimeoutError()))
+    await asyncio.sleep(0.06)
+
+    with pytest.raises(httpx.ConnectError):
+        await breaker.call(lambda: _fail(httpx.ConnectError("refused")))
+    assert breaker.state == OPEN
+    assert breaker.stats()["opened"] == 2
+
+
+@pytest.mark.asyncio
+async def test_stale_value_served_while_refresh_is_slow_or_failing():
+    cache = TTLCache(stale_ttl=60, revalidate_timeout=0.05)
+    cache.set("BTC-GBP", "old", ttl=0.01)
+    await asyncio.sleep(0.02)
+
+    async def slow():
+        await asyncio.sleep(0.2)
+        return "new"
+
+    started = time.perf_counter()
+    value, age = await cache.get_or_revalidate("BTC-GBP", slow, ttl=60)
+    assert (value, time.perf_counter() - started < 0.15) == ("old", True)
+    assert age >= 0.02
+    # A caller arriving during the refresh does not wait for it
+    assert (await cache.get_or_revalidate("BTC-GBP", slow, ttl=60))[0] == "old"
+
+    await asyncio.sleep(0.25)
+    assert await cache.get_or_revalidate("BTC-GBP", slow, ttl=60) == ("new", None)
+    assert cache.stats.loads == 1 and cache.stats.stale == 2
+
+    async def failing():
+        raise RuntimeError("upstream down")
+
+    cache.set("ETH-GBP", "old", ttl=0.01)
+    await asyncio.sleep(0.02)
+    assert (await cache.get_or_revalidate("ETH-GBP", failing, ttl=60))[0] == "old"
+    with pytest.raises(RuntimeError):
+        await cache.get_or_revalidate("SOL-GBP", failing, ttl=60)
+
+
+@pytest.mark.asyncio
+async def test_price_served_stale_while_circuit_is_open(coinbase_env, monkeypatch):
+    from app.main import app
+    from app.dependencies import get_coinbase_service
+
+    monkeypatch.setenv("CIRCUIT_FAILURE_THRESHOLD", "2")
+    monkeypatch.setenv("CIRCUIT_RESET_TIMEOUT", "60")
+    monkeypatch.setattr(circuit_breaker, "_breakers", {})
+    monkeypatch.setattr(upstream_scheduler, "_scheduler",
+                        UpstreamScheduler({PUBLIC: (0, 1), PRIVATE: (0, 1)}, max_retries=0))
+    service = get_coinbase_service()
+    service.price_cache.clear()
+    service.candle_cache.clear()
+    monkeypatch.setattr(service, "price_ttl", 0.05)
+
+    trade_calls = 0
+    upstream_down = False
+
+    async def get_market_trades(**kwargs):
+        nonlocal trade_calls
+        trade_calls += 1
+        if upstream_down:
+            raise httpx.ConnectError("connection refused")
+        return {"trades": [{"trade_id": "1", "product_id": "SWR-GBP", "price": "110", "time": "t1"}]}
+
+    monkeypatch.setattr(service.rest_client, "get_market_trades", get_market_trades)
+    init_http_client(transport=httpx.MockTransport(
+        lambda request: httpx.Response(200, json=[[1700000000, 90.0, 110.0, 100.0, 105.0, 10.0]])))
+    try:
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            fresh = (await client.get("/api/crypto/price/SWR-GBP")).json()
+            assert fresh["price"] == "110.0" and "stale" not in fresh
+
+            upstream_down = True
+            for _ in range(2):
+                await asyncio.sleep(0.06)
+                stale = (await client.get("/api/crypto/price/SWR-GBP")).json()
+                assert stale["price"] == "110.0" and stale["stale"] is True and stale["age_seconds"] > 0
+            stats = (await client.get("/api/crypto/upstream/stats")).json()
+            assert stats["circuits"]["coinbase_market_trades"]["state"] == OPEN
+
+            # With the circuit open the last known price is served without calling Coinbase
+            calls_before = trade_calls
+            started = time.perf_counter()
+            stale = (await client.get("/api/crypto/price/SWR-GBP")).json()
+            assert time.perf_counter() - started < 0.1
+            assert stale["stale"] is True and trade_calls == calls_before
+
+            cold = (await client.get("/api/crypto/price/COLD-GBP")).json()
+            assert "unavailable" in cold["error"]
+    finally:
+        await close_http_client()
+        service.price_cache.clear()
+        service.candle_cache.clear()
+
+
+@pytest.mark.asyncio
+async def test_open_candles_circuit_logs_without_a_traceback(coinbase_env, monkeypatch, caplog):
+    from app.dependencies import get_coinbase_service
+
+    monkeypatch.setenv("CIRCUIT_FAILURE_THRESHOLD", "1")
+    monkeypatch.setenv("CIRCUIT_RESET_TIMEOUT", "60")
+    monkeypatch.setattr(circuit_breaker, "_breakers", {})
+    with pytest.raises(httpx.ConnectError):
+        await circuit_breaker.get_circuit_breaker("coinbase_candles").call(
+            lambda: _fail(httpx.ConnectError("connection refused")))
+
+    caplog.clear()
+    with caplog.at_level("WARNING"), pytest.raises(CircuitOpenError):
+        await get_coinbase_service()._fetch_candles("BTC-GBP", 3600)
+    assert [record.levelname for record in caplog.records] == ["WARNING"]
+    assert caplog.records[0].exc_info is None
@@ -0,0 +1,55 @@
+import pytest
+from coinbase.rest.types.accounts_types import ListAccountsResponse
+from coinbase.rest.types.product_types import GetMarketTradesResponse
+from app.services.coinbase_models import parse_accounts, parse_trades
+
+
+def account(currency, value, type="ACCOUNT_TYPE_CRYPTO", ready=True):
+    return {"name": f"{currency} Wallet", "currency": currency, "type": type, "ready": ready,
+            "available_balance": {"value": value, "currency": currency}, "hold": {"value": "0"}}
+
+
+ACCOUNTS = {"accounts": [
+    account("BTC", "0.5"),
+    account("ETH", "0"),
+    account("SOL", "3", ready=False),
+    account("GBP", "100", type="ACCOUNT_TYPE_FIAT"),
+    {"name": "No balance", "type": "ACCOUNT_TYPE_CRYPTO"},
+]}
+
+
+def test_parse_accounts_from_sdk_objects_and_dicts():
+    for response in (ListAccountsResponse({"accounts": [dict(a) for a in ACCOUNTS["accounts"]]}), ACCOUNTS):
+        balances = parse_accounts(response)
+        assert [b.currency for b in balances] == ["BTC", "ETH", "SOL", "GBP"]
+        assert [b.currency for b in balances if b.is_held()] == ["BTC", "GBP"]
+
+
+def test_parse_trades_reads_only_requested_trades():
+    response = GetMarketTradesResponse({"trades": [
+        {"trade_id": "2", "product_id": "BTC-GBP", "price": "30001", "size": "0.1", "time": "t2", "side": "BUY"},
+        {"trade_id": "1", "product_id": "BTC-GBP", "price": "30000", "size": "0.2", "time": "t1", "side": "SELL"},
+    ], "best_bid": "29999", "best_ask": "30002"})
+
+    trades = parse_trades(response, limit=1)
+    assert len(trades) == 1
+    assert trades[0].as_dict() == {"trade_id": "2", "product_id": "BTC-GBP", "price": "30001",
+                                   "size": "0.1", "time": "t2", "side": "BUY"}
+    assert parse_trades({"trades": None}) == []
+
+
+@pytest.mark.asyncio
+async def test_portfolio_uses_models(coinbase_env, monkeypatch):
+    from app.services.coinbase_service import CoinbaseService
+
+    service = CoinbaseService()
+    service.portfolio_cache.clear()
+
+    async def get_accounts(**kwargs):
+        return ListAccountsResponse({"accounts": [dict(a) for a in ACCOUNTS["accounts"]]})
+
+    monkeypatch.setattr(service.rest_client, "get_accounts", get_accounts)
+    assert await service.get_portfolio() == [
+        {"currency": "BTC", "balance": "0.5", "available": "0.5"},
+        {"currency": "GBP", "balance": "100", "available": "100"},
+    ]
@@ -0,0 +1,76 @@
+import asyncio
+import time
+import httpx
+import pytest
+from app.services.concurrency import DeadlineExceeded, gather_bounded
+
+
+async def delayed(value):
+    await asyncio.sleep(max(value, 0))
+    if value < 0:
+        raise ValueError("negative")
+    return value
+
+
+@pytest.mark.asyncio
+async def test_results_keep_input_order_with_exceptions():
+    results = await gather_bounded([0.02, -1, 0.01], delayed, limit=2)
+    assert results[0] == 0.02
+    assert isinstance(results[1], ValueError)
+    assert results[2] == 0.01
+
+
+@pytest.mark.asyncio
+async def test_item_timeout_and_deadline():
+    start = time.perf_counter()
+    results = await gather_bounded([0.01, 0.5, 0.01, 0.01], delayed, limit=1,
+                                   item_timeout=0.05, deadline=0.3)
+    elapsed = time.perf_counter() - start
+
+    assert results[0] == 0.01
+    assert isinstance(results[1], asyncio.TimeoutError)
+    assert not isinstance(results[1], DeadlineExceeded)
+    assert results[2:] == [0.01, 0.01]
+    assert elapsed < 0.3
+
+    results = await gather_bounded([0.01, 1.0, 1.0], delayed, limit=3, deadline=0.1)
+    assert results[0] == 0.01
+    assert all(isinstance(result, DeadlineExceeded) for result in results[1:])
+
+
+@pytest.mark.asyncio
+async def test_analysis_returns_partial_results_with_errors(coinbase_env, monkeypatch):
+    from app.main import app
+    from app.dependencies import get_ai_service, get_coinbase_service
+
+    async def fake_portfolio():
+        return [{"currency": currency, "balance": "1", "available": "1"} for currency in ("BTC", "ETH", "DOGE")]
+
+    async def fake_price(product_id):
+        if product_id == "DOGE-GBP":
+            await asyncio.sleep(1)
+        return {"price": "1.0"}
+
+    async def fake_historical(product_id):
+        if product_id == "ETH-GBP":
+            raise RuntimeError("upstream error")
+        return []
+
+    async def fake_ai(portfolio, market_data):
+        return ",".join(item["currency"] for item in market_data)
+
+    monkeypatch.setenv("RECOMMENDATIONS_ASSET_TIMEOUT", "0.1")
+    monkeypatch.setattr(get_coinbase_service(), "get_portfolio", fake_portfolio)
+    monkeypatch.setattr(get_coinbase_service(), "get_crypto_price", fake_price)
+    monkeypatch.setattr(get_coinbase_service(), "get_historical_data", fake_historical)
+    monkeypatch.setattr(get_ai_service(), "get_recommendations", fake_ai)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        response = await client.get("/api/recommendations/analysis")
+
+    body = response.json()
+    assert response.status_code == 200
+    assert body["recommendations"] == "BTC"
+    assert set(body["errors"]) == {"ETH", "DOGE"}
+    assert "Timed out" in body["errors"]["DOGE"]
@@ -0,0 +1,64 @@
+import json
+import os
+import subprocess
+import sys
+import httpx
+import pytest
+from benchmarks.fakes import FakeAIService, FakeCoinbaseService
+
+
+def test_app_imports_without_credentials_or_sdks():
+    env = {name: value for name, value in os.environ.items()
+           if not name.startswith(("COINBASE_API_", "OPENAI_API_"))}
+    code = ("import json, sys; import app.main; "
+            "print(json.dumps([m for m in ('openai', 'coinbase.rest', 'requests') if m in sys.modules]))")
+    result = subprocess.run([sys.executable, "-c", code], cwd=os.path.dirname(os.path.abspath(__file__)),
+                            env=env, capture_output=True, text=True)
+
+    assert result.returncode == 0, result.stderr
+    assert json.loads(result.stdout.strip().splitlines()[-1]) == []
+
+
+@pytest.fixture
+def fake_services():
+    from app.dependencies import get_ai_service, get_coinbase_service
+    from app.main import app
+
+    coinbase, ai = FakeCoinbaseService(accounts=3), FakeAIService()
+    app.dependency_overrides[get_coinbase_service] = lambda: coinbase
+    app.dependency_overrides[get_ai_service] = lambda: ai
+    yield coinbase, ai
+    app.dependency_overrides.clear()
+
+
+@pytest.mark.asyncio
+async def test_routes_use_injected_services(fake_services):
+    from app.main import app
+
+    coinbase, ai = fake_services
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        portfolio = await client.get("/api/crypto/portfolio")
+        valuation = await client.get("/api/crypto/portfolio/valuation")
+        recommendations = await client.get("/api/recommendations/")
+
+    assert [h["currency"] for h in portfolio.json()] == ["BTC", "ETH", "SOL"]
+    assert len(valuation.json()["assets"]) == 3
+    assert recommendations.json()["recommendations"] == FakeAIService.TEXT
+    assert ai.calls == 1 and coinbase.calls > 0
+
+
+@pytest.mark.asyncio
+async def test_missing_credentials_return_503(monkeypatch):
+    from app.main import app
+    from app.services.coinbase_service import CoinbaseService
+
+    monkeypatch.setattr(CoinbaseService, "_instance", None)
+    monkeypatch.delenv("COINBASE_API_KEY", raising=False)
+    monkeypatch.delenv("COINBASE_API_SECRET", raising=False)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        response = await client.get("/api/crypto/price/BTC-GBP")
+
+    assert response.status_code == 503
@@ -0,0 +1,104 @@
+import asyncio
+from datetime import datetime
+import httpx
+import pytest
+from app.services.http_client import init_http_client, close_http_client
+
+
+@pytest.mark.asyncio
+async def test_range_is_paginated_concurrently_and_merged(coinbase_env, monkeypatch):
+    from app.main import app
+    from app.dependencies import get_coinbase_service
+
+    granularity = 900
+    in_flight = 0
+    peak = 0
+    pages = []
+
+    async def handler(request):
+        nonlocal in_flight, peak
+        start = int(datetime.fromisoformat(request.url.params["start"]).timestamp())
+        end = int(datetime.fromisoformat(request.url.params["end"]).timestamp())
+        pages.append((start, end))
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.02)
+        in_flight -= 1
+        rows = [[t, 1.0, 2.0, 1.5, float(t), 3.0] for t in range(start, end + 1, granularity)]
+        # Coinbase returns newest first and never more than 300 candles
+        assert len(rows) <= 300
+        return httpx.Response(200, json=rows[::-1])
+
+    monkeypatch.setenv("HISTORICAL_PAGE_CONCURRENCY", "3")
+    get_coinbase_service().candle_cache.clear()
+    init_http_client(transport=httpx.MockTransport(handler))
+    start = 1_700_000_000 // granularity * granularity
+    end = start + 90 * 86400
+    try:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            response = await client.get("/api/crypto/historical/BTC-GBP",
+                                        params={"start": start, "end": end, "granularity": granularity})
+            fetched = len(pages)
+            repeat = await client.get("/api/crypto/historical/BTC-GBP",
+                                      params={"start": start, "end": end, "granularity": granularity})
+    finally:
+        await close_http_client()
+
+    assert response.status_code == 200
+    candles = response.json()
+    assert len(candles) == 90 * 96 + 1
+    closes = [float(candle["close"]) for candle in candles]
+    assert closes == sorted(closes, reverse=True)
+    assert closes[0] == end and closes[-1] == start
+    assert 30 <= fetched <= 31
+    assert peak == 3
+    # Closed pages are served from the cache on repeat requests
+    assert repeat.json() == candles
+    assert len(pages) == fetched
+
+
+@pytest.mark.asyncio
+async def test_range_validation(coinbase_env):
+    from app.main import app
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        bad_granularity = await client.get("/api/crypto/historical/BTC-GBP", params={"granularity": 120})
+        reversed_range = await client.get("/api/crypto/historical/BTC-GBP",
+                                          params={"start": 1_700_000_000, "end": 1_600_000_000})
+        too_large = await client.get("/api/crypto/historical/BTC-GBP",
+                                     params={"start": 0, "end": 1_700_000_000, "granularity": 60})
+
+    assert bad_granularity.status_code == 400
+    assert reversed_range.status_code == 400
+    assert too_large.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_stream_stops_and_closes_source_when_client_disconnects():
+    from app.routers.crypto import _stream_until_disconnected
+
+    class FakeRequest:
+        def __init__(self, connected_checks):
+            self.checks = connected_checks
+
+        async def is_disconnected(self):
+            self.checks -= 1
+            return self.checks < 0
+
+    produced = []
+    closed = []
+
+    def chunks():
+        try:
+            for i in range(100):
+                produced.append(i)
+                yield str(i)
+        finally:
+            closed.append(True)
+
+    received = [chunk async for chunk in _stream_until_disconnected(FakeRequest(3), chunks())]
+    assert received == ["0", "1", "2"]
+    # Nothing is produced past the chunk in hand, and the source is closed straight away
+    assert produced == [0, 1, 2, 3] and closed == [True]
@@ -0,0 +1,97 @@
+import httpx
+import pytest
+import numpy as np
+from app.services.candles import CandleSeries
+from app.services import indicators
+
+
+def reference_ewm(values, alpha):
+    out = [values[0]]
+    for value in values[1:]:
+        out.append(alpha * value + (1 - alpha) * out[-1])
+    return np.array(out)
+
+
+def test_candle_series_roundtrip_matches_legacy_shape():
+    rows = [[7200, 1.0, 4.0, 2.0, 3.0, 10.0], [3600, 0.5, 2.5, 1.0, 2.0, 5.0], [7200, 9, 9, 9, 9, 9]]
+    series = CandleSeries.from_coinbase(rows)
+
+    assert series.time.tolist() == [3600, 7200]
+    records = series.to_records()
+    assert records[0]["close"] == "3.0"
+    assert records[1]["low"] == "0.5"
+    assert set(records[0]) == {"time", "low", "high", "open", "close", "volume"}
+
+
+def test_merge_prefers_newer_values():
+    older = CandleSeries.from_coinbase([[0, 1, 1, 1, 1, 1], [60, 2, 2, 2, 2, 2]])
+    newer = CandleSeries.from_coinbase([[60, 3, 3, 3, 3, 3], [120, 4, 4, 4, 4, 4]])
+    merged = older.merge(newer)
+    assert merged.time.tolist() == [0, 60, 120]
+    assert merged.close.tolist() == [1, 3, 4]
+
+
+def test_ewm_matches_recurrence_across_blocks():
+    values = np.random.default_rng(1).normal(100, 5, 5000)
+    for alpha in (0.5, 2 / 15, 0.001):
+        np.testing.assert_allclose(indicators.ewm(values, alpha), reference_ewm(values, alpha), rtol=1e-9)
+
+
+def test_indicators():
+    close = np.array([1, 2, 3, 4, 5, 4, 3, 4, 5, 6], dtype=float)
+    np.testing.assert_allclose(indicators.sma(close, 3)[2:], np.convolve(close, np.ones(3) / 3, "valid"))
+    assert np.isnan(indicators.sma(close, 3)[:2]).all()
+
+    rising = indicators.rsi(np.arange(1, 20, dtype=float), 5)
+    assert rising[-1] == 100.0
+    flat = indicators.rsi(np.full(20, 3.0), 5)
+    assert np.isnan(flat[:5]).all() and (flat[5:] == 50.0).all()
+
+    volume = np.ones_like(close)
+    np.testing.assert_allclose(indicators.vwap(close, close, close, volume)[-1], close.mean())
+
+    atr = indicators.atr(close + 1, close - 1, close, 3)
+    assert np.isnan(atr[:2]).all() and atr[-1] == pytest.approx(2.0)
+
+    vol = indicators.realized_volatility(close, 5, 8760)
+    assert np.isnan(vol[:5]).all() and (vol[5:] > 0).all()
+
+
+def test_compute_indicators_serializes_nan_as_none():
+    rows = [[i * 3600, 1, 3, 2, 2 + i % 3, 1] for i in range(6)]
+    result = indicators.compute_indicators(CandleSeries.from_coinbase(rows), window=4, granularity=3600)
+    assert result["sma"][:3] == [None, None, None]
+    assert result["latest"]["sma"] is not None
+    assert len(result["time"]) == 6
+
+
+@pytest.mark.asyncio
+async def test_long_windows_fetch_enough_candles(coinbase_env, monkeypatch):
+    from app.main import app
+    from app.dependencies import get_coinbase_service
+
+    service = get_coinbase_service()
+    ranges = []
+
+    def hourly(count, end=1_700_000_000):
+        return CandleSeries.from_coinbase([[end - i * 3600, 1, 3, 2, 2 + i % 3, 1] for i in range(count)])
+
+    async def get_candle_series(product_id):
+        return hourly(24), None
+
+    async def get_candle_range(product_id, start, end, granularity):
+        ranges.append((product_id, end - start, granularity))
+        return hourly((end - start) // granularity + 1)
+
+    monkeypatch.setattr(service, "get_candle_series", get_candle_series)
+    monkeypatch.setattr(service, "get_candle_range", get_candle_range)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        short = (await client.get("/api/crypto/indicators/BTC-GBP", params={"window": 14})).json()
+        long = (await client.get("/api/crypto/indicators/BTC-GBP", params={"window": 100})).json()
+
+    assert len(short["time"]) == 24
+    assert len(ranges) == 1 and ranges[0][0] == "BTC-GBP" and ranges[0][2] == 3600
+    assert ranges[0][1] >= 100 * 3600
+    assert len(long["time"]) >= 101
+    assert all(value is not None for value in long["latest"].values())
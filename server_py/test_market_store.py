@@ -0,0 +1,123 @@
+import time
+import pytest
+from app.services.candles import CandleSeries
+from app.services.market_store import MarketDataStore, RingBuffer
+from app.services.market_poller import MarketDataPoller
+
+
+def candles(*rows):
+    """Build a series from (hours ago, close) pairs."""
+    hour = int(time.time()) // 3600 * 3600
+    return CandleSeries.from_coinbase([[hour - ago * 3600, close, close, close, close, 1.0] for ago, close in rows])
+
+
+def test_ring_buffer_overwrites_oldest():
+    ring = RingBuffer(3)
+    for value in range(5):
+        ring.append(value)
+    assert ring.items() == [2, 3, 4]
+    ring.replace_last(9)
+    assert ring.items() == [2, 3, 9]
+    assert len(ring) == 3
+
+
+def test_store_merges_candles_and_bounds_products():
+    store = MarketDataStore(max_bytes=10 * 1024 * 1024, max_products=1)
+    store.update_candles("BTC-GBP", candles((1, 101), (2, 100)))
+    store.update_candles("BTC-GBP", candles((0, 103), (1, 102)))
+    store.update_candles("ETH-GBP", candles((0, 5)))
+
+    stored, age = store.get_candles("BTC-GBP")
+    assert stored.close.tolist() == [100, 102, 103]
+    assert age < 1
+    assert store.get_candles("ETH-GBP") is None
+
+
+class FakeService:
+    market_quote = "GBP"
+
+    def __init__(self):
+        self.calls = 0
+        self.portfolio = [{"currency": "BTC"}, {"currency": "GBP"}]
+        self.portfolio_error = None
+        self.portfolio_reads = 0
+
+    async def load_portfolio(self):
+        self.portfolio_reads += 1
+        if self.portfolio_error is not None:
+            raise self.portfolio_error
+        return self.portfolio, None
+
+    async def fetch_candles(self, product_id):
+        self.calls += 1
+        return candles((0, 110), (23, 100))
+
+    async def fetch_latest_trade(self, product_id):
+        return {"trade_id": "1", "price": "110", "time": "now"}
+
+
+@pytest.mark.asyncio
+async def test_poller_fills_store_and_price_is_served_from_it(coinbase_env, monkeypatch):
+    from app.services.coinbase_service import CoinbaseService
+
+    monkeypatch.setenv("MARKET_POLLER_EXTRA_PRODUCTS", "ETH-GBP")
+    store = MarketDataStore()
+    fake = FakeService()
+    poller = MarketDataPoller(fake, store)
+    await poller.poll_once()
+
+    assert sorted(store.products()) == ["BTC-GBP", "ETH-GBP"]
+    assert fake.calls == 2
+
+    service = CoinbaseService()
+    monkeypatch.setattr(service, "market_store", store)
+
+    async def no_upstream(product_id):
+        raise AssertionError("upstream should not be called")
+
+    monkeypatch.setattr(service, "fetch_latest_trade", no_upstream)
+    price = await service.get_crypto_price("BTC-GBP")
+    assert price["price"] == "110.0"
+    assert price["change_24h"] == 10.0
+    assert price["stale"] is False
+
+
+@pytest.mark.asyncio
+async def test_failed_portfolio_read_keeps_tracked_products():
+    store = MarketDataStore()
+    fake = FakeService()
+    poller = MarketDataPoller(fake, store)
+    await poller.poll_once()
+
+    # A failed read keeps the store's products and is retried with a growing delay
+    poller._portfolio_read_at -= poller.portfolio_refresh
+    fake.portfolio_error = RuntimeError("accounts unavailable")
+    await poller.poll_once()
+    assert store.products() == ["BTC-GBP"] and fake.portfolio_reads == 2
+    assert poller._portfolio_retry_at - time.monotonic() == pytest.approx(poller.interval, abs=1)
+    await poller.poll_once()
+    assert fake.portfolio_reads == 2
+
+    poller._portfolio_retry_at = 0.0
+    await poller.poll_once()
+    assert fake.portfolio_reads == 3
+    assert poller._portfolio_retry_at - time.monotonic() == pytest.approx(2 * poller.interval, abs=1)
+
+    # An account that really holds nothing is accepted and not re-read until the refresh period
+    poller._portfolio_retry_at = 0.0
+    fake.portfolio_error = None
+    fake.portfolio = []
+    await poller.poll_once()
+    await poller.poll_once()
+    assert fake.portfolio_reads == 4
+    assert store.products() == []
+
+
+def test_poller_quotes_in_the_service_currency(monkeypatch):
+    monkeypatch.setenv("MARKET_QUOTE_CURRENCY", "usd,eur")
+    fake = FakeService()
+    fake.market_quote = "USD"
+    assert MarketDataPoller(fake, MarketDataStore()).quote_currency == "USD"
+
+    monkeypatch.setenv("MARKET_POLLER_QUOTE_CURRENCY", "eur")
+    assert MarketDataPoller(fake, MarketDataStore()).quote_currency == "EUR"
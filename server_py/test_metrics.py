@@ -0,0 +1,128 @@
+import asyncio
+import httpx
+import pytest
+from fastapi import FastAPI
+from app.metrics import (
+    HTTP_REQUEST_DURATION,
+    OPENAI_TOKENS,
+    UPSTREAM_ERRORS,
+    UPSTREAM_IN_FLIGHT,
+    UPSTREAM_REQUEST_DURATION,
+    MetricsMiddleware,
+    Registry,
+    record_token_usage,
+    track_upstream,
+)
+from app.services.cache import TTLCache
+
+
+def test_histogram_renders_cumulative_buckets_and_escaped_labels():
+    registry = Registry()
+    latency = registry.histogram("demo_seconds", "Demo latency", ("route",), buckets=(0.1, 1.0))
+    requests = registry.counter("demo_total", "Demo requests", ("route",))
+    for value in (0.05, 0.5, 5.0):
+        latency.observe(value, '/a"b')
+    requests.inc("/x", amount=2)
+
+    text = registry.render()
+    assert "# TYPE demo_seconds histogram" in text
+    assert 'demo_seconds_bucket{route="/a\\"b",le="0.1"} 1' in text
+    assert 'demo_seconds_bucket{route="/a\\"b",le="1"} 2' in text
+    assert 'demo_seconds_bucket{route="/a\\"b",le="+Inf"} 3' in text
+    assert 'demo_seconds_sum{route="/a\\"b"} 5.55' in text
+    assert 'demo_seconds_count{route="/a\\"b"} 3' in text
+    assert 'demo_total{route="/x"} 2' in text
+    with pytest.raises(ValueError):
+        registry.counter("demo_total", "Duplicate")
+
+
+@pytest.mark.asyncio
+async def test_track_upstream_counts_errors_but_not_cancellation():
+    name = "test_upstream"
+    calls = UPSTREAM_REQUEST_DURATION.count(name)
+    errors = UPSTREAM_ERRORS.value(name)
+
+    with track_upstream(name):
+        assert UPSTREAM_IN_FLIGHT.value(name) == 1
+    with pytest.raises(RuntimeError):
+        with track_upstream(name):
+            raise RuntimeError("upstream down")
+
+    async def slow():
+        with track_upstream(name):
+            await asyncio.sleep(10)
+
+    task = asyncio.ensure_future(slow())
+    await asyncio.sleep(0)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+    assert UPSTREAM_REQUEST_DURATION.count(name) == calls + 3
+    assert UPSTREAM_ERRORS.value(name) == errors + 1
+    assert UPSTREAM_IN_FLIGHT.value(name) == 0
+
+
+@pytest.mark.asyncio
+async def test_track_upstream_leaves_consumer_pauses_out():
+    name = "test_streamed_upstream"
+
+    async def pieces():
+        with track_upstream(name) as upstream:
+            for piece in ("a", "b", "c"):
+                await asyncio.sleep(0.01)
+                with upstream.paused():
+                    yield piece
+
+    async for _ in pieces():
+        # A slow consumer: the upstream is not in flight and the wait is not timed
+        assert UPSTREAM_IN_FLIGHT.value(name) == 0
+        await asyncio.sleep(0.2)
+
+    assert UPSTREAM_REQUEST_DURATION.count(name) == 1
+    assert 0.03 <= UPSTREAM_REQUEST_DURATION._series[(name,)][1] < 0.2
+    assert UPSTREAM_IN_FLIGHT.value(name) == 0
+
+
+@pytest.mark.asyncio
+async def test_middleware_labels_requests_by_route_template():
+    app = FastAPI()
+    app.add_middleware(MetricsMiddleware)
+
+    @app.get("/items/{item_id}")
+    async def item(item_id: str):
+        return {"id": item_id}
+
+    before = HTTP_REQUEST_DURATION.count("GET", "/items/{item_id}", "200")
+    unmatched = HTTP_REQUEST_DURATION.count("GET", "unmatched", "404")
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        for item_id in ("a", "b", "c"):
+            assert (await client.get(f"/items/{item_id}")).status_code == 200
+        assert (await client.get("/nowhere")).status_code == 404
+
+    # One series for every product ID, and unknown paths do not create new label values
+    assert HTTP_REQUEST_DURATION.count("GET", "/items/{item_id}", "200") == before + 3
+    assert HTTP_REQUEST_DURATION.count("GET", "unmatched", "404") == unmatched + 1
+
+
+@pytest.mark.asyncio
+async def test_metrics_endpoint_reports_caches_and_token_usage(coinbase_env):
+    from app.main import app
+
+    cache = TTLCache(max_entries=4, name="test_cache")
+    await cache.get_or_load("key", lambda: asyncio.sleep(0, "value"), ttl=60)
+    await cache.get_or_load("key", lambda: asyncio.sleep(0, "value"), ttl=60)
+    prompt = OPENAI_TOKENS.value("prompt")
+    record_token_usage(type("Usage", (), {"prompt_tokens": 120, "completion_tokens": 30})())
+    assert OPENAI_TOKENS.value("prompt") == prompt + 120
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        response = await client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert 'cache_hits_total{cache="test_cache"} 1' in response.text
+    assert 'cache_misses_total{cache="test_cache"} 1' in response.text
+    assert 'cache_entries{cache="test_cache"} 1' in response.text
+    assert 'openai_tokens_total{type="completion"}' in response.text
+    assert "# TYPE event_loop_lag_seconds histogram" in response.text
@@ -0,0 +1,90 @@
+import os
+import httpx
+import numpy as np
+import pytest
+from app.services.portfolio_history import PortfolioHistory, PortfolioRecorder, decimate
+
+
+def test_history_appends_fixed_width_records_and_reopens(tmp_path):
+    path = str(tmp_path / "history" / "portfolio.bin")
+    history = PortfolioHistory(path, "gbp", max_assets=2)
+    assert history.acquire_writer()
+    assert history.append(1000, 100.0, {"BTC": 0.75, "ETH": 0.25})
+    assert history.append(1300, 120.0, {"ETH": 0.5, "SOL": 0.3, "BTC": 0.2})
+    # Snapshots must move forward in time
+    assert not history.append(1300, 130.0, {"BTC": 1.0})
+    assert os.path.getsize(path) == 32 + 2 * history.dtype.itemsize
+    history.close()
+
+    # A half-written record from a crashed writer is ignored, then dropped by the next writer
+    with open(path, "ab") as f:
+        f.write(b"\0" * 7)
+    reopened = PortfolioHistory(path, "GBP")
+    assert len(reopened) == 2 and reopened.max_assets == 2
+    assert reopened.acquire_writer()
+    assert os.path.getsize(path) == 32 + 2 * reopened.dtype.itemsize
+
+    result = reopened.query(0, 2000, points=10)
+    assert result["count"] == 2 and result["time"] == [1000, 1300]
+    assert result["value"] == [100.0, 120.0]
+    # Only the two largest holdings fit; missing assets weigh 0
+    assert result["weights"] == {"BTC": [0.75, 0.0], "ETH": [0.25, 0.5], "SOL": [0.0, 0.3]}
+    assert reopened.query(1001, 1299, points=10)["time"] == []
+    assert reopened.span(1300, 1300) == (1, 2)
+    reopened.close()
+
+    with pytest.raises(ValueError):
+        PortfolioHistory(path, "USD")
+
+
+def test_decimation_keeps_extremes_within_the_point_budget():
+    values = np.sin(np.linspace(0, 20, 10_000)) + 5
+    values[4321] = 100.0
+    values[8765] = -100.0
+    indices = decimate(values, 100)
+    assert len(indices) <= 100 and np.all(np.diff(indices) > 0)
+    assert {4321, 8765} <= set(indices.tolist())
+    assert values[indices].max() == 100.0 and values[indices].min() == -100.0
+    assert decimate(values[:50], 100).tolist() == list(range(50))
+
+
+@pytest.mark.asyncio
+async def test_recorded_history_served_by_range(coinbase_env, monkeypatch, tmp_path):
+    from app.main import app
+    from app.dependencies import get_coinbase_service
+
+    service = get_coinbase_service()
+    history = PortfolioHistory(str(tmp_path / "portfolio.bin"), "GBP")
+    valuations = []
+
+    async def get_portfolio_valuation(quote_currency=None):
+        valuations.append(quote_currency)
+        return {"total_value": "1500", "assets": [
+            {"currency": "BTC", "weight": "0.8"}, {"currency": "ETH", "weight": "0.2"},
+            {"currency": "DOGE", "weight": None}]}
+
+    monkeypatch.setattr(service, "get_portfolio_valuation", get_portfolio_valuation)
+    for i in range(1, 2000):
+        history.append(1_700_000_000 + i * 300, 1000.0 + (i % 7), {"BTC": 0.5, "ETH": 0.5})
+    recorder = PortfolioRecorder(service, history)
+    assert await recorder.record_once()
+    assert valuations == ["GBP"]
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        monkeypatch.setattr(service, "portfolio_history", None)
+        assert (await client.get("/api/crypto/portfolio/history")).status_code == 503
+
+        monkeypatch.setattr(service, "portfolio_history", history)
+        latest = (await client.get("/api/crypto/portfolio/history")).json()
+        ranged = (await client.get("/api/crypto/portfolio/history", params={
+            "from": 1_700_000_000, "to": 1_700_000_000 + 1000 * 300, "points": 50})).json()
+        backwards = await client.get("/api/crypto/portfolio/history", params={"from": 2, "to": 1})
+
+    assert latest["quote_currency"] == "GBP" and latest["value"] == [1500.0]
+    assert latest["weights"] == {"BTC": [0.8], "ETH": [0.2]}
+    assert ranged["count"] == 1000 and len(ranged["time"]) <= 50
+    assert min(ranged["value"]) == 1000.0 and max(ranged["value"]) == 1006.0
+    assert ranged["time"] == sorted(ranged["time"])
+    assert backwards.status_code == 400
+    history.close()
@@ -0,0 +1,122 @@
+import asyncio
+import json
+import pytest
+from app.services.market_store import MarketDataStore
+from app.services.price_stream import PriceStreamHub, StreamSubscriber
+from benchmarks.stubs import CoinbaseFeedStub
+
+
+def test_slow_subscriber_drops_oldest_ticks():
+    subscriber = StreamSubscriber(queue_size=3)
+    for price in range(5):
+        subscriber.offer({"price": price})
+    assert subscriber.dropped == 2
+    assert [subscriber.queue.get_nowait()["price"] for _ in range(3)] == [2, 3, 4]
+
+
+@pytest.mark.asyncio
+async def test_hub_multiplexes_one_upstream_connection():
+    async with CoinbaseFeedStub(interval=0.01) as feed:
+        store = MarketDataStore()
+        hub = PriceStreamHub(url=feed.url, store=store)
+        first = hub.register()
+        second = hub.register()
+        try:
+            await hub.subscribe(first, ["btc-gbp"])
+            await hub.subscribe(second, ["BTC-GBP", "ETH-GBP"])
+
+            tick = await asyncio.wait_for(first.next_tick(), 2)
+            assert tick["product_id"] == "BTC-GBP"
+            assert "change_24h" in tick
+
+            seen = set()
+            while seen != {"BTC-GBP", "ETH-GBP"}:
+                seen.add((await asyncio.wait_for(second.next_tick(), 2))["product_id"])
+
+            assert feed.connections == 1
+            assert store.latest_trade("BTC-GBP") is not None
+
+            await hub.unregister(second)
+            assert hub.stats()["products"] == ["BTC-GBP"]
+        finally:
+            await hub.close()
+
+
+@pytest.mark.asyncio
+async def test_upstream_closed_after_last_client_leaves():
+    async with CoinbaseFeedStub(interval=0.01) as feed:
+        hub = PriceStreamHub(url=feed.url, store=MarketDataStore())
+        try:
+            subscriber = hub.register()
+            await hub.subscribe(subscriber, ["BTC-GBP"])
+            await asyncio.wait_for(subscriber.next_tick(), 2)
+            await hub.unregister(subscriber)
+            assert hub.stats()["connected"] is False and hub._task is None
+
+            # The next client reopens the connection
+            subscriber = hub.register()
+            await hub.subscribe(subscriber, ["ETH-GBP"])
+            assert (await asyncio.wait_for(subscriber.next_tick(), 2))["product_id"] == "ETH-GBP"
+            assert feed.connections == 2
+        finally:
+            await hub.close()
+
+
+def test_dispatch_ignores_messages_that_are_not_objects():
+    hub = PriceStreamHub(url="ws://127.0.0.1:1", store=MarketDataStore())
+    subscriber = StreamSubscriber(queue_size=3)
+    hub._followers["BTC-GBP"] = {subscriber}
+    for raw in ("[1, 2]", '"ticker"', "3", "not json"):
+        hub._dispatch(raw)
+    hub._dispatch('{"type": "ticker", "product_id": "BTC-GBP", "price": "1", "time": "t"}')
+    assert subscriber.queue.qsize() == 1
+
+
+@pytest.fixture
+def stream_hub(monkeypatch):
+    """Process-wide hub replaced by one whose store already knows BTC-GBP's last trade."""
+    from app.routers import crypto
+
+    store = MarketDataStore()
+    store.add_trade("BTC-GBP", {"trade_id": 1, "price": "30000", "time": "t"})
+    # Nothing listens upstream; ticks come from the store
+    hub = PriceStreamHub(url="ws://127.0.0.1:1", store=store)
+    monkeypatch.setattr(crypto, "get_price_stream_hub", lambda: hub)
+    monkeypatch.setenv("STREAM_RECONNECT_MAX_DELAY", "0.1")
+    return hub
+
+
+def test_websocket_rejects_malformed_messages(coinbase_env, stream_hub):
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    client = TestClient(app)
+    with client.websocket_connect("/api/crypto/stream") as websocket:
+        for message in ([1, 2], {"type": "subscribe", "product_ids": "BTC-GBP"},
+                        {"type": "subscribe", "product_ids": [1]}, {"type": "resubscribe"}):
+            websocket.send_json(message)
+            assert websocket.receive_json()["type"] == "error"
+        assert stream_hub.stats()["products"] == []
+
+        # The connection survives and still serves valid requests
+        websocket.send_json({"type": "subscribe", "product_ids": ["btc-gbp"]})
+        tick = websocket.receive_json()
+        assert tick["type"] == "ticker" and tick["product_id"] == "BTC-GBP" and tick["price"] == "30000"
+        assert stream_hub.stats()["products"] == ["BTC-GBP"]
+
+
+def test_sse_streams_ticks_and_validates_ids(coinbase_env, stream_hub, monkeypatch):
+    import httpx
+    from app.main import app
+    from benchmarks.stubs import StubServer
+
+    for setting in ("MARKET_POLLER_ENABLED", "CANDLE_STORE_ENABLED", "PORTFOLIO_HISTORY_ENABLED"):
+        monkeypatch.setenv(setting, "false")
+    with StubServer(app) as api_server:
+        with httpx.Client(base_url=api_server.url, timeout=10) as client:
+            assert client.get("/api/crypto/stream/sse", params={"ids": " , "}).status_code == 400
+            with client.stream("GET", "/api/crypto/stream/sse", params={"ids": "BTC-GBP"}) as response:
+                assert response.headers["content-type"].startswith("text/event-stream")
+                line = next(line for line in response.iter_lines() if line.startswith("data:"))
+    tick = json.loads(line[len("data: "):])
+    assert tick == {"type": "ticker", "product_id": "BTC-GBP", "price": "30000", "time": "t"}
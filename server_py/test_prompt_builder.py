@@ -0,0 +1,66 @@
+import time
+from app.services.candles import CandleSeries
+from app.services.prompt_builder import asset_features, build_prompt, estimate_tokens
+
+
+def analysis_entry(currency, price):
+    """Market data entry shaped like the /analysis endpoint's."""
+    hour = int(time.time()) // 3600 * 3600
+    rows = [[hour - i * 3600, price * 0.99, price * 1.01, price, price * (1 + i / 1000), 10.0 + i]
+            for i in range(25)]
+    return {
+        "currency": currency,
+        "current_price": {"price": str(price), "change_24h": -1.5, "price_24h_ago": str(price * 1.02)},
+        "historical_data": CandleSeries.from_coinbase(rows).to_records(),
+    }
+
+
+def portfolio_and_market(count):
+    portfolio = [{"currency": f"C{i}", "balance": str(count - i), "available": str(count - i)} for i in range(count)]
+    market = [analysis_entry(f"C{i}", 100.0 + i) for i in range(count)]
+    return portfolio, market
+
+
+def legacy_prompt(portfolio, market_data):
+    """The prompt as previously built from the raw data structures."""
+    return f"""Portfolio: {portfolio}
+Recent Market Data: {market_data}"""
+
+
+def test_compact_prompt_is_much_smaller_than_raw_data():
+    portfolio, market = portfolio_and_market(10)
+    before = estimate_tokens(legacy_prompt(portfolio, market))
+    after = estimate_tokens(build_prompt(portfolio, market, token_budget=10_000))
+
+    print(f"prompt tokens for 10 holdings: before={before} after={after}")
+    assert after * 10 < before
+    assert "C0:" in build_prompt(portfolio, market, token_budget=10_000)
+
+
+def test_budget_drops_lowest_weight_holdings_first():
+    portfolio, market = portfolio_and_market(30)
+    prompt = build_prompt(portfolio, market, token_budget=400)
+
+    assert estimate_tokens(prompt) <= 400
+    assert "C0:" in prompt
+    assert "C29:" not in prompt
+    assert "smaller holdings omitted" in prompt
+
+
+def test_features():
+    entry = analysis_entry("BTC", 200.0)
+    features = asset_features({"currency": "BTC", "balance": "2"}, entry)
+
+    assert features["price"] == 200.0
+    assert features["change_24h"] == -1.5
+    assert features["value"] == 400.0
+    assert features["low"] < features["high"]
+    assert features["volatility"] > 0
+    assert asset_features({"currency": "XYZ", "balance": "1"}, None)["value"] is None
+
+
+def test_quote_currency_holding_is_valued_at_par():
+    portfolio = [{"currency": "GBP", "balance": "50"}, {"currency": "BTC", "balance": "1"}]
+    prompt = build_prompt(portfolio, [analysis_entry("BTC", 150.0)], token_budget=10_000)
+    assert "Portfolio value: 200 GBP" in prompt
+    assert "GBP: weight=25.0%" in prompt
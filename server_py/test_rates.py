@@ -0,0 +1,120 @@
+import time
+import httpx
+import pytest
+from app.services.cache import TTLCache
+from app.services.candles import CandleSeries
+from app.services.market_store import MarketDataStore
+from app.services.rates import Market, RateGraph, markets_from_prices
+
+
+def test_rates_triangulate_through_the_cheapest_path():
+    graph = RateGraph([
+        Market("ETH", "BTC", 0.05, 0.04),
+        Market("BTC", "GBP", 30000.5, 25000.0),
+        Market("BTC", "USD", 40000.0, 40000.0),
+        Market("SOL", "EUR", 100.0),
+    ])
+
+    # Direct markets are exact in their own direction
+    assert graph.price("BTC", "GBP")["price"] == "30000.5"
+    assert graph.path("BTC", "GBP") == ["BTC", "GBP"]
+
+    eth_usd = graph.price("ETH", "USD")
+    assert eth_usd["path"] == ["ETH", "BTC", "USD"]
+    assert float(eth_usd["price"]) == pytest.approx(2000.0)
+    assert float(eth_usd["price_24h_ago"]) == pytest.approx(1600.0)
+    assert eth_usd["change_24h"] == 25.0
+
+    assert graph.path("GBP", "USD") == ["GBP", "BTC", "USD"]
+    assert graph.rate("GBP", "USD") == pytest.approx(40000.0 / 30000.5)
+    assert graph.rate("USD", "ETH") == pytest.approx(1 / 2000.0)
+
+    # No 24h price on a leg leaves the change unknown; disconnected currencies have no rate
+    assert graph.price("SOL", "EUR")["change_24h"] is None
+    assert graph.price("SOL", "USD") is None and graph.rate("DOGE", "USD") is None
+
+
+def test_fewer_steps_win_then_fresher_data():
+    graph = RateGraph([
+        Market("ETH", "BTC", 0.05, age=600),
+        Market("BTC", "USD", 40000.0),
+        Market("ETH", "USDC", 2100.0),
+        Market("USDC", "USD", 1.0),
+    ])
+    assert graph.path("ETH", "USD") == ["ETH", "USDC", "USD"]
+    assert float(graph.price("ETH", "USD")["price"]) == pytest.approx(2100.0)
+
+    graph = RateGraph([Market("ETH", "USD", 1900.0, age=3000), Market("ETH", "USDC", 2100.0),
+                       Market("USDC", "USD", 1.0)])
+    assert graph.path("ETH", "USD") == ["ETH", "USD"]
+    assert graph.price("ETH", "USD")["age_seconds"] == 3000
+
+    # However old, a direct market beats a longer fresh path
+    graph = RateGraph([Market("ETH", "USD", 1900.0, age=7 * 86400), Market("ETH", "USDC", 2100.0),
+                       Market("USDC", "USD", 1.0)])
+    assert graph.path("ETH", "USD") == ["ETH", "USD"]
+
+
+def test_markets_from_prices_skip_errors():
+    markets = markets_from_prices({
+        "BTC-GBP": {"price": "30000", "price_24h_ago": "29000", "age_seconds": 5.0},
+        "ETH-GBP": {"error": "Unable to fetch price for ETH-GBP."},
+        "bad": {"price": "1"},
+    })
+    assert markets == [Market("BTC", "GBP", 30000.0, 29000.0, 5.0)]
+
+
+@pytest.mark.asyncio
+async def test_other_quote_currencies_need_no_extra_upstream_requests(coinbase_env, monkeypatch):
+    from app.main import app
+    from app.dependencies import get_coinbase_service
+
+    service = get_coinbase_service()
+    fetched = []
+
+    async def portfolio():
+        return [{"currency": "BTC", "balance": "2", "available": "2"},
+                {"currency": "ETH", "balance": "10", "available": "10"},
+                {"currency": "GBP", "balance": "100", "available": "100"}]
+
+    async def fetch_price(product_id):
+        fetched.append(product_id)
+        prices = {"BTC-GBP": ("30000", "25000"), "ETH-GBP": ("1500", "1500")}
+        if product_id not in prices:
+            raise ValueError(f"No market {product_id}")
+        return {"price": prices[product_id][0], "price_24h_ago": prices[product_id][1]}
+
+    # The poller tracks one USD market, which links every GBP price to USD
+    store = MarketDataStore()
+    store.add_trade("BTC-USD", {"price": "40000", "time": "2024-01-01T00:00:00Z"})
+    bucket = int(time.time()) // 3600 * 3600
+    store.update_candles("BTC-USD", CandleSeries.from_coinbase([[bucket, 1.0, 1.0, 32000.0, 32000.0, 1.0]]))
+
+    monkeypatch.setattr(service, "get_portfolio", portfolio)
+    monkeypatch.setattr(service, "_fetch_price", fetch_price)
+    monkeypatch.setattr(service, "price_cache", TTLCache())
+    monkeypatch.setattr(service, "price_ttl", 60.0)
+    monkeypatch.setattr(service, "market_quote", "GBP")
+    monkeypatch.setattr(service, "valuation_cache", TTLCache(max_entries=8))
+    monkeypatch.setattr(service, "_valued_products", {})
+    monkeypatch.setattr(service, "market_store", store)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        gbp = (await client.get("/api/crypto/portfolio/valuation", params={"quote": "GBP"})).json()
+        gbp_fetches = sorted(fetched)
+        fetched.clear()
+        usd = (await client.get("/api/crypto/portfolio/valuation", params={"quote": "USD"})).json()
+        eth_usd = (await client.get("/api/crypto/price/ETH", params={"quote": "USD"})).json()
+        same = await client.get("/api/crypto/price/USD", params={"quote": "usd"})
+
+    assert gbp_fetches == ["BTC-GBP", "ETH-GBP"]
+    # USD rates come from the cached GBP prices and the store's BTC-USD market
+    assert fetched == []
+    assert gbp["total_value"] == "75100"
+    # 1 GBP = 40000 / 30000 USD
+    assert float(usd["total_value"]) == pytest.approx(75100 * 4 / 3)
+    assert usd["errors"] == {}
+    assert eth_usd["path"] == ["ETH", "GBP", "BTC", "USD"]
+    assert float(eth_usd["price"]) == pytest.approx(2000.0)
+    assert same.status_code == 400
@@ -0,0 +1,86 @@
+import json
+import time
+import httpx
+import pytest
+from openai import AsyncOpenAI
+from app.services.cache import TTLCache
+from benchmarks.stubs import StubServer, create_openai_stub
+
+
+def parse_events(text):
+    events = []
+    for block in text.strip().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.split("\n"))
+        events.append((fields["event"], json.loads(fields["data"])))
+    return events
+
+
+@pytest.fixture
+def stream_app(coinbase_env, monkeypatch):
+    """Recommendations router wired to fake holdings and an OpenAI stand-in factory."""
+    from app.dependencies import get_ai_service, get_coinbase_service
+
+    async def portfolio():
+        return [{"currency": "BTC", "balance": "1", "available": "1"}]
+
+    async def historical(product_id):
+        return [{"time": "t", "low": "1", "high": "2", "open": "1", "close": "2", "volume": "5"}]
+
+    monkeypatch.setattr(get_coinbase_service(), "get_portfolio", portfolio)
+    monkeypatch.setattr(get_coinbase_service(), "get_historical_data", historical)
+    monkeypatch.setattr(get_ai_service(), "enable_ai_recommendations", True)
+    monkeypatch.setattr(get_ai_service(), "recommendation_cache", TTLCache())
+
+    def use_openai(url):
+        client = AsyncOpenAI(base_url=f"{url}/v1", api_key="test", max_retries=0)
+        monkeypatch.setattr(get_ai_service(), "client", client)
+
+    return use_openai
+
+
+@pytest.mark.asyncio
+async def test_stream_forwards_tokens_then_serves_cache(stream_app):
+    from app.main import app
+
+    stub = create_openai_stub()
+    with StubServer(stub) as openai_server:
+        stream_app(openai_server.url)
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            first = await client.get("/api/recommendations/stream")
+            second = await client.get("/api/recommendations/stream")
+
+    events = parse_events(first.text)
+    assert first.headers["content-type"].startswith("text/event-stream")
+    assert events[0] == ("meta", {"errors": {}})
+    assert events[-1] == ("done", {})
+    tokens = [data["text"] for name, data in events if name == "token"]
+    assert len(tokens) == 8
+    assert "".join(tokens) == "Hold BTC; trim ETH on strength."
+    # The finished stream was cached, so the repeat is one piece and no new completion
+    assert [data["text"] for name, data in parse_events(second.text) if name == "token"] == ["".join(tokens)]
+    assert stub.state.stats["requests"] == 1
+
+
+def test_client_disconnect_closes_upstream_stream(stream_app, monkeypatch):
+    from app.main import app
+
+    monkeypatch.setenv("MARKET_POLLER_ENABLED", "false")
+    monkeypatch.setenv("CANDLE_STORE_ENABLED", "false")
+    monkeypatch.setenv("PORTFOLIO_HISTORY_ENABLED", "false")
+    stub = create_openai_stub(tokens=[f"token{i} " for i in range(200)], token_delay=0.02)
+    with StubServer(stub) as openai_server, StubServer(app) as api_server:
+        stream_app(openai_server.url)
+        with httpx.Client(base_url=api_server.url, timeout=10) as client:
+            with client.stream("GET", "/api/recommendations/stream") as response:
+                for line in response.iter_lines():
+                    if line.startswith("data:") and "token0" in line:
+                        break
+
+        for _ in range(100):
+            if stub.state.stats["aborted"]:
+                break
+            time.sleep(0.05)
+
+    assert stub.state.stats["aborted"] == 1
+    assert stub.state.stats["completed"] == 0
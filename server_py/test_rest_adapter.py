@@ -0,0 +1,59 @@
+import asyncio
+import time
+import httpx
+import pytest
+from app.services.http_client import init_http_client, close_http_client
+from app.services.rest_adapter import AsyncRESTClient
+
+
+class SlowRESTClient:
+    """Stand-in for the synchronous RESTClient whose calls block the calling thread."""
+
+    def __init__(self, delay):
+        self.delay = delay
+
+    def get_accounts(self, **kwargs):
+        time.sleep(self.delay)
+        return {"accounts": []}
+
+
+def candles_handler(request):
+    return httpx.Response(200, json=[[1700000000, 1.0, 2.0, 1.5, 1.8, 10.0]])
+
+
+@pytest.mark.asyncio
+async def test_call_times_out():
+    client = AsyncRESTClient(SlowRESTClient(0.5))
+    with pytest.raises(asyncio.TimeoutError):
+        await client.get_accounts(timeout=0.05)
+
+
+@pytest.mark.asyncio
+async def test_call_returns_result():
+    client = AsyncRESTClient(SlowRESTClient(0.01))
+    assert await client.get_accounts() == {"accounts": []}
+
+
+@pytest.mark.asyncio
+async def test_slow_accounts_do_not_delay_historical(coinbase_env, monkeypatch):
+    from app.main import app
+    from app.dependencies import get_coinbase_service
+
+    monkeypatch.setattr(get_coinbase_service(), "rest_client", AsyncRESTClient(SlowRESTClient(1.0)))
+    init_http_client(transport=httpx.MockTransport(candles_handler))
+    try:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            slow = asyncio.create_task(client.get("/api/crypto/portfolio"))
+            await asyncio.sleep(0.05)
+
+            start = time.perf_counter()
+            response = await client.get("/api/crypto/historical/BTC-GBP")
+            elapsed = time.perf_counter() - start
+
+            assert response.status_code == 200
+            assert elapsed < 0.5
+            assert not slow.done()
+            assert (await slow).status_code == 200
+    finally:
+        await close_http_client()
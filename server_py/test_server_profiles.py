@@ -0,0 +1,62 @@
+import json
+import logging
+import pytest
+from app import logging_utils
+from app.logging_utils import JsonFormatter, configure_logging, log_payload
+from run import server_options
+
+
+class Exploding:
+    """Payload that fails the test if it is ever serialized."""
+
+    def __repr__(self):
+        raise AssertionError("payload was formatted")
+
+
+def test_dev_profile_reloads_and_prod_profile_runs_workers():
+    dev = server_options("dev", "0.0.0.0", 3001, workers=4)
+    assert dev["reload"] is True and "workers" not in dev
+
+    prod = server_options("prod", "127.0.0.1", 8000, workers=4)
+    assert prod["workers"] == 4
+    assert prod["access_log"] is False
+    assert prod["loop"] in ("uvloop", "asyncio")
+    assert prod["http"] in ("httptools", "h11")
+    assert "reload" not in prod
+
+
+def test_payloads_are_not_formatted_when_disabled_or_not_sampled(monkeypatch, caplog):
+    caplog.set_level(logging.INFO)
+    log_payload("Final portfolio", Exploding())
+
+    caplog.set_level(logging.DEBUG)
+    monkeypatch.setattr(logging_utils, "_payload_sample_rate", 0.0)
+    log_payload("Final portfolio", Exploding())
+    assert caplog.records == []
+
+    monkeypatch.setattr(logging_utils, "_payload_sample_rate", 1.0)
+    monkeypatch.setattr(logging_utils, "_payload_max_chars", 20)
+    log_payload("Received candles data", [[1700000000, 1.5, 2.5, 1.0, 2.0, 10.0]] * 10, product_id="BTC-GBP")
+    (record,) = caplog.records
+    assert record.getMessage().startswith("Received candles data: [[1700000000, 1.5, 2")
+    assert record.getMessage().endswith("more characters)")
+
+    line = json.loads(JsonFormatter().format(record))
+    assert line["level"] == "DEBUG"
+    assert line["product_id"] == "BTC-GBP"
+
+
+def test_prod_logging_defaults_to_json_and_sampling(monkeypatch):
+    for name in ("LOG_LEVEL", "LOG_FORMAT", "LOG_PAYLOAD_SAMPLE_RATE"):
+        monkeypatch.delenv(name, raising=False)
+    root = logging.getLogger()
+    saved = root.handlers[:], root.level
+    try:
+        configure_logging("prod")
+        assert root.level == logging.INFO
+        assert isinstance(root.handlers[0].formatter, JsonFormatter)
+        assert logging_utils._payload_sample_rate == pytest.approx(0.01)
+    finally:
+        root.handlers[:], _ = saved
+        root.setLevel(saved[1])
+        monkeypatch.setattr(logging_utils, "_payload_sample_rate", 1.0)
@@ -0,0 +1,143 @@
+import asyncio
+import multiprocessing
+import os
+import numpy as np
+import pytest
+from app.services.cache import TTLCache
+from app.services.candles import CandleSeries
+from app.services.shared_cache import (Codec, RedisCacheBackend, SharedCacheBackend, SharedCacheError,
+                                       create_shared_backend)
+from benchmarks.stubs import RedisStub
+
+CANDLE_CODEC = Codec(CandleSeries.to_bytes, CandleSeries.from_bytes)
+
+
+def candles():
+    return CandleSeries.from_coinbase([[1700003600, 1.0, 2.0, 1.5, 1.75, 10.0], [1700000000, 0.5, 1.5, 1.0, 1.5, 5.0]])
+
+
+def shared_backends(kind, tmp_path, redis):
+    """Two backend objects on the same store, as two worker processes would have."""
+    url = redis.url if kind == "redis" else f"sqlite:///{tmp_path}/shared.db"
+    return create_shared_backend(url, lock_ttl=5), create_shared_backend(url, lock_ttl=5)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("kind", ["sqlite", "redis"])
+async def test_workers_share_one_load_per_key(kind, tmp_path):
+    async with RedisStub() as redis:
+        backends = shared_backends(kind, tmp_path, redis)
+        workers = [TTLCache(name="candles", shared=backend, codec=CANDLE_CODEC, shared_poll_interval=0.01)
+                   for backend in backends]
+        calls = 0
+
+        async def loader():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.1)
+            return candles()
+
+        results = await asyncio.gather(*(worker.get_or_load(("BTC-GBP", 3600), loader, ttl=60)
+                                         for worker in workers for _ in range(5)))
+
+        assert calls == 1
+        assert all(np.array_equal(result.close, [1.5, 1.75]) for result in results)
+        assert sum(worker.stats.shared_hits for worker in workers) == 1
+        assert all(worker.stats.shared_errors == 0 for worker in workers)
+
+        # A third worker starting later reads the value with its remaining TTL
+        late = TTLCache(name="candles", shared=backends[0], codec=CANDLE_CODEC)
+        assert np.array_equal((await late.lookup(("BTC-GBP", 3600))).time, [1700000000, 1700003600])
+        assert late.stats.shared_hits == 1
+        for backend in backends:
+            await backend.close()
+
+
+@pytest.mark.asyncio
+async def test_failed_load_releases_the_lock_for_other_workers(tmp_path):
+    async with RedisStub() as redis:
+        first, second = (TTLCache(name="prices", shared=backend, shared_poll_interval=0.01)
+                         for backend in shared_backends("redis", tmp_path, redis))
+
+        async def failing():
+            await asyncio.sleep(0.05)
+            raise RuntimeError("upstream down")
+
+        async def working():
+            return {"price": "1.0"}
+
+        failed, loaded = await asyncio.gather(first.get_or_load("BTC-GBP", failing, ttl=60),
+                                              second.get_or_load("BTC-GBP", working, ttl=60),
+                                              return_exceptions=True)
+
+        assert isinstance(failed, RuntimeError)
+        assert loaded == {"price": "1.0"}
+        assert second.stats.loads == 1
+
+
+@pytest.mark.asyncio
+async def test_unreachable_backend_falls_back_to_local_loading():
+    async with RedisStub() as redis:
+        port = int(redis.url.rsplit(":", 1)[1].split("/")[0])
+    cache = TTLCache(name="valuation", shared=RedisCacheBackend(port=port, timeout=0.5))
+
+    async def loader():
+        return {"total_value": 1.0}
+
+    assert await cache.get_or_load("GBP", loader, ttl=60) == {"total_value": 1.0}
+    assert await cache.get_or_load("GBP", loader, ttl=60) == {"total_value": 1.0}
+    assert cache.stats.loads == 1
+    assert cache.stats.shared_errors >= 1
+
+
+@pytest.mark.asyncio
+async def test_silent_server_times_out_as_a_backend_error():
+    async def accept(reader, writer):
+        await reader.read()
+
+    server = await asyncio.start_server(accept, "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    try:
+        with pytest.raises(SharedCacheError):
+            await RedisCacheBackend(port=port, timeout=0.1).get("cv:prices:BTC-GBP")
+    finally:
+        server.close()
+
+
+def test_incomplete_backend_cannot_be_created():
+    class GetOnly(SharedCacheBackend):
+        async def get(self, key):
+            return None
+
+    with pytest.raises(TypeError):
+        GetOnly()
+
+
+def _worker(path, log_path):
+    async def run():
+        cache = TTLCache(name="candles", shared=create_shared_backend(f"sqlite:///{path}"),
+                         codec=CANDLE_CODEC, shared_poll_interval=0.01)
+
+        async def loader():
+            with open(log_path, "a") as log:
+                log.write(f"{os.getpid()}\n")
+            await asyncio.sleep(0.5)
+            return candles()
+
+        series = await cache.get_or_load(("ETH-GBP", 3600), loader, ttl=60)
+        assert len(series) == 2
+
+    asyncio.run(run())
+
+
+def test_processes_refresh_a_key_once(tmp_path):
+    context = multiprocessing.get_context("spawn")
+    processes = [context.Process(target=_worker, args=(tmp_path / "shared.db", tmp_path / "loads.log"))
+                 for _ in range(3)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join(timeout=60)
+
+    assert [process.exitcode for process in processes] == [0, 0, 0]
+    assert len((tmp_path / "loads.log").read_text().splitlines()) == 1
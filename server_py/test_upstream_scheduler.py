@@ -0,0 +1,154 @@
+import asyncio
+import time
+import httpx
+import pytest
+from app.services import upstream_scheduler
+from app.services.http_client import close_http_client, init_http_client
+from app.services.upstream_scheduler import (
+    PUBLIC,
+    Priority,
+    TokenBucket,
+    UpstreamRateLimited,
+    UpstreamScheduler,
+    upstream_priority,
+)
+
+
+@pytest.mark.asyncio
+async def test_waiters_are_served_by_priority_then_arrival():
+    bucket = TokenBucket("test", rate=50, burst=1)
+    await bucket.acquire()
+    order = []
+
+    async def take(name, priority):
+        await bucket.acquire(priority)
+        order.append(name)
+
+    tasks = [
+        asyncio.ensure_future(take("bulk", Priority.BULK)),
+        asyncio.ensure_future(take("background", Priority.BACKGROUND)),
+        asyncio.ensure_future(take("interactive-1", Priority.INTERACTIVE)),
+        asyncio.ensure_future(take("interactive-2", Priority.INTERACTIVE)),
+    ]
+    await asyncio.sleep(0)
+    assert bucket.stats()["queue_depth"] == 4
+    await asyncio.gather(*tasks)
+
+    assert order == ["interactive-1", "interactive-2", "background", "bulk"]
+    assert bucket.stats()["max_queue_depth"] == 4
+    assert bucket.stats()["delayed"] == 4
+
+
+@pytest.mark.asyncio
+async def test_bucket_limits_rate_and_cancelled_waiters_do_not_leak_tokens():
+    bucket = TokenBucket("test", rate=20, burst=2)
+    started = time.monotonic()
+    for _ in range(4):
+        await bucket.acquire()
+    # Two tokens from the burst, then one every 50ms
+    assert time.monotonic() - started >= 0.09
+
+    waiter = asyncio.ensure_future(bucket.acquire())
+    await asyncio.sleep(0)
+    waiter.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiter
+    await asyncio.wait_for(bucket.acquire(), 1.0)
+    assert bucket.stats()["queue_depth"] == 0
+
+
+def _rate_limited_transport(failures, retry_after="0.05", status=429):
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        if len(calls) <= failures:
+            headers = {"Retry-After": retry_after} if retry_after is not None else {}
+            return httpx.Response(status, headers=headers)
+        return httpx.Response(200, json={"ok": True})
+
+    return httpx.MockTransport(handler), calls
+
+
+async def _get(client):
+    response = await client.get("http://upstream.test/products/BTC-GBP/candles")
+    response.raise_for_status()
+    return response.json()
+
+
+@pytest.mark.asyncio
+async def test_retries_honour_retry_after_and_pause_the_bucket():
+    transport, calls = _rate_limited_transport(failures=2)
+    scheduler = UpstreamScheduler({PUBLIC: (1000, 10)}, max_retries=3, base_delay=0.01)
+    async with httpx.AsyncClient(transport=transport) as client:
+        started = time.monotonic()
+        assert await scheduler.run(PUBLIC, lambda: _get(client)) == {"ok": True}
+
+    assert len(calls) == 3
+    assert time.monotonic() - started >= 0.1
+    stats = scheduler.stats()[PUBLIC]
+    assert stats["throttled"] == 2
+    assert stats["retries"] == 2
+
+
+@pytest.mark.asyncio
+async def test_gives_up_with_rate_limited_error_and_does_not_retry_client_errors():
+    scheduler = UpstreamScheduler({PUBLIC: (0, 1)}, max_retries=2, base_delay=0.001, max_delay=1.0)
+
+    transport, calls = _rate_limited_transport(failures=10, retry_after=None)
+    async with httpx.AsyncClient(transport=transport) as client:
+        with pytest.raises(UpstreamRateLimited):
+            await scheduler.run(PUBLIC, lambda: _get(client))
+    assert len(calls) == 3
+
+    # A pause longer than the maximum backoff is not waited out
+    transport, calls = _rate_limited_transport(failures=10, retry_after="120")
+    async with httpx.AsyncClient(transport=transport) as client:
+        with pytest.raises(UpstreamRateLimited) as error:
+            await scheduler.run(PUBLIC, lambda: _get(client))
+    assert len(calls) == 1
+    assert error.value.retry_after == 120
+
+    transport, calls = _rate_limited_transport(failures=10, status=404)
+    async with httpx.AsyncClient(transport=transport) as client:
+        with pytest.raises(httpx.HTTPStatusError):
+            await scheduler.run(PUBLIC, lambda: _get(client))
+    assert len(calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_priority_follows_context():
+    bucket = TokenBucket("test", rate=50, burst=1)
+    scheduler = UpstreamScheduler({PUBLIC: (50, 1)})
+    scheduler.buckets[PUBLIC] = bucket
+    await bucket.acquire()
+    order = []
+
+    async def fetch(name):
+        await scheduler.run(PUBLIC, lambda: asyncio.sleep(0))
+        order.append(name)
+
+    with upstream_priority(Priority.BACKGROUND):
+        background = asyncio.ensure_future(fetch("poller"))
+    user = asyncio.ensure_future(fetch("user"))
+    await asyncio.gather(background, user)
+    assert order == ["user", "poller"]
+
+
+@pytest.mark.asyncio
+async def test_rate_limited_history_returns_503_with_retry_after(coinbase_env, monkeypatch):
+    from app.main import app
+
+    monkeypatch.setattr(upstream_scheduler, "_scheduler",
+                        UpstreamScheduler({PUBLIC: (0, 1), "private": (0, 1)}, max_retries=1, max_delay=5.0))
+    init_http_client(transport=httpx.MockTransport(lambda request: httpx.Response(429, headers={"Retry-After": "7"})))
+    try:
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            response = await client.get("/api/crypto/historical/RATE-LIMITED?granularity=3600")
+            stats = await client.get("/api/crypto/upstream/stats")
+    finally:
+        await close_http_client()
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "7"
+    assert stats.json()[PUBLIC]["throttled"] == 1
@@ -0,0 +1,84 @@
+import asyncio
+import httpx
+import pytest
+from app.services.cache import TTLCache
+from app.services.market_store import MarketDataStore
+from app.services.valuation import value_portfolio
+
+
+def test_decimal_valuation_weights_and_pnl():
+    portfolio = [
+        {"currency": "ETH", "balance": "0.1"},
+        {"currency": "BTC", "balance": "0.3"},
+        {"currency": "GBP", "balance": "10.10"},
+        {"currency": "DOGE", "balance": "100"},
+    ]
+    prices = {
+        "ETH-GBP": {"price": "3.3", "price_24h_ago": "3"},
+        "BTC-GBP": {"price": "0.1", "price_24h_ago": "0.2"},
+        "DOGE-GBP": {"error": "Unable to fetch price for DOGE-GBP."},
+    }
+    result = value_portfolio(portfolio, prices)
+
+    # 0.1 * 3.3 + 0.3 * 0.1 + 10.10 is exactly 10.46, which float math does not give
+    assert result["total_value"] == "10.46"
+    assert result["pnl_24h"] == "0"
+    assert [a["currency"] for a in result["assets"]] == ["GBP", "ETH", "BTC", "DOGE"]
+    eth = result["assets"][1]
+    assert eth == {"currency": "ETH", "balance": "0.1", "price": "3.3", "value": "0.33",
+                   "weight": "0.031549", "pnl_24h": "0.03", "change_24h": "10"}
+    assert result["assets"][2]["pnl_24h"] == "-0.03"
+    assert result["assets"][3]["value"] is None
+    assert result["errors"] == {"DOGE": "Unable to fetch price for DOGE-GBP."}
+
+
+def test_change_24h_only_counts_holdings_with_a_24h_price():
+    portfolio = [{"currency": "BTC", "balance": "1"}, {"currency": "SOL", "balance": "10"}]
+    prices = {
+        "BTC-GBP": {"price": "110", "price_24h_ago": "100"},
+        "SOL-GBP": {"price": "100", "price_24h_ago": None},
+    }
+    result = value_portfolio(portfolio, prices)
+    assert result["total_value"] == "1110" and result["pnl_24h"] == "10"
+    # BTC was worth 100 a day ago; SOL has no 24h price and is left out of the base
+    assert result["change_24h"] == "10"
+
+
+@pytest.mark.asyncio
+async def test_valuation_endpoint_prices_known_products_while_balances_load(coinbase_env, monkeypatch):
+    from app.main import app
+    from app.dependencies import get_coinbase_service
+
+    service = get_coinbase_service()
+    events = []
+
+    async def portfolio():
+        events.append("portfolio:start")
+        await asyncio.sleep(0.05)
+        events.append("portfolio:end")
+        return [{"currency": "BTC", "balance": "2", "available": "2"}]
+
+    async def price(product_id):
+        events.append(f"price:{product_id}")
+        return {"price": "100", "price_24h_ago": "80", "change_24h": 25.0}
+
+    monkeypatch.setattr(service, "get_portfolio", portfolio)
+    monkeypatch.setattr(service, "get_crypto_price", price)
+    monkeypatch.setattr(service, "valuation_cache", TTLCache(max_entries=8))
+    monkeypatch.setattr(service, "valuation_ttl", 0.01)
+    monkeypatch.setattr(service, "_valued_products", {})
+    monkeypatch.setattr(service, "market_store", MarketDataStore())
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        first = await client.get("/api/crypto/portfolio/valuation")
+        # The first valuation learned which products are held
+        assert events == ["portfolio:start", "portfolio:end", "price:BTC-GBP"]
+        await asyncio.sleep(0.02)
+        events.clear()
+        second = await client.get("/api/crypto/portfolio/valuation")
+
+    assert events == ["portfolio:start", "price:BTC-GBP", "portfolio:end"]
+    assert first.json()["total_value"] == "200"
+    assert second.json()["pnl_24h"] == "40"
+    assert second.json()["change_24h"] == "25"
@@ -3,87 +3,117 @@
  * Features real-time price updates and responsive grid layout.
  */
 
-import { Box, Card, CardBody, Heading, Stack, Text, Stat, StatLabel, StatNumber, StatArrow, StatHelpText, Grid } from '@chakra-ui/react'
+import { useState } from 'react'
+import { Box, Card, CardBody, Flex, Heading, Select, Stack, Text, Stat, StatLabel, StatNumber, StatArrow, StatHelpText, Grid } from '@chakra-ui/react'
 import { useQuery } from '@tanstack/react-query'
 
+// Display currencies; the backend derives rates for them from the markets it already fetches
+const DISPLAY_CURRENCIES = ['GBP', 'USD', 'EUR']
+
+/**
+ * Format an amount in the display currency (e.g. £1,234.56)
+ */
+const formatMoney = (amount: string | number, currency: string) =>
+  new Intl.NumberFormat(undefined, { style: 'currency', currency }).format(Number(amount))
+
 /**
- * Interface defining the structure of cryptocurrency holding data
- * received from the backend API
+ * Interface defining the structure of one valued holding
+ * received from the backend API; amounts are decimal strings
  */
-interface CryptoHolding {
-  currency: string    // The cryptocurrency symbol (e.g., 'BTC', 'ETH')
-  balance: string     // The total balance of the holding
-  available: string   // The available balance that can be traded
+interface ValuedHolding {
+  currency: string            // The cryptocurrency symbol (e.g., 'BTC', 'ETH')
+  balance: string             // The total balance of the holding
+  price: string | null        // Current price, null if it could not be fetched
+  value: string | null        // Balance times price
+  weight: string | null       // Share of total portfolio value (0-1)
+  pnl_24h: string | null      // Change in value over 24 hours
+  change_24h: string | null   // 24-hour price change percentage
 }
 
-interface CryptoPrice {
-  price: string       // Current price
-  time: string       // Timestamp
-  change_24h: number // 24-hour price change percentage
-  price_24h_ago: string // Price 24 hours ago
+/**
+ * Portfolio valuation computed by the backend in a single request
+ */
+interface PortfolioValuation {
+  quote_currency: string
+  total_value: string
+  pnl_24h: string
+  change_24h: string | null
+  assets: ValuedHolding[]
+  errors: Record<string, string>
 }
 
 const Portfolio = () => {
-  // Fetch portfolio data with automatic refresh every 30 seconds
-  const { data: portfolio, isLoading } = useQuery<CryptoHolding[]>({
-    queryKey: ['portfolio'],
+  const [quote, setQuote] = useState(DISPLAY_CURRENCIES[0])
+
+  // Fetch balances and prices in one request with automatic refresh every 30 seconds
+  const { data: valuation, isLoading } = useQuery<PortfolioValuation>({
+    queryKey: ['portfolio-valuation', quote],
     queryFn: async () => {
-      const response = await fetch('/api/crypto/portfolio')
+      const response = await fetch(`/api/crypto/portfolio/valuation?quote=${quote}`)
       return response.json()
     },
     refetchInterval: 30000 // Refresh every 30 seconds
   })
 
-  // Fetch real-time prices for each cryptocurrency in the portfolio
-  const { data: prices } = useQuery<CryptoPrice[]>({
-    queryKey: ['prices', portfolio],
-    enabled: !!portfolio, // Only fetch prices when portfolio data exists
-    queryFn: async () => {
-      const pricePromises = portfolio!.map(async (holding) => {
-        const response = await fetch(`/api/crypto/price/${holding.currency}-GBP`)
-        return response.json()
-      })
-      return Promise.all(pricePromises)
-    },
-    refetchInterval: 30000 // Refresh prices every 30 seconds
-  })
-
   // Show loading state while fetching initial portfolio data
   if (isLoading) {
     return <Box>Loading portfolio...</Box>
   }
 
+  const currency = valuation?.quote_currency ?? quote
+
   return (
     <Stack spacing={4}>
-      <Heading size="lg">Your Crypto Portfolio</Heading>
+      <Flex justify="space-between" align="center">
+        <Heading size="lg">Your Crypto Portfolio</Heading>
+        <Select width="auto" value={quote} onChange={(event) => setQuote(event.target.value)}>
+          {DISPLAY_CURRENCIES.map((code) => (
+            <option key={code} value={code}>{code}</option>
+          ))}
+        </Select>
+      </Flex>
+      {valuation && (
+        <Stat>
+          <StatLabel>Total Value</StatLabel>
+          <StatNumber>{formatMoney(valuation.total_value, currency)}</StatNumber>
+          {valuation.change_24h !== null && (
+            <StatHelpText>
+              <StatArrow type={Number(valuation.pnl_24h) >= 0 ? 'increase' : 'decrease'} />
+              {formatMoney(Math.abs(Number(valuation.pnl_24h)), currency)} ({Math.abs(Number(valuation.change_24h)).toFixed(2)}%) 24h
+            </StatHelpText>
+          )}
+        </Stat>
+      )}
       {/* Responsive grid layout: 1 column on mobile, 2 on tablet, 3 on desktop */}
       <Grid templateColumns={{ base: '1fr', md: 'repeat(2, 1fr)', lg: 'repeat(3, 1fr)' }} gap={4}>
-        {portfolio?.map((holding, index) => (
+        {valuation?.assets.map((holding) => (
           <Card key={holding.currency}>
             <CardBody>
               <Stat>
                 <StatLabel>{holding.currency}</StatLabel>
-                {prices?.[index] && (
+                {holding.value !== null && holding.price !== null && (
                   <>
-                    {/* Total value in GBP */}
+                    {/* Total value in the display currency */}
                     <StatNumber>
-                      £{(Number(holding.balance) * Number(prices[index].price)).toFixed(2)}
+                      {formatMoney(holding.value, currency)}
                     </StatNumber>
                     {/* Current price per coin */}
                     <Text color="gray.600" fontSize="sm">
-                      Current Price: £{Number(prices[index].price).toFixed(2)}
+                      Current Price: {formatMoney(holding.price, currency)}
                     </Text>
                     {/* 24h change with arrow */}
-                    <StatHelpText>
-                      <StatArrow type={prices[index].change_24h >= 0 ? 'increase' : 'decrease'} />
-                      {Math.abs(prices[index].change_24h).toFixed(2)}%
-                    </StatHelpText>
-                    {/* Balance */}
-                    <Text fontSize="sm" mt={1}>
-                      Balance: {Number(holding.balance).toFixed(4)} {holding.currency}
-                    </Text>
+                    {holding.change_24h !== null && (
+                      <StatHelpText>
+                        <StatArrow type={Number(holding.change_24h) >= 0 ? 'increase' : 'decrease'} />
+                        {Math.abs(Number(holding.change_24h)).toFixed(2)}%
+                      </StatHelpText>
+                    )}
                   </>
                 )}
+                {/* Balance */}
+                <Text fontSize="sm" mt={1}>
+                  Balance: {Number(holding.balance).toFixed(4)} {holding.currency}
+                </Text>
               </Stat>
             </CardBody>
           </Card>
@@ -93,4 +123,4 @@ const Portfolio = () => {
   )
 }
 
-export default Portfolio
\ No newline at end of file
+export default Portfolio
@@ -1,54 +1,80 @@
 /**
- * Recommendations component fetches and displays AI-powered trading recommendations
+ * Recommendations component streams and displays AI-powered trading recommendations
  * based on the user's portfolio and current market conditions.
  */
 
+import { useEffect, useState } from 'react'
 import { Box, Card, CardBody, CardHeader, Heading, useToast } from '@chakra-ui/react'
-import { useQuery } from '@tanstack/react-query'
 import ReactMarkdown from 'react-markdown'
 
 /**
- * Interface defining the structure of recommendation data
- * received from the backend API
+ * Payload of a "token" event sent by /api/recommendations/stream
  */
-interface RecommendationResponse {
-  recommendations: string  // Markdown-formatted recommendations
+interface TokenEvent {
+  text: string  // Next piece of the Markdown-formatted recommendations
 }
 
+const REFRESH_INTERVAL = 15 * 60 * 1000 // Refresh every 15 minutes
+
 const Recommendations = () => {
   // Initialize toast notifications for error handling
   const toast = useToast()
-  
-  // Fetch AI recommendations with automatic refresh every 5 minutes
-  const { data, isLoading, error } = useQuery<RecommendationResponse>({
-    queryKey: ['recommendations'],
-    queryFn: async () => {
-      const response = await fetch('/api/recommendations')
-      if (!response.ok) {
-        throw new Error('Failed to fetch recommendations')
-      }
-      const data: RecommendationResponse = await response.json()
-      return data
-    },
-    refetchInterval: 15 * 60 * 1000, // Refresh every 15 minutes
-    retry: 1, // Only retry once on failure
-  })
+  const [recommendations, setRecommendations] = useState('')
+  const [isLoading, setIsLoading] = useState(true)
+  const [hasError, setHasError] = useState(false)
+
+  // Stream recommendations as they are generated, re-opening the stream periodically
+  useEffect(() => {
+    let source: EventSource | null = null
+
+    const open = () => {
+      source?.close()
+      let received = ''
+      source = new EventSource('/api/recommendations/stream')
+
+      source.addEventListener('token', (event) => {
+        // Keep showing the previous recommendations until the new ones start arriving
+        received += (JSON.parse((event as MessageEvent).data) as TokenEvent).text
+        setRecommendations(received)
+        setIsLoading(false)
+        setHasError(false)
+      })
 
-  // Show loading state while fetching recommendations
+      source.addEventListener('done', () => {
+        source?.close()
+      })
+
+      // Fired both for server "error" events and for connection failures
+      source.addEventListener('error', (event) => {
+        source?.close()
+        const data = (event as MessageEvent).data
+        toast({
+          title: 'Error fetching recommendations',
+          description: data ? JSON.parse(data).detail : 'Connection to the server was lost',
+          status: 'error',
+          duration: 5000,
+          isClosable: true,
+        })
+        setIsLoading(false)
+        setHasError(received === '')
+      })
+    }
+
+    open()
+    const timer = setInterval(open, REFRESH_INTERVAL)
+    return () => {
+      clearInterval(timer)
+      source?.close()
+    }
+  }, [toast])
+
+  // Show loading state until the first tokens arrive
   if (isLoading) {
     return <Box>Loading recommendations...</Box>
   }
 
-  // Show error card if recommendation fetch failed
-  if (error) {
-    toast({
-      title: 'Error fetching recommendations',
-      description: error instanceof Error ? error.message : 'Unknown error occurred',
-      status: 'error',
-      duration: 5000,
-      isClosable: true,
-    })
-
+  // Show error card if no recommendations could be loaded
+  if (hasError && !recommendations) {
     return (
       <Card bg="red.50">
         <CardBody>
@@ -66,11 +92,11 @@ const Recommendations = () => {
       </CardHeader>
       <CardBody>
         <Box className="markdown-content">
-          <ReactMarkdown>{data?.recommendations || ''}</ReactMarkdown>
+          <ReactMarkdown>{recommendations}</ReactMarkdown>
         </Box>
       </CardBody>
     </Card>
   )
 }
 
-export default Recommendations
\ No newline at end of file
+export default Recommendations